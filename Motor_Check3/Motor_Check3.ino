@@ -23,11 +23,187 @@ int targetAngles[4] = {45, 90, 90, 90};         // Target positions
 unsigned long lastMove = 0;
 const int moveInterval = 15;  // Time between position updates (ms)
 
+// Binary transport, enabled by the host with "9B" (see binary_protocol.py):
+// COBS-framed packets ending in 0x00, each a type byte, payload and CRC-8
+#define PKT_POSE      0x01
+#define PKT_STATUS    0x02
+#define PKT_POSE_ACK  0x03
+#define PKT_HOLD      0x04
+#define PKT_ANGLES    0x81
+#define PKT_BASE_POS  0x82
+#define PKT_ACK       0x83
+#define BASE_BIT      0x80
+bool binaryMode = false;
+uint8_t rxFrame[16];
+uint8_t rxLen = 0;
+bool rxOverflow = false;
+
 // Convert angle to servo pulse length
 int angleToPulse(int angle) {
     return map(angle, 0, 180, SERVOMIN, SERVOMAX);
 }
 
+// CRC-8, polynomial 0x07
+uint8_t crc8(const uint8_t *data, uint8_t len) {
+    uint8_t crc = 0;
+    for (uint8_t i = 0; i < len; i++) {
+        crc ^= data[i];
+        for (uint8_t bit = 0; bit < 8; bit++) {
+            crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+// Append the CRC to packet (which needs one spare byte), COBS-encode and send it
+void sendPacket(uint8_t *packet, uint8_t len) {
+    packet[len] = crc8(packet, len);
+    len++;
+    uint8_t out[24];
+    uint8_t codeIndex = 0;
+    uint8_t outLen = 1;
+    uint8_t code = 1;
+    for (uint8_t i = 0; i < len; i++) {
+        if (packet[i] == 0) {
+            out[codeIndex] = code;
+            codeIndex = outLen++;
+            code = 1;
+        } else {
+            out[outLen++] = packet[i];
+            code++;
+        }
+    }
+    out[codeIndex] = code;
+    out[outLen++] = 0;
+    Serial.write(out, outLen);
+}
+
+// Undo COBS in place; returns the decoded length, or 0 if the frame is malformed
+uint8_t cobsDecode(uint8_t *buf, uint8_t len) {
+    uint8_t in = 0;
+    uint8_t out = 0;
+    while (in < len) {
+        uint8_t code = buf[in++];
+        if (code == 0 || in + code - 1 > len) {
+            return 0;
+        }
+        for (uint8_t i = 1; i < code; i++) {
+            buf[out++] = buf[in++];
+        }
+        if (code < 0xFF && in < len) {
+            buf[out++] = 0;
+        }
+    }
+    return out;
+}
+
+// Report current joint positions
+void sendAngles() {
+    if (binaryMode) {
+        uint8_t packet[6] = {PKT_ANGLES};
+        for (int i = 0; i < 4; i++) {
+            packet[i + 1] = currentAngles[i];
+        }
+        sendPacket(packet, 5);
+        return;
+    }
+    Serial.print("Angles:");
+    for (int i = 0; i < 4; i++) {
+        Serial.print(currentAngles[i]);
+        Serial.print(",");
+    }
+    Serial.println();
+}
+
+// Set several joint targets from "a0,a1,..."; an empty field leaves that joint alone
+void setPose(String fields) {
+    int start = 0;
+    for (int i = 0; i < 4 && start <= fields.length(); i++) {
+        int comma = fields.indexOf(',', start);
+        if (comma < 0) {
+            comma = fields.length();
+        }
+        if (comma > start) {
+            targetAngles[i] = constrain(fields.substring(start, comma).toInt(), 0, maxAngles[i]);
+        }
+        start = comma + 1;
+    }
+}
+
+// Stop every servo where it is now
+void holdPose() {
+    for (int i = 0; i < 4; i++) {
+        targetAngles[i] = currentAngles[i];
+    }
+    sendAngles();
+}
+
+// Joint mask, one byte per servo bit set, then a u16 if the base bit is set
+void applyPose(const uint8_t *pose, uint8_t len) {
+    if (len < 1) {
+        return;
+    }
+    uint8_t mask = pose[0];
+    uint8_t expected = 1 + ((mask & BASE_BIT) ? 2 : 0);
+    for (int bit = 0; bit < 7; bit++) {
+        if (mask & (1 << bit)) {
+            expected++;
+        }
+    }
+    if (len != expected) {
+        return;
+    }
+    uint8_t pos = 1;
+    for (int i = 0; i < 7; i++) {
+        if (mask & (1 << i)) {
+            if (i < 4) {
+                targetAngles[i] = constrain(pose[pos], 0, maxAngles[i]);
+            }
+            pos++;
+        }
+    }
+}
+
+// Act on one binary frame; damaged packets are dropped
+void handlePacket() {
+    uint8_t len = cobsDecode(rxFrame, rxLen);
+    if (len < 2 || crc8(rxFrame, len - 1) != rxFrame[len - 1]) {
+        return;
+    }
+    len--;  // Drop the CRC
+
+    if (rxFrame[0] == PKT_STATUS) {
+        sendAngles();
+    } else if (rxFrame[0] == PKT_POSE) {
+        applyPose(rxFrame + 1, len - 1);
+    } else if (rxFrame[0] == PKT_POSE_ACK && len >= 2) {
+        // Acknowledge before acting, so a blocking base move doesn't delay it
+        uint8_t ack[3] = {PKT_ACK, rxFrame[1]};
+        sendPacket(ack, 2);
+        applyPose(rxFrame + 2, len - 2);
+    } else if (rxFrame[0] == PKT_HOLD) {
+        holdPose();
+    }
+}
+
+// Collect bytes up to each 0x00 delimiter
+void readBinary() {
+    while (Serial.available()) {
+        uint8_t b = Serial.read();
+        if (b == 0) {
+            if (!rxOverflow) {
+                handlePacket();
+            }
+            rxLen = 0;
+            rxOverflow = false;
+        } else if (rxLen < sizeof(rxFrame)) {
+            rxFrame[rxLen++] = b;
+        } else {
+            rxOverflow = true;
+        }
+    }
+}
+
 void setup() {
     // Initialize serial communication
     Serial.begin(115200);
@@ -44,26 +220,44 @@ void setup() {
         pwm.setPWM(i, 0, angleToPulse(currentAngles[i]));
     }
     
-    // Send initial positions
-    Serial.print("Angles:");
-    for (int i = 0; i < 4; i++) {
-        Serial.print(currentAngles[i]);
-        Serial.print(",");
-    }
-    Serial.println();
+    // Send initial positions, the host treats this as the ready banner
+    sendAngles();
 }
 
 void loop() {
     // Check for serial commands
-    if (Serial.available()) {
+    if (binaryMode) {
+        readBinary();
+    } else if (Serial.available()) {
         String command = Serial.readStringUntil('\n');
+
+        // "<command>#<seq>" asks for an acknowledgement as soon as the line is read
+        int hash = command.indexOf('#');
+        if (hash >= 0) {
+            Serial.print("Ack:");
+            Serial.println(command.substring(hash + 1).toInt());
+            command = command.substring(0, hash);
+        }
         
-        int servoNum = command.substring(0, 1).toInt();
-        int angle = command.substring(1).toInt();
+        // Commands starting with 9 are host requests, there is no joint 9
+        if (command.startsWith("9?")) {  // Status request
+            sendAngles();
+            Serial.println("Caps:PBAH");  // Extensions this sketch understands
+        } else if (command.startsWith("9P")) {  // Pose: targets for several joints in one line
+            setPose(command.substring(2));
+        } else if (command.startsWith("9H")) {  // Hold: stop every servo where it is
+            holdPose();
+        } else if (command.startsWith("9B")) {  // Switch to the binary transport
+            Serial.println("Mode:B");
+            binaryMode = true;
+        } else {
+            int servoNum = command.substring(0, 1).toInt();
+            int angle = command.substring(1).toInt();
 
-        if (servoNum >= 0 && servoNum < 4) {
-            // Constrain angle based on servo-specific maximum
-            targetAngles[servoNum] = constrain(angle, 0, maxAngles[servoNum]);
+            if (servoNum >= 0 && servoNum < 4) {
+                // Constrain angle based on servo-specific maximum
+                targetAngles[servoNum] = constrain(angle, 0, maxAngles[servoNum]);
+            }
         }
     }
 
@@ -87,12 +281,7 @@ void loop() {
 
         // Send feedback if any joint position changed
         if (moved) {
-            Serial.print("Angles:");
-            for (int i = 0; i < 4; i++) {
-                Serial.print(currentAngles[i]);
-                Serial.print(",");
-            }
-            Serial.println();
+            sendAngles();
         }
     }
 }
\ No newline at end of file
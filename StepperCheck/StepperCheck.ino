@@ -9,6 +9,7 @@ void setup() {
     Serial.begin(9600);
     pinMode(DIR_PIN, OUTPUT);
     pinMode(STEP_PIN, OUTPUT);
+    Serial.println("StepperCheck ready");
 }
 
 void loop() {
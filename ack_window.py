@@ -0,0 +1,186 @@
+"""Sequence-numbered commands with a sliding window of acknowledgements."""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from serial_writer import STREAM
+
+# Sequence numbers fit the binary transport's one-byte field
+SEQ_MODULO = 256
+# Usable bytes in the Arduino's 64-byte HardwareSerial RX ring, less some headroom
+WINDOW_BYTES = 56
+
+
+class AckWindow:
+    """Numbers commands, keeps a bounded number in flight and retries the lost ones.
+
+    ``send(key, encode, busy_for, priority)`` queues a command for the
+    frozenset of joints ``key``; ``encode(seq)`` returns its bytes with the
+    sequence number embedded and the result is handed to ``writer.put`` along
+    with ``busy_for`` and ``priority``. At most ``window`` commands and ``window_bytes`` bytes are
+    unacknowledged at once, so the firmware's RX ring can hold everything in
+    flight even while the sketch is blocked. Commands waiting for room are
+    coalesced by ``key`` like the writer's queue, and anything above
+    ``STREAM`` priority waits at the front.
+
+    ``ack(seq)`` is called when the firmware's acknowledgement arrives, from
+    any thread. A command still unacknowledged after the retransmission
+    timeout is dropped from the window and ``on_timeout(key)`` is called from
+    the window's thread; the caller re-sends its current targets for that key
+    rather than the stale bytes, so a retry never undoes a newer command. The
+    timeout adapts to the measured round trip the way TCP's does, within
+    ``min_timeout`` and ``max_timeout``.
+    """
+
+    def __init__(self, writer, on_timeout, window=6, window_bytes=WINDOW_BYTES,
+                 timeout=0.5, min_timeout=0.05, max_timeout=2.0):
+        self.writer = writer
+        self.on_timeout = on_timeout
+        self.window = window
+        self.window_bytes = window_bytes
+        self.timeout = timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()
+        # seq -> (key, size, sent_at)
+        self._in_flight = OrderedDict()
+        self._bytes_in_flight = 0
+        self._next_seq = 0
+        self._srtt = None
+        self._rttvar = 0.0
+        self._running = False
+        self._thread = None
+
+        self.sent = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.stale_acks = 0
+        self.rtts = deque(maxlen=1000)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="serial-acks", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._in_flight.clear()
+            self._bytes_in_flight = 0
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def send(self, key, encode, busy_for=0.0, priority=STREAM):
+        with self._cond:
+            if not self._running:
+                return
+            self._pending.pop(key, None)
+            self._pending[key] = (encode, busy_for, priority)
+            if priority < STREAM:
+                self._pending.move_to_end(key, last=False)
+            self._fill()
+
+    def clear(self):
+        """Drop every command still waiting for window room, e.g. before an emergency stop.
+
+        Commands already in flight stay counted until acknowledged or timed out.
+        """
+        with self._cond:
+            self._pending.clear()
+
+    def ack(self, seq):
+        with self._cond:
+            entry = self._in_flight.pop(seq, None)
+            if entry is None:
+                # Late ack for a command that already timed out
+                self.stale_acks += 1
+                return
+            _, size, sent_at = entry
+            self._bytes_in_flight -= size
+            self.acked += 1
+            self._sample(time.perf_counter() - sent_at)
+            self._fill()
+            self._cond.notify_all()
+
+    @property
+    def in_flight(self):
+        return len(self._in_flight)
+
+    def stats(self):
+        rtts = sorted(self.rtts)
+        pick = lambda pct: 1000 * rtts[min(len(rtts) - 1, int(len(rtts) * pct / 100))] if rtts else 0.0
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "timeouts": self.timeouts,
+            "stale_acks": self.stale_acks,
+            "in_flight": self.in_flight,
+            "rtt_ms_p50": pick(50),
+            "rtt_ms_p95": pick(95),
+            "rtt_ms_max": 1000 * rtts[-1] if rtts else 0.0,
+            "timeout_ms": 1000 * self.timeout,
+        }
+
+    def _fill(self):
+        # Called with the lock held
+        while self._pending and len(self._in_flight) < self.window:
+            key, (encode, busy_for, priority) = next(iter(self._pending.items()))
+            seq = self._next_seq
+            data = encode(seq)
+            if self._in_flight and self._bytes_in_flight + len(data) > self.window_bytes:
+                return
+            del self._pending[key]
+            self._next_seq = (seq + 1) % SEQ_MODULO
+            # A sequence number still in flight after wrapping around is long lost
+            self._in_flight.pop(seq, None)
+            self._in_flight[seq] = (key, len(data), time.perf_counter())
+            self._bytes_in_flight += len(data)
+            self.sent += 1
+            # Unique per command so the writer never coalesces it, but still preempted by its joints
+            self.writer.put(key | {("ack", seq)}, data, busy_for, priority)
+            self._cond.notify_all()
+
+    def _sample(self, rtt):
+        # Jacobson/Karels smoothing, as in TCP's retransmission timer
+        self.rtts.append(rtt)
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+        else:
+            self._rttvar += (abs(self._srtt - rtt) - self._rttvar) / 4
+            self._srtt += (rtt - self._srtt) / 8
+        self.timeout = min(self.max_timeout, max(self.min_timeout, self._srtt + 4 * self._rttvar))
+
+    def _run(self):
+        while True:
+            expired = []
+            with self._cond:
+                if not self._running:
+                    return
+                if not self._in_flight:
+                    self._cond.wait()
+                    continue
+                now = time.perf_counter()
+                seq, (key, size, sent_at) = next(iter(self._in_flight.items()))
+                deadline = sent_at + self.timeout
+                if now < deadline:
+                    self._cond.wait(deadline - now)
+                    continue
+                for seq, (key, size, sent_at) in list(self._in_flight.items()):
+                    if now < sent_at + self.timeout:
+                        break
+                    del self._in_flight[seq]
+                    self._bytes_in_flight -= size
+                    self.timeouts += 1
+                    expired.append(key)
+                # Back off until acks show the link is keeping up again
+                self.timeout = min(self.max_timeout, self.timeout * 2)
+                self._fill()
+            for key in expired:
+                self.on_timeout(key)
@@ -0,0 +1,204 @@
+"""The serial side of the arm, shared by the control panels and the daemon."""
+
+from ack_window import AckWindow
+import binary_protocol
+from connect import ARM_PROBE
+from encoder import CommandEncoder
+from flow_control import CreditFlow, base_move_time
+from scheduler import BASE_JOINT
+from serial_reader import SerialReader
+from serial_writer import SerialWriter, STOP, STREAM
+from telemetry import TelemetryParser, FrameType
+
+
+class ArmLink:
+    """Encodes batches, writes them and parses what comes back over one open port.
+
+    ``open`` starts the writer and reader threads on a connected port and
+    ``close`` stops them and closes it; the link is reused across
+    reconnects. ``send_batch`` is the scheduler's send callback, so it runs
+    on whichever thread ticks the scheduler; ``stop`` is the serial half of
+    an emergency stop and expects the scheduler's lock to be held.
+
+    ``handle_line`` runs on the reader thread. It hands reported angles to
+    ``on_angles(frame)`` and base or stepper positions to ``on_base(angle)``
+    (None without a base) there, and anything that touches the writer (switching to the binary
+    transport, opening the ack window, resending after an ack timeout) to
+    the owner's thread through ``call(func, *args)``, as ``TelemetryPump.call``
+    or ``loop.call_soon_threadsafe`` do. ``on_resend(joints)`` gets the
+    joints of an unacknowledged command; ``on_error(e)`` a serial error from
+    either thread.
+    """
+
+    def __init__(self, max_angles, base, call, on_angles, on_base, on_resend, on_error):
+        self.call = call
+        self.on_angles = on_angles
+        self.on_base = on_base
+        self.on_resend = on_resend
+        self.on_error = on_error
+        self.set_joints(max_angles, base)
+
+        self.ser = None
+        self.reader = None
+        self.writer = None
+        self.flow = None
+        self.acks = None
+        self.parser = TelemetryParser()
+        self.binary_transport = False
+        self.acked_commands = False
+        # Set once the firmware reports it understands "9P" pose frames
+        self.pose_frames = False
+        self.binary_commands = False
+        self.binary_feedback = False
+
+    def set_joints(self, max_angles, base):
+        self.max_angles = list(max_angles)
+        self.has_base = base
+        # Every command line is built once up front rather than formatted per write
+        self.encoder = CommandEncoder(self.max_angles, base=base)
+
+    def open(self, ser, banner, binary_transport=False, acked_commands=False, linger=0.0):
+        self.ser = ser
+        self.binary_transport = binary_transport
+        self.acked_commands = acked_commands
+        # All output goes through the writer thread so a slow link can't freeze the caller
+        # Commands wait for room in the firmware's RX buffer and are held while it is blocked
+        self.flow = CreditFlow()
+        self.writer = SerialWriter(self.ser, on_error=self.on_error, flow=self.flow, linger=linger)
+        self.writer.start()
+        self.reader = SerialReader(self.ser, self.handle_line, on_error=self.on_error)
+        self.reader.start()
+        # Ask which extensions the firmware has; sketches that predate them ignore this
+        self.pose_frames = False
+        self.binary_commands = False
+        self.binary_feedback = False
+        self.writer.put("status", ARM_PROBE)
+        if banner:
+            self.handle_line(banner)
+
+    def close(self):
+        if self.acks:
+            self.acks.stop()
+            self.acks = None
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
+        if self.reader:
+            self.reader.stop()
+            self.reader = None
+        if self.ser:
+            self.ser.close()
+            self.ser = None
+
+    def print_stats(self):
+        """Print the ack window, writer, flow control and telemetry counters of this connection."""
+        if self.acks:
+            stats = self.acks.stats()
+            print(f"Acks: {stats['acked']}/{stats['sent']} acknowledged, {stats['timeouts']} timed out, "
+                  f"RTT {stats['rtt_ms_p50']:.1f} ms p50 / {stats['rtt_ms_p95']:.1f} ms p95")
+        if self.writer:
+            stats = self.writer.stats()
+            print(f"Writer: {stats['writes']} writes, {stats['dropped']} dropped, {stats['preempted']} preempted, "
+                  f"{stats['write_ms_avg']:.2f} ms avg / {stats['write_ms_max']:.2f} ms max per write")
+            if self.writer.linger:
+                print(f"Aggregation: {stats['bytes_per_write']:.1f} bytes per write, "
+                      f"{stats['syscalls_saved']} writes saved")
+            for lane, latency in stats['latency'].items():
+                if latency['count']:
+                    print(f"Press-to-wire {lane}: {latency['p95_ms']:.1f} ms p95 / {latency['max_ms']:.1f} ms max, "
+                          f"{latency['late']} over {latency['budget_ms']:.0f} ms")
+            stats = self.flow.stats()
+            print(f"Flow: {stats['holds']} holds, {stats['hold_ms_total']:.0f} ms held, "
+                  f"{stats['peak_outstanding']} bytes peak outstanding")
+        if self.reader:
+            stats = self.parser.stats()
+            print(f"Telemetry: {stats['frames']} frames, {stats['malformed']} malformed")
+
+    def send_batch(self, batch, priority=STREAM):
+        if self.acks:
+            self.send_acked(batch, priority)
+            return
+        # A queued batch is only replaced by one that moves the same joints
+        self.writer.put(frozenset(batch), self.encode_batch(batch), self.base_busy_for(batch), priority)
+
+    def encode_batch(self, batch):
+        # Every joint that changed since the last tick goes out in a single write
+        if self.binary_commands:
+            return binary_protocol.encode_pose(batch)
+        return self.encoder.batch(batch, self.pose_frames)
+
+    def send_acked(self, batch, priority=STREAM):
+        # Each numbered command is a single line or packet, so its Ack covers exactly that command
+        if self.binary_commands:
+            self.acks.send(frozenset(batch), lambda seq: binary_protocol.encode_pose(batch, seq),
+                           self.base_busy_for(batch), priority)
+            return
+        servos = {joint: angle for joint, angle in batch.items() if joint != BASE_JOINT}
+        if len(servos) > 1:
+            # "9P<a0>,<a1>,..." sets several joints in one line; an empty field leaves a joint alone
+            commands = [(frozenset(servos), self.encoder.pose([servos.get(i) for i in range(len(self.max_angles))]))]
+        else:
+            commands = [(frozenset([joint]), self.encoder.command(joint, angle)) for joint, angle in servos.items()]
+        if BASE_JOINT in batch:
+            commands.append((frozenset([BASE_JOINT]), self.encoder.command(BASE_JOINT, batch[BASE_JOINT])))
+        # Only the base's own line blocks the sketch
+        busy_for = self.base_busy_for(batch)
+        for key, line in commands:
+            self.acks.send(key, lambda seq, line=line: line[:-1] + b"#%d\n" % seq,
+                           busy_for if BASE_JOINT in key else 0.0, priority)
+
+    def base_busy_for(self, batch):
+        # Motor_Check2 stops reading serial while it steps the base
+        if BASE_JOINT not in batch:
+            return 0.0
+        return base_move_time(self.parser.base, batch[BASE_JOINT])
+
+    def stop(self, held):
+        """Queue a hold ahead of everything else; ``held`` is sent as targets to sketches without one."""
+        if b"H" in self.parser.caps:
+            data = (binary_protocol.encode_packet(binary_protocol.HOLD) if self.binary_commands
+                    else binary_protocol.HOLD_REQUEST)
+        else:
+            # Older sketches have no hold, so send the last reported angles as targets
+            data = self.encode_batch(held)
+        if self.acks:
+            # Slider commands still waiting for window room would follow the stop out
+            self.acks.clear()
+        if data:
+            # Keyed by every joint so all queued moves are discarded; a base move under way still finishes
+            self.writer.put(frozenset(range(len(self.max_angles))) | {BASE_JOINT}, data, priority=STOP)
+
+    def enable_acks(self):
+        if self.writer and not self.acks:
+            # A command that was never acknowledged is retried with the current targets, never stale ones
+            self.acks = AckWindow(self.writer, lambda joints: self.call(self.on_resend, joints))
+            self.acks.start()
+
+    def upgrade_transport(self):
+        if self.writer and not self.binary_commands:
+            # The firmware reads everything queued after the request as packets
+            self.writer.put("mode", binary_protocol.UPGRADE_REQUEST)
+            self.binary_commands = True
+
+    def handle_line(self, line):
+        # Runs on the reader thread, so a Mode:B switch applies before the next frame
+        frame = self.parser.parse_packet(line) if self.binary_feedback else self.parser.parse(line)
+        if frame.type == FrameType.ANGLES:
+            self.flow.returned()
+            self.on_angles(frame)
+        elif frame.type in (FrameType.BASE_POS, FrameType.STEPPER_POS):
+            self.flow.returned(busy_ended=True)
+            if self.on_base:
+                self.on_base(frame.angle)
+        elif frame.type == FrameType.CAPS:
+            self.pose_frames = b"P" in frame.caps
+            if self.binary_transport and b"B" in frame.caps:
+                self.call(self.upgrade_transport)
+            if self.acked_commands and b"A" in frame.caps:
+                self.call(self.enable_acks)
+        elif frame.type == FrameType.ACK and self.acks:
+            self.acks.ack(frame.sequence)
+        elif frame.type == FrameType.MODE and self.reader:
+            # Everything after this line is binary
+            self.binary_feedback = frame.mode == b"B"
+            self.reader.binary = self.binary_feedback
@@ -0,0 +1,250 @@
+"""Connecting, reconnecting and stopping, shared by the Tk control panels."""
+
+import tkinter as tk
+from tkinter import messagebox
+from connect import connect_async, open_port, ARM_PROBE
+from discovery import discover_async
+from port_watcher import PortWatcher
+from reconnect import ReconnectSupervisor
+from arm_link import ArmLink
+from telemetry_pump import TelemetryPump
+from scheduler import CommandScheduler, BASE_JOINT
+from trajectory import TrajectoryPlanner, TrajectoryStreamer
+
+
+class ArmPanel:
+    """The serial side of a control panel; the subclass builds the widgets.
+
+    ``__init__`` sets up the link, scheduler and reconnect supervisor before
+    any widget exists, and ``start`` starts feedback and port watching once
+    they do. The subclass provides ``port_combo``, ``connect_btn``,
+    ``status_label``, ``sliders``, ``angle_vars`` and
+    ``set_controls_state(state)``, and lists the firmware it expects first
+    in ``prefer``.
+    """
+
+    prefer = ()
+
+    def __init__(self, root, max_angles, base):
+        self.root = root
+        self.selected_port = tk.StringVar()
+        self.connected = False
+        self.max_angles = max_angles
+        # Feedback from the reader thread is applied to the labels on the Tk thread
+        self.telemetry = TelemetryPump(self.root)
+        # Encoding, writing and parsing, shared with daemon.py
+        self.link = ArmLink(self.max_angles, base, self.telemetry.call, self.post_angles,
+                            (lambda angle: self.telemetry.post(BASE_JOINT, angle)) if base else None,
+                            self.resend_joints, self.on_serial_error)
+
+        # Slider drags are coalesced per joint and flushed at the firmware's tick rate
+        self.command_rate_hz = 50
+        self.scheduler = CommandScheduler(self.root, self.link.send_batch, self.command_rate_hz)
+        # Opt-in: switch to the COBS binary transport when the firmware offers it
+        self.binary_transport = False
+        # Opt-in: number commands and keep a bounded window waiting for the firmware's Ack
+        self.acked_commands = False
+        # Opt-in: hold slider writes this long (0.0005-0.005 s) so a burst goes out as one write
+        self.write_linger = 0.0
+        # Opt-in: tick the scheduler on a thread with absolute deadlines instead of root.after
+        self.precise_ticks = False
+
+        # Opt-in: stream planned setpoints so every servo in a move arrives at the same time
+        self.smooth_moves = False
+        self.trajectory = TrajectoryStreamer(TrajectoryPlanner(self.max_angles), self.scheduler, self.commanded_angles)
+
+        # A dropped link is retried in the background and the last pose re-sent
+        self.reconnecting = False
+        self.supervisor = ReconnectSupervisor(
+            lambda result: self.telemetry.call(self.on_reconnected, *result),
+            on_attempt=lambda attempt, delay: self.telemetry.call(self.show_reconnect_attempt, attempt),
+            on_abandoned=lambda result: result[0].close())
+
+    def start(self):
+        self.telemetry.start()
+        self.port_watcher = PortWatcher(
+            lambda added, removed: self.telemetry.call(self.on_ports_changed, added, removed))
+        self.port_watcher.start()
+        self.set_controls_state('disabled')
+        # Escape stops the arm from anywhere in the window
+        self.root.bind("<Escape>", lambda event: self.emergency_stop())
+
+    def refresh_ports(self):
+        if not self.connected:
+            self.status_label.configure(text="Scanning ports...", bootstyle="warning")
+        # Ports are probed in parallel off the Tk thread, skipping the one in use
+        exclude = [self.selected_port.get()] if self.connected else []
+        discover_async(lambda candidates: self.telemetry.call(self.on_ports_discovered, candidates),
+                       exclude=exclude, prefer=self.prefer)
+
+    def on_ports_discovered(self, candidates):
+        for candidate in candidates:
+            baud = f" @ {candidate.baudrate}" if candidate.baudrate else ""
+            print(f"{candidate.device}: {candidate.firmware or 'unknown'}{baud}")
+        ports = [candidate.device for candidate in candidates]
+        if self.connected:
+            self.port_combo['values'] = [self.selected_port.get()] + ports
+            return
+
+        self.port_combo['values'] = ports
+        if ports:
+            self.port_combo.set(ports[0])
+        best = candidates[0] if candidates else None
+        if best and best.firmware:
+            self.status_label.configure(text=f"Disconnected ({best.firmware} on {best.device})",
+                                        bootstyle="danger")
+        else:
+            self.status_label.configure(text="Disconnected", bootstyle="danger")
+
+    def on_ports_changed(self, added, removed):
+        ports = [port for port in self.port_combo['values'] if port not in removed]
+        ports += [port for port in added if port not in ports]
+        self.port_combo['values'] = ports
+        if self.connected and self.selected_port.get() in removed:
+            # Don't wait for the next write to fail
+            print(f"{self.selected_port.get()} was unplugged")
+            self.on_link_lost()
+        elif self.reconnecting and self.selected_port.get() in added:
+            self.supervisor.wake()
+        elif not self.connected and self.selected_port.get() not in ports:
+            self.port_combo.set(ports[0] if ports else "")
+
+    def toggle_connection(self):
+        if self.reconnecting:
+            self.disconnect()
+        elif not self.connected:
+            port = self.selected_port.get()
+            self.connect_btn.configure(state='disabled')
+            self.status_label.configure(text="Connecting...", bootstyle="warning")
+            # Opening the port and waiting for the firmware happen off the Tk thread
+            connect_async(port, 115200,
+                          lambda *result: self.telemetry.call(self.on_connected, *result),
+                          probe=ARM_PROBE,
+                          on_progress=lambda t: self.telemetry.call(self.show_connect_progress, t))
+        else:
+            self.disconnect()
+
+    def show_connect_progress(self, elapsed):
+        if not self.connected:
+            self.status_label.configure(text=f"Connecting... {elapsed:.1f}s")
+
+    def on_connected(self, ser, banner, error):
+        self.connect_btn.configure(state='normal')
+        if error:
+            self.status_label.configure(text="Disconnected", bootstyle="danger")
+            messagebox.showerror("Connection Error", f"Failed to connect: {str(error)}")
+            return
+        try:
+            if banner is None:
+                print("No ready banner from firmware, continuing anyway")
+
+            # All output goes through the link's writer thread so a slow link can't freeze the UI
+            self.link.open(ser, banner, self.binary_transport, self.acked_commands, self.write_linger)
+            self.connected = True
+            self.scheduler.precise = self.precise_ticks
+            self.scheduler.start()
+
+            self.connect_btn.configure(text="🔌 Disconnect", bootstyle="danger")
+            self.status_label.configure(text="Connected", bootstyle="success")
+            self.set_controls_state('normal')
+
+        except Exception as e:
+            messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
+
+    def on_link_lost(self):
+        if not self.connected:
+            return
+        port = self.selected_port.get()
+        self.disconnect()
+        self.reconnecting = True
+        self.connect_btn.configure(text="✖ Cancel", bootstyle="warning")
+        self.status_label.configure(text="Reconnecting...", bootstyle="warning")
+        self.supervisor.start(lambda: open_port(port, 115200, probe=ARM_PROBE))
+
+    def show_reconnect_attempt(self, attempt):
+        if self.reconnecting:
+            self.status_label.configure(text=f"Reconnecting (attempt {attempt})...")
+
+    def on_reconnected(self, ser, banner):
+        if not self.reconnecting:
+            ser.close()
+            return
+        self.reconnecting = False
+        stats = self.supervisor.stats()
+        print(f"Reconnected after {stats['downtime_s_last']:.1f}s "
+              f"({stats['reconnects']} reconnects, {stats['downtime_s_total']:.1f}s total downtime)")
+        self.on_connected(ser, banner, None)
+        self.resend_targets()
+
+    def resend_targets(self):
+        # The board reset when the link came back, so restore the whole pose in one write
+        if self.connected:
+            self.scheduler.resend()
+
+    def disconnect(self):
+        self.supervisor.cancel()
+        self.reconnecting = False
+        if self.connected:
+            self.print_stats()
+        self.trajectory.cancel()
+        self.scheduler.stop()
+        self.link.print_stats()
+        self.link.close()
+        self.connected = False
+        self.connect_btn.configure(text="🔌 Connect", bootstyle="success")
+        self.status_label.configure(text="Disconnected", bootstyle="danger")
+        self.set_controls_state('disabled')
+
+    def print_stats(self):
+        stats = self.scheduler.stats()
+        print(f"Commands: {stats['sent']} sent, {stats['coalesced']} coalesced")
+        if 'ticks' in stats:
+            ticks = stats['ticks']
+            print(f"Ticks: {ticks['period_ms_avg']:.3f} ms avg period, {ticks['late_us_avg']:.0f} µs avg / "
+                  f"{ticks['late_us_max']:.0f} µs max late, {ticks['overruns']} overruns")
+        stats = self.trajectory.stats()
+        if stats['plans']:
+            print(f"Trajectories: {stats['plans']} planned at {stats['plan_us_avg']:.0f} µs avg, "
+                  f"{stats['setpoints']} setpoints")
+
+    def resend_joints(self, joints):
+        # A command that was never acknowledged is retried with the current targets, never stale ones
+        if self.connected:
+            self.scheduler.resend(joints)
+
+    def on_serial_error(self, e):
+        print(f"Serial error: {e}")
+        self.telemetry.call(self.on_link_lost)
+
+    def emergency_stop(self):
+        # Stop every servo where it is: ahead of everything queued, without waiting for credit
+        if not self.connected:
+            return
+        self.trajectory.cancel()
+        parser = self.link.parser
+        held = {i: min(parser.angles[i], self.max_angles[i])
+                for i in range(min(parser.joint_count, len(self.max_angles)))}
+        # Under the scheduler lock, so no tick slips a slider batch in after the stop
+        with self.scheduler.lock:
+            self.link.stop(held)
+            self.scheduler.hold(held)
+        for i, angle in held.items():
+            self.sliders[i].set(angle)
+            self.angle_vars[i].set(f"{angle}°")
+        print("Emergency stop")
+
+    def commanded_angles(self):
+        # Where a planned move starts from: the last target sent, else the reported angle
+        return [self.scheduler.targets.get(i, self.link.parser.angles[i]) for i in range(len(self.max_angles))]
+
+    def command_latency(self):
+        # Press-to-wire times per priority lane, see SerialWriter.latency_stats
+        return self.link.writer.latency_stats() if self.link.writer else {}
+
+    def post_angles(self, frame):
+        # Runs on the reader thread; the labels catch up on the Tk thread
+        for i in range(min(frame.joint_count, len(self.max_angles))):
+            self.telemetry.post(i, frame.angles[i])
+
+    def __del__(self):
+        self.disconnect()
@@ -0,0 +1,81 @@
+"""Writes saved and latency added by SerialWriter's aggregation window.
+
+Feeds the real SerialWriter bursts like one gesture produces: every 20 ms,
+one command per joint (as the acked mode and per-joint keys send them),
+``--spacing`` apart, plus a preset button every 250 ms. The port is
+/dev/null, so every write is a real syscall and nothing else is measured.
+Runs once without a window and once per ``--linger`` value and reports
+writes, bytes per write, syscalls saved and press-to-wire latency per lane.
+
+    python -m benchmarks.aggregation [--seconds 3] [--linger 0.0005 0.002 0.005]
+"""
+
+import argparse
+import json
+import os
+import time
+
+from serial_writer import SerialWriter, PRESET
+
+JOINTS = 5
+
+
+class NullSerial:
+    def __init__(self):
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+
+    def write(self, data):
+        return os.write(self.fd, data)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def run(linger, seconds, spacing):
+    ser = NullSerial()
+    writer = SerialWriter(ser, linger=linger)
+    writer.start()
+
+    start = time.perf_counter()
+    next_burst = next_press = start
+    angle = 20
+    while time.perf_counter() - start < seconds:
+        if time.perf_counter() >= next_press:
+            writer.put(frozenset(range(JOINTS)), b"9P90,90,90,90,90\n", priority=PRESET)
+            next_press += 0.25
+        angle = angle % 160 + 1
+        for joint in range(JOINTS):
+            writer.put(joint, f"{joint}{angle}\n".encode())
+            time.sleep(spacing)
+        next_burst += 0.02
+        time.sleep(max(0.0, next_burst - time.perf_counter()))
+    time.sleep(0.05)
+
+    stats = writer.stats()
+    writer.stop()
+    ser.close()
+    return {
+        "linger_ms": 1000 * linger,
+        "writes": stats["writes"],
+        "commands": stats["commands"],
+        "bytes_per_write": stats["bytes_per_write"],
+        "syscalls_saved": stats["syscalls_saved"],
+        "stream_ms": {key: stats["latency"]["stream"][key] for key in ("p50_ms", "p95_ms", "max_ms")},
+        "preset_ms": {key: stats["latency"]["preset"][key] for key in ("p50_ms", "p95_ms", "max_ms")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--linger", nargs="+", type=float, default=[0.0005, 0.002, 0.005],
+                        help="aggregation windows in seconds")
+    parser.add_argument("--spacing", type=float, default=0.0001, help="seconds between the commands of a burst")
+    args = parser.parse_args()
+
+    results = [run(linger, args.seconds, args.spacing) for linger in [0.0] + args.linger]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
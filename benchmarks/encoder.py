@@ -0,0 +1,70 @@
+"""Encode cost per command: per-write formatting against CommandEncoder's tables.
+
+Times what a scheduler tick pays to turn targets into bytes, for one joint,
+a five-joint batch as lines plus the base, and the same batch as a ``9P``
+frame. ``format`` is the f-string code the controllers used before; both
+produce identical bytes, which is checked before timing.
+
+    python -m benchmarks.encoder [--number 200000]
+"""
+
+import argparse
+import json
+import timeit
+
+from encoder import CommandEncoder
+from scheduler import BASE_JOINT
+
+MAX_ANGLES = [45, 180, 180, 180, 180]
+
+
+def format_command(joint, angle):
+    return f"{joint}{angle}\n".encode()
+
+
+def format_pose(angles):
+    fields = ",".join("" if angle is None else str(angle) for angle in angles)
+    return f"9P{fields.rstrip(',')}\n".encode()
+
+
+def format_batch(batch, pose_frames):
+    servos = [batch.get(i) for i in range(5)]
+    if pose_frames and sum(angle is not None for angle in servos) > 1:
+        data = format_pose(servos)
+    else:
+        data = b"".join(format_command(i, angle) for i, angle in enumerate(servos) if angle is not None)
+    if BASE_JOINT in batch:
+        data += format_command(BASE_JOINT, batch[BASE_JOINT])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200000, help="calls per measurement")
+    args = parser.parse_args()
+
+    encoder = CommandEncoder(MAX_ANGLES, base=True)
+    lines_batch = {0: 30, 1: 135, 2: 90, 3: 45, 4: 170, BASE_JOINT: 270}
+    pose_batch = {0: 30, 1: 135, 2: 90, 3: 45, 4: 170}
+    cases = {
+        "single": (lambda: format_command(3, 135), lambda: encoder.command(3, 135), 1),
+        "batch_lines": (lambda: format_batch(lines_batch, False), lambda: encoder.batch(lines_batch, False), 6),
+        "batch_pose": (lambda: format_batch(pose_batch, True), lambda: encoder.batch(pose_batch, True), 5),
+    }
+
+    results = {}
+    for name, (formatted, tabled, commands) in cases.items():
+        assert formatted() == tabled(), name
+        format_ns = min(timeit.repeat(formatted, number=args.number, repeat=5)) / args.number * 1e9
+        table_ns = min(timeit.repeat(tabled, number=args.number, repeat=5)) / args.number * 1e9
+        results[name] = {
+            "bytes": len(tabled()),
+            "format_ns_per_command": format_ns / commands,
+            "table_ns_per_command": table_ns / commands,
+            "speedup": format_ns / table_ns,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Lost and delivered commands with and without CreditFlow.
+
+Plays script3's worst case against the Motor_Check2 emulator on a pty:
+every joint slider streams a new target at ``--rate`` Hz while the base is
+sent back and forth every ``--base-interval`` seconds, so the sketch spends
+most of its time blocked in moveBaseToAngle. Commands go through the real
+SerialWriter (coalescing per joint) and feedback through SerialReader.
+
+Reports lines written, lines the sketch read intact, lines mangled or dropped
+in its RX buffer, and whether the final pose matches the last targets. With
+flow control fewer lines are written, because targets superseded during a
+base move are coalesced in the writer instead of queueing in the sketch.
+
+Flow control trades rate for loss. Without it the sketch still reads the
+~63 bytes that fit in its RX buffer during each move, stale by then, and
+drops the rest; with it nothing is sent during a move, so every line
+arrives but fewer arrive per second (about 128/s against 102/s at the
+defaults here). ``held_ratio`` is the share of the run spent held.
+
+    python -m benchmarks.flow [--seconds 5] [--rate 50]
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import time
+
+import serial
+
+from emulator import Emulator, MotorCheck2, PtyTransport
+from flow_control import CreditFlow, base_move_time
+from serial_reader import SerialReader
+from serial_writer import SerialWriter
+from telemetry import TelemetryParser, FrameType
+
+JOINTS = 5
+
+
+def run(use_flow, seconds, rate_hz, base_interval):
+    emulator = Emulator(functools.partial(MotorCheck2, boot_time=0.1), PtyTransport()).start()
+    ser = serial.serial_for_url(emulator.port, 115200, timeout=0.1)
+    time.sleep(0.3)
+
+    sketch = emulator.sketch
+    written = set()
+    intact = 0
+    handle = sketch.handle
+
+    def counting_handle(line):
+        nonlocal intact
+        intact += line in written
+        handle(line)
+    sketch.handle = counting_handle
+
+    flow = CreditFlow() if use_flow else None
+    parser = TelemetryParser()
+
+    def on_line(line):
+        frame = parser.parse(line)
+        if flow and frame.type == FrameType.ANGLES:
+            flow.returned()
+        elif flow and frame.type == FrameType.BASE_POS:
+            flow.returned(busy_ended=True)
+
+    writer = SerialWriter(ser, flow=flow)
+    reader = SerialReader(ser, on_line)
+    writer.start()
+    reader.start()
+
+    targets = {}
+    lines = 0
+    sweep = itertools.cycle(list(range(20, 161)) + list(range(160, 19, -1)))
+    bases = itertools.cycle((270, 0))
+    start = time.perf_counter()
+    next_tick = start
+    next_base = start
+    while time.perf_counter() - start < seconds:
+        now = time.perf_counter()
+        if now >= next_base:
+            angle = next(bases)
+            line = f"S{angle}"
+            busy_for = base_move_time(parser.base, angle)
+            writer.put("S", f"{line}\n".encode(), busy_for)
+            written.add(line)
+            targets["S"] = angle
+            lines += 1
+            next_base += base_interval
+        angle = next(sweep)
+        for joint in range(JOINTS):
+            value = min(angle, MotorCheck2.max_angles[joint])
+            line = f"{joint}{value}"
+            writer.put(joint, f"{line}\n".encode())
+            written.add(line)
+            targets[joint] = value
+        lines += JOINTS
+        next_tick += 1 / rate_hz
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+    elapsed = time.perf_counter() - start
+
+    # Let the last base move and anything held behind it finish
+    time.sleep(1.0 + base_move_time(0, 360))
+    final = dict(enumerate(sketch.target), S=sketch.base_angle)
+    writes = writer.writes
+    writer.stop()
+    reader.stop()
+    ser.close()
+    emulator.stop()
+
+    return {
+        "flow_control": use_flow,
+        "lines_queued": lines,
+        "lines_written": writes,
+        "lines_read_intact": intact,
+        # Read with bytes missing, e.g. "1" + "35" merging into joint 1 at 35
+        "lines_mangled": sketch.commands - intact,
+        "lines_dropped": writes - sketch.commands,
+        "rx_dropped_bytes": sketch.rx_dropped,
+        "delivered_ratio": intact / writes if writes else 0.0,
+        "delivered_per_s": intact / elapsed,
+        "final_pose_matches": all(final[joint] == angle for joint, angle in targets.items()),
+        "held_ratio": flow.hold_time / elapsed if flow else 0.0,
+        "flow": flow.stats() if flow else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rate", type=float, default=50.0, help="slider updates per second for every joint")
+    parser.add_argument("--base-interval", type=float, default=0.5, help="seconds between base moves")
+    args = parser.parse_args()
+
+    results = [run(use_flow, args.seconds, args.rate, args.base_interval) for use_flow in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Solve rate and convergence of IKSolver on reachable targets.
+
+Targets are the gripper positions of random poses within script3's limits,
+so every one is reachable. Each is solved from a warm seed (the target's
+pose with every joint nudged by ``--nudge`` degrees, as when jogging from
+the current feedback) and from a cold one (the sketch's home pose), in one
+batch and one at a time, by position alone and with the hand's pitch fixed.
+Reports solves per second, the share that converged, iterations and
+residual error, and how fast a cache hit answers.
+
+    python -m benchmarks.ik [--targets 20000] [--nudge 10]
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks.latency import percentiles
+from ik import IKSolver, ARM_MAX_ANGLES, BASE_RANGE
+from kinematics import ArmKinematics
+
+HOME = [0, 90, 90, 90, 90, 0]
+SINGLE = 500
+
+
+def random_poses(rng, n):
+    limits = np.array(list(ARM_MAX_ANGLES) + [BASE_RANGE], dtype=float)
+    return rng.uniform(0, 1, (n, len(limits))) * limits
+
+
+def outward_pitch(positions, orientations):
+    """The hand's pitch above the horizontal pointing away from the base axis."""
+    facing = np.arctan2(positions[:, 1], positions[:, 0])
+    away = np.abs((facing - orientations[:, 0] + np.pi) % (2 * np.pi) - np.pi) < np.pi / 2
+    return np.where(away, orientations[:, 1], np.pi - orientations[:, 1])
+
+
+def run(solver, targets, seeds, pitch):
+    started = time.perf_counter()
+    _, errors, converged, iterations = solver.solve_batch(targets, seeds, pitch)
+    elapsed = time.perf_counter() - started
+
+    # One at a time, as the GUI does, on a fresh cache so nothing hits
+    single = IKSolver(solver.kinematics, solver.max_angles)
+    n = min(SINGLE, len(targets))
+    seeds = np.broadcast_to(seeds, (len(targets), 6))
+    started = time.perf_counter()
+    for i in range(n):
+        single.solve(targets[i], seeds[i], None if pitch is None else pitch[i])
+    single_elapsed = time.perf_counter() - started
+
+    return {
+        "batch_solves_per_s": len(targets) / elapsed,
+        "single_solves_per_s": n / single_elapsed,
+        "converged": float(converged.mean()),
+        "iterations": percentiles(iterations.tolist()),
+        "error_mm": percentiles(errors.tolist()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=int, default=20000)
+    parser.add_argument("--nudge", type=float, default=10.0, help="degrees between the warm seed and the answer")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    kinematics = ArmKinematics()
+    solver = IKSolver(kinematics)
+    poses = random_poses(rng, args.targets)
+    targets, orientations = kinematics.forward_batch(poses, dtype=np.float64)
+    pitch = outward_pitch(targets, orientations)
+    limits = list(ARM_MAX_ANGLES) + [BASE_RANGE]
+    warm = np.clip(poses + rng.uniform(-args.nudge, args.nudge, poses.shape), 0, limits)
+    seeds = {"warm": warm, "cold": np.array(HOME, dtype=float)}
+
+    results = {}
+    for name, seed in seeds.items():
+        results[f"{name}_position"] = run(solver, targets, seed, None)
+        results[f"{name}_pitch"] = run(solver, targets, seed, pitch)
+
+    cached = IKSolver(kinematics)
+    cached.solve(targets[0], HOME)
+    results["cache_hit_us"] = min(timeit.repeat(lambda: cached.solve(targets[0], HOME), number=1000, repeat=5)) * 1e3
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Forward kinematics throughput: one pose, and N x 6 batches in float32 and float64.
+
+Random poses within Motor_Check2's limits. ``single`` is ``forward`` on one
+pose (plain floats); the batch rows are poses per second through
+``forward_batch`` into preallocated outputs, per batch size and dtype. The
+sweep row evaluates ``--sweep`` poses in ``--chunk`` sized batches, as a
+workspace scan would. float32 results are checked against float64.
+
+    python -m benchmarks.kinematics [--sweep 4000000] [--chunk 65536]
+"""
+
+import argparse
+import json
+import time
+import timeit
+
+import numpy as np
+
+from kinematics import ArmKinematics
+
+LIMITS = np.array([45, 180, 180, 180, 180, 360], dtype=float)
+
+
+def rate(func, poses, repeat=5):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    return poses / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 65536, 1000000])
+    parser.add_argument("--sweep", type=int, default=4000000)
+    parser.add_argument("--chunk", type=int, default=65536)
+    args = parser.parse_args()
+
+    kinematics = ArmKinematics()
+    rng = np.random.default_rng(1)
+    pose = [45, 90, 90, 90, 90, 0]
+    results = {"single_us": min(timeit.repeat(lambda: kinematics.forward(pose), number=20000, repeat=5)) / 20000 * 1e6}
+
+    for dtype in (np.float32, np.float64):
+        name = np.dtype(dtype).name
+        for size in args.sizes:
+            poses = rng.random((size, 6)) * LIMITS
+            out = (np.empty((size, 3), dtype), np.empty((size, 3), dtype))
+            results[f"{name}_{size}_poses_per_s"] = rate(lambda: kinematics.forward_batch(poses, out, dtype), size)
+
+    poses = rng.random((args.sizes[0], 6)) * LIMITS
+    exact, _ = kinematics.forward_batch(poses, dtype=np.float64)
+    approx, _ = kinematics.forward_batch(poses)
+    results["float32_max_error"] = float(np.abs(exact - approx).max())
+
+    chunk = rng.random((args.chunk, 6)) * LIMITS
+    out = (np.empty((args.chunk, 3), np.float32), np.empty((args.chunk, 3), np.float32))
+    start = time.perf_counter()
+    for _ in range(args.sweep // args.chunk):
+        kinematics.forward_batch(chunk, out)
+    results["sweep_poses_per_s"] = (args.sweep // args.chunk) * args.chunk / (time.perf_counter() - start)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""End-to-end command latency: slider event to label update, per stage.
+
+Drives a controller (``controller``, ``script1`` or ``script3``) against the
+in-process firmware emulator on a pty, under Xvfb when there is no display.
+Each sample moves one joint by 1 degree and timestamps every stage:
+
+    callback   update_servo runs for the synthetic <B1-Motion> event
+    encode     the scheduler tick encodes the command
+    write      the writer thread hands the bytes to ser.write
+    firmware   the emulated sketch handles the command line
+    parse      an Angles: frame reporting the new angle is parsed
+    label      the telemetry pump drains that frame onto the Tk thread
+
+A drag phase then streams events at a fixed rate to measure throughput.
+Each configuration runs in its own process and the combined results are
+printed as JSON.
+
+    python -m benchmarks.latency --controller script1 script3 --rate 50 100
+"""
+
+import argparse
+import contextlib
+import functools
+import importlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+STAGES = ("callback", "encode", "write", "firmware", "parse", "label")
+CONTROLLERS = {
+    "controller": ("controller", "MotorController", "motor_check2"),
+    "script1": ("script1", "ArmController", "motor_check3"),
+    "script3": ("script3", "ArmController", "motor_check2"),
+}
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+    return {"p50": pick(50), "p95": pick(95), "p99": pick(99), "max": ordered[-1]}
+
+
+class TimedSerial:
+    """Forwards to the real port and timestamps every write."""
+
+    def __init__(self, ser, on_write):
+        self._ser = ser
+        self._on_write = on_write
+
+    def write(self, data):
+        self._on_write(data)
+        return self._ser.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+
+class Harness:
+    def __init__(self, controller, rate_hz, baudrate, boot_time=0.2):
+        import tkinter as tk
+        from emulator import Emulator, PtyTransport, SKETCHES
+
+        module_name, class_name, sketch = CONTROLLERS[controller]
+        app_cls = getattr(importlib.import_module(module_name), class_name)
+
+        self.emulator = Emulator(functools.partial(SKETCHES[sketch], baudrate=baudrate, boot_time=boot_time),
+                                 PtyTransport()).start()
+        self.root = tk.Tk()
+        self.app = app_cls(self.root)
+        self.app.scheduler.interval_ms = max(1, round(1000 / rate_hz))
+
+        self.joint = 0
+        self.target = None
+        self.marks = {}
+        self._instrument()
+
+    def _mark(self, stage):
+        self.marks.setdefault(stage, time.perf_counter())
+
+    def _instrument(self):
+        app = self.app
+
+        update_servo = app.update_servo
+        def timed_update_servo(servo_num, val):
+            self._mark("callback")
+            update_servo(servo_num, val)
+        app.update_servo = timed_update_servo
+
+        encode_batch = app.link.encode_batch
+        def timed_encode_batch(batch):
+            if batch.get(self.joint) == self.target:
+                self._mark("encode")
+            return encode_batch(batch)
+        app.link.encode_batch = timed_encode_batch
+
+        handle_line = app.link.handle_line
+        def timed_handle_line(line):
+            handle_line(line)
+            parser = app.link.parser
+            if (self.target is not None and parser.joint_count > self.joint
+                    and parser.angles[self.joint] == self.target):
+                self._mark("parse")
+        app.link.handle_line = timed_handle_line
+
+        drain = app.telemetry._drain
+        def timed_drain():
+            drain()
+            if "parse" in self.marks:
+                self._mark("label")
+        app.telemetry._drain = timed_drain
+
+    def _instrument_link(self):
+        expected = lambda: f"{self.joint}{self.target}".encode()
+
+        def on_write(data):
+            if expected() + b"\n" in data:
+                self._mark("write")
+        self.app.link.writer.ser = TimedSerial(self.app.link.writer.ser, on_write)
+
+        sketch = self.emulator.sketch
+        handle = sketch.handle
+        def timed_handle(line):
+            if line.encode() == expected():
+                self._mark("firmware")
+            handle(line)
+        sketch.handle = timed_handle
+
+    def pump_until(self, predicate, timeout):
+        deadline = time.perf_counter() + timeout
+        while not predicate() and time.perf_counter() < deadline:
+            self.root.update()
+            # Let the writer, reader and emulator threads have the GIL
+            time.sleep(0.0002)
+        return predicate()
+
+    def connect(self):
+        self.pump_until(lambda: False, 0.1)
+        self.app.selected_port.set(self.emulator.port)
+        self.app.toggle_connection()
+        if not self.pump_until(lambda: self.app.connected, 10):
+            raise RuntimeError(f"could not connect to the emulator on {self.emulator.port}")
+        self._instrument_link()
+        self.pump_until(lambda: False, 0.2)
+
+    def inject(self, joint, angle):
+        slider = self.app.sliders[joint]
+        slider.set(angle)
+        slider.event_generate("<B1-Motion>", x=1, y=1)
+
+    def sample(self, joint, angle, timeout=1.0):
+        self.joint = joint
+        self.target = angle
+        self.marks = {}
+        start = time.perf_counter()
+        self.inject(joint, angle)
+        if "callback" not in self.marks:
+            # The event didn't reach the binding, call it the way the binding would
+            self.app.update_servo(joint, angle)
+        self.pump_until(lambda: "label" in self.marks, timeout)
+        return {stage: (self.marks[stage] - start) * 1000 for stage in STAGES if stage in self.marks}
+
+    def limit(self, joint):
+        # controller.py allows the gripper 180° but Motor_Check2 clamps it at 45, and a
+        # clamped command is never reported back
+        return min(self.app.max_angles[joint], self.emulator.sketch.max_angles[joint])
+
+    def latency(self, samples):
+        results = {stage: [] for stage in STAGES}
+        completed = 0
+        joints = min(len(self.app.sliders), self.app.link.parser.joint_count)
+        for i in range(samples):
+            joint = i % joints
+            # Step one degree from the reported position so the firmware
+            # reports the new angle on its next 15 ms tick
+            current = self.app.link.parser.angles[joint]
+            angle = current + 1 if current < self.limit(joint) else current - 1
+            marks = self.sample(joint, angle)
+            completed += "label" in marks
+            for stage, value in marks.items():
+                results[stage].append(value)
+        return completed, {stage: percentiles(values) for stage, values in results.items()}
+
+    def drag(self, seconds, event_hz):
+        app = self.app
+        joint = 1
+        writes = app.link.writer.writes
+        commands = self.emulator.sketch.commands
+        frames = app.link.parser.frames
+        start = time.perf_counter()
+        sweep = itertools.cycle(list(range(0, 181)) + list(range(180, -1, -1)))
+        events = 0
+        next_event = start
+        while time.perf_counter() - start < seconds:
+            self.inject(joint, min(next(sweep), self.limit(joint)))
+            events += 1
+            next_event += 1 / event_hz
+            self.pump_until(lambda: time.perf_counter() >= next_event, 1)
+        elapsed = time.perf_counter() - start
+        self.pump_until(lambda: False, 0.3)
+        sketch = self.emulator.sketch
+        return {
+            "events_per_s": events / elapsed,
+            "writes_per_s": (app.link.writer.writes - writes) / elapsed,
+            "firmware_commands_per_s": (sketch.commands - commands) / elapsed,
+            "feedback_frames_per_s": (app.link.parser.frames - frames) / elapsed,
+            "coalesced": app.scheduler.coalesced,
+            "rx_dropped_bytes": sketch.rx_dropped,
+        }
+
+    def close(self):
+        self.app.disconnect()
+        self.root.destroy()
+        self.emulator.stop()
+
+
+def run_one(config):
+    harness = Harness(config["controller"], config["rate_hz"], config["baudrate"])
+    try:
+        harness.connect()
+        completed, stages = harness.latency(config["samples"])
+        throughput = harness.drag(config["drag_seconds"], config["drag_hz"])
+    finally:
+        harness.close()
+    return dict(config, completed=completed, latency_ms=stages, throughput=throughput)
+
+
+def ensure_display():
+    """Start Xvfb for the child processes when there is no display."""
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        sys.exit("No DISPLAY and Xvfb is not installed")
+    display = ":97"
+    xvfb = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return xvfb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--controller", nargs="+", choices=sorted(CONTROLLERS), default=["script1"])
+    parser.add_argument("--rate", nargs="+", type=float, default=[50.0], help="scheduler flush rates in Hz")
+    parser.add_argument("--baudrate", type=int, default=115200, help="emulated link speed")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--drag-seconds", type=float, default=3.0)
+    parser.add_argument("--drag-hz", type=float, default=200.0, help="synthetic <B1-Motion> events per second")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        # Child process: the controller prints on every slider move, keep stdout for the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            result = run_one(json.loads(args.one))
+        print(json.dumps(result))
+        return
+
+    xvfb = ensure_display()
+    results = []
+    try:
+        for controller, rate in itertools.product(args.controller, args.rate):
+            config = {
+                "controller": controller, "rate_hz": rate, "baudrate": args.baudrate,
+                "samples": args.samples, "drag_seconds": args.drag_seconds, "drag_hz": args.drag_hz,
+            }
+            child = subprocess.run([sys.executable, "-m", "benchmarks.latency", "--one", json.dumps(config)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            if child.returncode:
+                results.append(dict(config, error=f"exit status {child.returncode}"))
+            else:
+                results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    finally:
+        if xvfb:
+            xvfb.terminate()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
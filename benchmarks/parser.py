@@ -0,0 +1,74 @@
+"""Lines/second of TelemetryParser against the old decode/split/int path.
+
+    python -m benchmarks.parser [--lines 200000]
+"""
+
+import argparse
+import json
+import time
+
+from telemetry import TelemetryParser
+
+CORPUS = [
+    b"Angles:45,90,90,90,",
+    b"Angles:45,91,90,89,",
+    b"Angles:44,92,90,88,135,",
+    b"Angles:0,180,180,180,180,",
+    b"BasePos:270",
+    b"StepperPos:90",
+]
+
+
+class LegacyParser:
+    """The decode/split/int parsing each controller's handle_line used."""
+
+    def __init__(self):
+        self.angles = [0] * 5
+        self.base = 0
+
+    def parse(self, line):
+        data = bytes(line).decode().strip()
+        if data.startswith("Angles:"):
+            angles = data[7:].split(',')
+            for i, angle in enumerate(angles[:5]):
+                if angle:
+                    self.angles[i] = int(angle)
+        elif data.startswith("BasePos:") or data.startswith("StepperPos:"):
+            self.base = int(data.split(':')[1])
+
+
+def run(parser_cls, lines):
+    parse = parser_cls().parse
+    for line in lines:
+        parse(line)
+
+
+def measure(parser_cls, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(parser_cls, lines)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--lines", type=int, default=200000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    # Lines arrive from SerialReader as memoryviews into its buffer
+    buffers = [bytearray(CORPUS[i % len(CORPUS)]) for i in range(args.lines)]
+    lines = [memoryview(buf) for buf in buffers]
+
+    results = {
+        "legacy_lines_per_s": measure(LegacyParser, lines, args.repeat),
+        "parser_lines_per_s": measure(TelemetryParser, lines, args.repeat),
+    }
+    results["speedup"] = results["parser_lines_per_s"] / results["legacy_lines_per_s"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
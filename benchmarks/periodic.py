@@ -0,0 +1,136 @@
+"""Period accuracy of PeriodicScheduler against plain sleep loops, under load.
+
+Ticks at ``--period`` for ``--seconds`` three ways and timestamps every tick:
+
+    sleep      time.sleep(period) after each tick, like a naive streaming loop
+    deadline   absolute perf_counter deadlines, sleeping all the way
+    hybrid     PeriodicScheduler: absolute deadlines, sleep then spin
+
+Each tick does ``--work`` seconds of busy work, like encoding a batch. With
+``--load N`` the runs repeat with N processes spinning on the CPU and a
+thread in this process competing for the GIL, like the Tk thread parsing
+telemetry. Reports the achieved average period, drift (how far the last tick
+is from the nearest point on the grid), grid slots missed, interval error
+percentiles and a histogram of interval errors.
+
+    python -m benchmarks.periodic [--period 0.015] [--seconds 5] [--load 4]
+"""
+
+import argparse
+import bisect
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from benchmarks.latency import percentiles
+from periodic import PeriodicScheduler, JITTER_EDGES_US, jitter_labels
+
+
+def spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def burn(stop):
+    while not stop.is_set():
+        sum(range(10000))
+
+
+def run_sleep(period, seconds, work):
+    stamps = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        time.sleep(period)
+        stamps.append(time.perf_counter())
+        spin(work)
+    return stamps
+
+
+def run_deadline(period, seconds, work):
+    stamps = []
+    deadline = start = time.perf_counter()
+    while deadline - start < seconds:
+        deadline += period
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        stamps.append(time.perf_counter())
+        spin(work)
+    return stamps
+
+
+def run_hybrid(period, seconds, work):
+    stamps = []
+
+    def tick():
+        stamps.append(time.perf_counter())
+        spin(work)
+
+    scheduler = PeriodicScheduler(period, tick)
+    scheduler.start()
+    time.sleep(seconds)
+    scheduler.stop()
+    return stamps
+
+
+MODES = {"sleep": run_sleep, "deadline": run_deadline, "hybrid": run_hybrid}
+
+
+def summarize(stamps, period):
+    intervals = [b - a for a, b in zip(stamps, stamps[1:])]
+    errors_us = [1e6 * abs(interval - period) for interval in intervals]
+    histogram = [0] * (len(JITTER_EDGES_US) + 1)
+    for error in errors_us:
+        histogram[bisect.bisect_left(JITTER_EDGES_US, error)] += 1
+    elapsed = stamps[-1] - stamps[0]
+    # Grid slots between the first and last tick; skipped ones are missed, not drift
+    slots = round(elapsed / period)
+    return {
+        "ticks": len(stamps),
+        "period_ms_avg": 1000 * elapsed / len(intervals),
+        "drift_ms": 1000 * (elapsed - slots * period),
+        "missed_slots": slots - len(intervals),
+        "interval_error_us": percentiles(errors_us),
+        "histogram": dict(zip(jitter_labels(), histogram)),
+    }
+
+
+def measure(period, seconds, work, load):
+    stop_processes = multiprocessing.Event()
+    processes = [multiprocessing.Process(target=burn, args=(stop_processes,), daemon=True) for _ in range(load)]
+    stop_thread = threading.Event()
+    gil_thread = threading.Thread(target=burn, args=(stop_thread,), daemon=True) if load else None
+    for process in processes:
+        process.start()
+    if gil_thread:
+        gil_thread.start()
+    try:
+        return {mode: summarize(run(period, seconds, work), period) for mode, run in MODES.items()}
+    finally:
+        stop_processes.set()
+        stop_thread.set()
+        for process in processes:
+            process.join(1)
+        if gil_thread:
+            gil_thread.join(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--period", type=float, default=0.015, help="seconds, the firmware's servo tick")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--work", type=float, default=0.0002, help="busy seconds per tick")
+    parser.add_argument("--load", type=int, default=os.cpu_count(), help="CPU-bound processes for the loaded run")
+    args = parser.parse_args()
+
+    results = {"idle": measure(args.period, args.seconds, args.work, 0)}
+    if args.load:
+        results[f"load_{args.load}"] = measure(args.period, args.seconds, args.work, args.load)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Button press-to-wire latency under slider traffic, with and without priority lanes.
+
+Streams slider batches into the real SerialWriter faster than the link can
+carry them, so its queue stays full, and presses a button every
+``--press-interval`` seconds: alternately a preset (every joint to a new
+angle, ``PRESET``) and a hold (``9H``, ``STOP``). The port is a stand-in whose
+``write`` blocks for as long as the bytes take at ``--baudrate``, like a full
+OS buffer, so the numbers don't depend on a pty or a board.
+
+With lanes off every command is ``STREAM`` and a press waits behind the whole
+queue; with lanes on it waits for at most the write already in progress.
+Reports press-to-wire milliseconds (``put`` until the write returns) for both
+kinds of press and how many queued slider commands were preempted.
+
+The acked runs send the sliders through an AckWindow, acknowledged
+``--ack-delay`` seconds after each write, and count slider commands
+submitted before a stop but written after it (``stream_after_stop``). Those
+move the arm away from the hold. They come from the window's backlog
+unless the stop clears it first, as the controllers do.
+
+    python -m benchmarks.priority [--seconds 5] [--baudrate 9600]
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+
+from benchmarks.latency import percentiles
+from ack_window import AckWindow
+from serial_writer import SerialWriter, STOP, PRESET, STREAM
+
+JOINTS = 5
+
+
+class WireSerial:
+    """A port that takes as long to write as the bytes take on the wire."""
+
+    def __init__(self, baudrate, on_write):
+        self.baudrate = baudrate
+        self.on_write = on_write
+
+    def write(self, data):
+        time.sleep(len(data) * 10 / self.baudrate)
+        self.on_write(data)
+        return len(data)
+
+
+def encode_pose(pose):
+    fields = ",".join(str(pose.get(i, "")) for i in range(JOINTS))
+    return f"9P{fields.rstrip(',')}\n".encode()
+
+
+def run(lanes, seconds, baudrate, rate_hz, press_interval, acked=False, clear_on_stop=False, ack_delay=0.005):
+    pressed = {}
+    latencies = {PRESET: [], STOP: []}
+    # id(data) -> (submitted_at, data) for acked slider commands
+    submitted = {}
+    last_stop_written = 0.0
+    stream_after_stop = 0
+
+    def on_write(data):
+        nonlocal last_stop_written, stream_after_stop
+        press = pressed.pop(id(data), None)
+        if press:
+            priority, pressed_at, _ = press
+            latencies[priority].append(1000 * (time.perf_counter() - pressed_at))
+            if priority == STOP:
+                last_stop_written = max(last_stop_written, pressed_at)
+            return
+        command = submitted.pop(id(data), None)
+        if command:
+            stream_after_stop += command[0] < last_stop_written
+            seq = int(data[data.rindex(b"#") + 1:-1])
+            threading.Timer(ack_delay, acks.ack, (seq,)).start()
+
+    writer = SerialWriter(WireSerial(baudrate, on_write))
+    writer.start()
+    acks = AckWindow(writer, lambda key: None) if acked else None
+    if acks:
+        acks.start()
+
+    def send_acked(batch):
+        line = encode_pose(batch)
+        submitted_at = time.perf_counter()
+
+        def encode(seq):
+            data = line[:-1] + b"#%d\n" % seq
+            submitted[id(data)] = (submitted_at, data)
+            return data
+        acks.send(frozenset(batch), encode)
+
+    rng = random.Random(1)
+    sweep = itertools.cycle(list(range(20, 161)) + list(range(160, 19, -1)))
+    buttons = itertools.cycle((PRESET, STOP))
+    everything = frozenset(range(JOINTS))
+    start = time.perf_counter()
+    next_tick = next_press = start
+    while time.perf_counter() - start < seconds:
+        now = time.perf_counter()
+        if now >= next_press:
+            priority = next(buttons)
+            if priority == PRESET:
+                data = encode_pose({joint: rng.randrange(0, 46) for joint in range(JOINTS)})
+            else:
+                data = b"9H\n"
+            # Holding on to data keeps its id unique until it is written
+            pressed[id(data)] = (priority, time.perf_counter(), data)
+            if acks and clear_on_stop and priority == STOP:
+                acks.clear()
+            writer.put(everything, data, priority=priority if lanes else STREAM)
+            next_press += press_interval
+        # Dragging a few sliders at once: each tick's batch moves a different set of joints
+        angle = next(sweep)
+        batch = {joint: angle for joint in rng.sample(range(JOINTS), rng.randint(1, 3))}
+        if acks:
+            send_acked(batch)
+        else:
+            writer.put(frozenset(batch), encode_pose(batch))
+        next_tick += 1 / rate_hz
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    stats = writer.stats()
+    if acks:
+        acks.stop()
+    writer.stop()
+    result = {
+        "lanes": lanes,
+        "baudrate": baudrate,
+        "writes": stats["writes"],
+        "dropped": stats["dropped"],
+        "preempted": stats["preempted"],
+        "preset_ms": percentiles(latencies[PRESET]),
+        "stop_ms": percentiles(latencies[STOP]),
+        "unwritten_presses": len(pressed),
+    }
+    if acked:
+        result.update(acked=True, clear_on_stop=clear_on_stop, stream_after_stop=stream_after_stop)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--rate", type=float, default=100.0, help="slider batches per second")
+    parser.add_argument("--press-interval", type=float, default=0.1, help="seconds between button presses")
+    parser.add_argument("--ack-delay", type=float, default=0.005, help="seconds from a write to its ack")
+    args = parser.parse_args()
+
+    results = [run(lanes, args.seconds, args.baudrate, args.rate, args.press_interval) for lanes in (False, True)]
+    results += [run(True, args.seconds, args.baudrate, args.rate, args.press_interval, acked=True,
+                    clear_on_stop=clear, ack_delay=args.ack_delay) for clear in (False, True)]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""ASCII lines against the COBS binary transport at the same baud rate.
+
+Runs the Motor_Check2 model in simulated time, so the numbers come from the
+modelled link and firmware rather than from this machine's scheduler:
+
+    commands   the host keeps the wire busy with 5-joint poses; poses applied
+               per second as per-joint lines, one ``9P`` line, and POSE packets
+    feedback   every joint sweeps end to end; Angles frames per second the
+               host receives and parses as lines and as packets
+
+The feedback sketch reports every 15 ms, so at 115200 baud both encodings
+reach that cap; at 9600 the ASCII lines saturate the link first.
+
+    python -m benchmarks.protocol [--baudrate 115200 9600] [--seconds 5]
+"""
+
+import argparse
+import itertools
+import json
+
+import binary_protocol
+from emulator import MotorCheck2
+from serial_reader import SerialReader
+from telemetry import TelemetryParser, FrameType
+
+STEP = 0.0005
+JOINTS = 5
+
+
+def poses():
+    # Alternate every joint between two angles so each pose really moves it
+    for angle in itertools.cycle((40, 140)):
+        yield {joint: min(angle, MotorCheck2.max_angles[joint]) for joint in range(JOINTS)}
+
+
+def encode_lines(pose):
+    return b"".join(f"{joint}{angle}\n".encode() for joint, angle in pose.items())
+
+
+def encode_pose_line(pose):
+    return f"9P{','.join(str(pose[joint]) for joint in range(JOINTS))}\n".encode()
+
+
+def booted_sketch(baudrate, binary):
+    sketch = MotorCheck2(baudrate=baudrate, boot_time=0)
+    sketch.advance(0)
+    if binary:
+        sketch.receive(binary_protocol.UPGRADE_REQUEST)
+        # Let the "Mode:B" reply clear the wire before measuring
+        sketch.advance(0.1)
+    sketch.take_output()
+    return sketch
+
+
+def commands(baudrate, seconds, encode, binary=False):
+    sketch = booted_sketch(baudrate, binary)
+    start_commands = sketch.commands
+    source = poses()
+    size = len(encode(next(source)))
+    now = sketch.now
+    end = now + seconds
+    while now < end:
+        # Keep one pose queued behind the one on the wire, like a busy writer
+        if len(sketch._wire) < size:
+            sketch.receive(encode(next(source)))
+        now += STEP
+        sketch.advance(now)
+        sketch.take_output()
+    applied = sketch.commands - start_commands
+    lines_per_pose = JOINTS if encode is encode_lines else 1
+    return {
+        "bytes_per_pose": size,
+        "poses_per_s": applied / lines_per_pose / seconds,
+        "rx_dropped": sketch.rx_dropped,
+    }
+
+
+def feedback(baudrate, seconds, binary=False):
+    sketch = booted_sketch(baudrate, binary)
+    parser = TelemetryParser()
+    frames = 0
+
+    def on_line(line):
+        nonlocal frames
+        frame = parser.parse_packet(line) if binary else parser.parse(line)
+        frames += frame.type == FrameType.ANGLES
+
+    reader = SerialReader(None, on_line)
+    reader.binary = binary
+    received = 0
+    now = sketch.now
+    end = now + seconds
+    sweep = itertools.cycle(({joint: 0 for joint in range(JOINTS)}, {joint: 180 for joint in range(JOINTS)}))
+    while now < end:
+        if sketch.current == sketch.target:
+            sketch.apply_pose(next(sweep))
+        now += STEP
+        sketch.advance(now)
+        out = sketch.take_output()
+        received += len(out)
+        reader.feed(out)
+    return {
+        "bytes_per_frame": received / frames if frames else None,
+        "frames_per_s": frames / seconds,
+        "malformed": parser.malformed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baudrate", nargs="+", type=int, default=[115200, 9600])
+    parser.add_argument("--seconds", type=float, default=5.0, help="simulated seconds per run")
+    args = parser.parse_args()
+
+    results = []
+    for baudrate in args.baudrate:
+        results.append({
+            "baudrate": baudrate,
+            "commands": {
+                "ascii_lines": commands(baudrate, args.seconds, encode_lines),
+                "ascii_pose": commands(baudrate, args.seconds, encode_pose_line),
+                "binary": commands(baudrate, args.seconds, binary_protocol.encode_pose, binary=True),
+            },
+            "feedback": {
+                "ascii": feedback(baudrate, args.seconds),
+                "binary": feedback(baudrate, args.seconds, binary=True),
+            },
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
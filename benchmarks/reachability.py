@@ -0,0 +1,88 @@
+"""Build time, size and query cost of the workspace reachability map.
+
+Builds a map at ``--voxel`` into a temporary directory, then looks up
+random points one at a time and in one batch, against asking IKSolver
+from the home pose, and reports how often the two agree (they differ only
+at the edge of the workspace, within a voxel). Also reports how much of
+the file the queries paged in and how close a map seed lands to reachable
+targets, which is where an IK solve started from it begins, and checks that
+the map is refused for an arm with other link lengths.
+
+    python -m benchmarks.reachability [--voxel 10] [--points 20000] [--workers 4]
+"""
+
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.ik import random_poses, HOME
+from ik import IKSolver
+from kinematics import ArmKinematics
+from reachability import ReachabilityMap, build
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--voxel", type=float, default=10.0)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    kinematics = ArmKinematics()
+    rng = np.random.default_rng(1)
+    radius = sum(kinematics.links)
+    points = rng.uniform(-radius, radius, (args.points, 3)) + [0, 0, kinematics.base_height]
+    targets, _ = kinematics.forward_batch(random_poses(rng, args.points), dtype=np.float64)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "workspace.npy")
+        started = time.perf_counter()
+        metadata = build(path, args.voxel, workers=args.workers, kinematics=kinematics)
+        build_s = time.perf_counter() - started
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        workspace = ReachabilityMap(path, kinematics)
+        started = time.perf_counter()
+        single = [workspace.reachable(point) for point in points.tolist()]
+        single_us = (time.perf_counter() - started) / len(points) * 1e6
+        started = time.perf_counter()
+        _, found = workspace.seeds(points)
+        batch_us = (time.perf_counter() - started) / len(points) * 1e6
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        solver = IKSolver(kinematics)
+        started = time.perf_counter()
+        _, _, converged, _ = solver.solve_batch(points, HOME)
+        ik_us = (time.perf_counter() - started) / len(points) * 1e6
+
+        seeds, seeded = workspace.seeds(targets)
+        landed, _ = kinematics.forward_batch(seeds[seeded], dtype=np.float64)
+        seed_mm = np.linalg.norm(landed - targets[seeded], axis=1)
+
+        results = {
+            "voxel": args.voxel,
+            "shape": metadata["shape"],
+            "build_s": build_s,
+            "file_mb": os.path.getsize(path) / 2 ** 20,
+            "reachable_voxels": metadata["reachable"],
+            "query_us": single_us,
+            "batch_query_us": batch_us,
+            "ik_us": ik_us,
+            "agreement_with_ik": float((found == converged).mean()),
+            "reachable_targets_found": float(seeded.mean()),
+            "seed_error_mm": {"p50": float(np.percentile(seed_mm, 50)), "max": float(seed_mm.max())},
+            # ru_maxrss is in kilobytes on Linux
+            "query_rss_growth_mb": (rss_after - rss_before) / 1024,
+            "single_matches_batch": single == found.tolist(),
+            "refused_for_other_links": not ReachabilityMap(path, ArmKinematics(upper_arm=200, forearm=200)).available,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare the old in_waiting/sleep(0.01) poll loop with SerialReader.
+
+Runs both readers against a pseudo-terminal fed with Motor_Check3 style
+``Angles:`` lines every 15 ms, then leaves the port idle. Reports per-line
+delivery latency and process CPU time for each phase. POSIX only.
+
+    python -m benchmarks.reader [--lines 400] [--idle 3]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import serial
+
+from serial_reader import SerialReader
+
+LINE = b"Angles:45,90,90,90,\r\n"
+
+
+class PollingReader:
+    """The loop every controller used before SerialReader."""
+
+    def __init__(self, ser, on_line):
+        self.ser = ser
+        self.on_line = on_line
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        while self.running:
+            if self.ser.in_waiting:
+                data = self.ser.readline().decode().strip()
+                self.on_line(data)
+            time.sleep(0.01)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(reader_cls, lines, interval, idle):
+    master, slave = os.openpty()
+    ser = serial.Serial(os.ttyname(slave), 115200, timeout=1)
+    sent = deque()
+    latencies = []
+    done = threading.Event()
+
+    def on_line(line):
+        latencies.append(time.perf_counter() - sent.popleft())
+        if len(latencies) == lines:
+            done.set()
+
+    reader = reader_cls(ser, on_line)
+    reader.start()
+
+    cpu_start = time.process_time()
+    next_send = time.perf_counter()
+    for _ in range(lines):
+        next_send += interval
+        time.sleep(max(0.0, next_send - time.perf_counter()))
+        sent.append(time.perf_counter())
+        os.write(master, LINE)
+    done.wait(5)
+    busy_cpu = time.process_time() - cpu_start
+
+    cpu_start = time.process_time()
+    time.sleep(idle)
+    idle_cpu = time.process_time() - cpu_start
+
+    reader.stop()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+    return {
+        "lines": len(latencies),
+        "latency_ms_p50": 1000 * statistics.median(latencies),
+        "latency_ms_p95": 1000 * percentile(latencies, 95),
+        "latency_ms_max": 1000 * max(latencies),
+        "busy_cpu_s": busy_cpu,
+        "idle_cpu_pct": 100 * idle_cpu / idle,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--interval", type=float, default=0.015, help="seconds between lines")
+    parser.add_argument("--idle", type=float, default=3.0, help="seconds of idle port to measure")
+    args = parser.parse_args()
+
+    results = {
+        "polling": run(PollingReader, args.lines, args.interval, args.idle),
+        "serial_reader": run(SerialReader, args.lines, args.interval, args.idle),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
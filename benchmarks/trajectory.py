@@ -0,0 +1,100 @@
+"""Planning cost and arrival spread of TrajectoryPlanner against raw targets.
+
+Plans random five-servo moves for script3's joint limits and times a fresh
+plan, a re-plan mid-move (as a slider drag does) and sampling one setpoint.
+Then runs every move through a model of the sketches' servo loop, which
+steps each servo 1° per 15 ms toward its target, fed either the goal at once
+or the plan's setpoints at ``--rate``, and reports how far apart the servos
+arrive: with raw targets the short moves finish first.
+
+    python -m benchmarks.trajectory [--moves 2000] [--rate 50]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+import numpy as np
+
+from benchmarks.latency import percentiles
+from trajectory import TrajectoryPlanner, PROFILES
+
+MAX_ANGLES = [45, 180, 180, 180, 180]
+MOVE_INTERVAL = 0.015
+
+
+def arrivals(start, setpoints, rate_hz):
+    """Seconds until each servo reaches its last setpoint, stepping like the sketch."""
+    current = np.array(start, dtype=int)
+    goal = setpoints[-1]
+    arrived = np.full(len(current), np.nan)
+    arrived[current == goal] = 0.0
+    t = 0.0
+    while np.isnan(arrived).any():
+        t += MOVE_INTERVAL
+        # The newest setpoint sent by now is the target
+        target = setpoints[min(int(t * rate_hz), len(setpoints) - 1)]
+        current += np.sign(target - current)
+        arrived[np.isnan(arrived) & (current == goal)] = t
+    return arrived
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--moves", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=50.0, help="setpoints per second")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    moves = [([rng.randint(0, m) for m in MAX_ANGLES], [rng.randint(0, m) for m in MAX_ANGLES])
+             for _ in range(args.moves)]
+
+    raw = {"spread_ms": [], "duration_ms": []}
+    for start, goal in moves:
+        arrived = arrivals(start, np.array([goal]), args.rate)
+        moving = arrived[np.array(start) != np.array(goal)]
+        if len(moving):
+            raw["spread_ms"].append(1000 * (moving.max() - moving.min()))
+            raw["duration_ms"].append(1000 * moving.max())
+    results = {"raw_targets": {key: percentiles(values) for key, values in raw.items()}}
+
+    for profile in PROFILES:
+        planner = TrajectoryPlanner(MAX_ANGLES, profile=profile)
+        plans = [planner.plan(start, goal) for start, goal in moves]
+        midway = [(plan.position(plan.duration / 3), plan.velocity(plan.duration / 3)) for plan in plans]
+        n = len(moves)
+
+        def plan_all():
+            for start, goal in moves:
+                planner.plan(start, goal)
+
+        def replan_all():
+            for (position, velocity), (start, _) in zip(midway, moves):
+                planner.plan(position, start, velocity)
+
+        def sample_all():
+            for plan in plans:
+                plan.position(0.1)
+
+        measured = {"spread_ms": [], "duration_ms": []}
+        for (start, goal), plan in zip(moves, plans):
+            setpoints = plan.setpoints(args.rate)
+            if not len(setpoints):
+                continue
+            arrived = arrivals(start, setpoints, args.rate)
+            moving = arrived[np.array(start) != np.array(goal)]
+            if len(moving):
+                measured["spread_ms"].append(1000 * (moving.max() - moving.min()))
+                measured["duration_ms"].append(1000 * moving.max())
+        results[profile] = {
+            "plan_us": min(timeit.repeat(plan_all, number=1, repeat=5)) / n * 1e6,
+            "replan_us": min(timeit.repeat(replan_all, number=1, repeat=5)) / n * 1e6,
+            "sample_us": min(timeit.repeat(sample_all, number=1, repeat=5)) / n * 1e6,
+            **{key: percentiles(values) for key, values in measured.items()},
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Optional binary transport: COBS-framed packets with a CRC-8.
+
+Every packet is a type byte, its payload and a CRC-8 (polynomial 0x07) over
+both, COBS-encoded so it contains no zero bytes and terminated by one. A
+receiver can always find the next frame boundary after noise, and a damaged
+packet fails its CRC instead of moving a joint.
+
+    POSE      0x01  joint mask, one byte per servo bit (0-6) that is set,
+                    then a little-endian u16 if the base bit (7) is set
+    STATUS    0x02  no payload, answered with ANGLES (and BASE_POS)
+    POSE_ACK  0x03  sequence number, then a POSE payload; answered with ACK
+    HOLD      0x04  no payload, every servo stops where it is; answered with ANGLES
+    ANGLES    0x81  one byte per servo
+    BASE_POS  0x82  little-endian u16
+    ACK       0x83  sequence number of the command just read
+
+ASCII stays the default. Once the firmware lists ``B`` in its ``Caps:`` line
+the host may send ``9B``; the firmware answers ``Mode:B`` and everything
+after that line is binary in both directions until the board resets.
+"""
+
+from scheduler import BASE_JOINT
+
+POSE = 0x01
+STATUS = 0x02
+POSE_ACK = 0x03
+HOLD = 0x04
+ANGLES = 0x81
+BASE_POS = 0x82
+ACK = 0x83
+
+BASE_BIT = 0x80
+DELIMITER = b"\0"
+# ASCII request to switch to binary; sketches without it ignore lines starting with 9
+UPGRADE_REQUEST = b"9B\n"
+# ASCII equivalent of a HOLD packet
+HOLD_REQUEST = b"9H\n"
+
+
+def _crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+_CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def cobs_encode(data):
+    """Consistent Overhead Byte Stuffing: ``data`` without any zero bytes."""
+    out = bytearray()
+    for block in bytes(data).split(b"\0"):
+        # Runs longer than 254 bytes are split with a 0xFF code and no implied zero
+        while len(block) >= 254:
+            out.append(0xFF)
+            out += block[:254]
+            block = block[254:]
+        out.append(len(block) + 1)
+        out += block
+    return bytes(out)
+
+
+def cobs_decode(data):
+    """Inverse of :func:`cobs_encode`; raises ValueError on a malformed frame."""
+    data = bytes(data)
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        code = data[i]
+        end = i + code
+        if code == 0 or end > len(data):
+            raise ValueError("malformed COBS frame")
+        out += data[i + 1:end]
+        i = end
+        if code < 0xFF and i < len(data):
+            out.append(0)
+    return bytes(out)
+
+
+def encode_packet(packet_type, payload=b""):
+    """One framed packet, delimiter included, ready to write."""
+    body = bytes([packet_type]) + bytes(payload)
+    return cobs_encode(body + bytes([crc8(body)])) + DELIMITER
+
+
+def decode_packet(frame):
+    """``(packet_type, payload)`` from a frame without its delimiter.
+
+    Raises ValueError if the frame is malformed or fails its CRC.
+    """
+    body = cobs_decode(frame)
+    if len(body) < 2:
+        raise ValueError("packet too short")
+    if crc8(body[:-1]) != body[-1]:
+        raise ValueError("CRC mismatch")
+    return body[0], body[1:-1]
+
+
+def encode_pose(pose, seq=None):
+    """POSE packet for ``{joint: angle}`` with servo indexes and/or ``BASE_JOINT``.
+
+    With ``seq`` it is a POSE_ACK packet that the firmware acknowledges.
+    """
+    mask = 0
+    values = bytearray()
+    for joint in range(7):
+        if joint in pose:
+            mask |= 1 << joint
+            values.append(pose[joint])
+    if BASE_JOINT in pose:
+        mask |= BASE_BIT
+        values += pose[BASE_JOINT].to_bytes(2, "little")
+    if seq is None:
+        return encode_packet(POSE, bytes([mask]) + values)
+    return encode_packet(POSE_ACK, bytes([seq, mask]) + values)
+
+
+def decode_pose(payload):
+    """Inverse of :func:`encode_pose`'s payload; raises ValueError on a bad length."""
+    if not payload:
+        raise ValueError("empty pose")
+    mask = payload[0]
+    joints = [joint for joint in range(7) if mask & (1 << joint)]
+    if len(payload) != 1 + len(joints) + (2 if mask & BASE_BIT else 0):
+        raise ValueError("pose length does not match its mask")
+    pose = {joint: payload[1 + i] for i, joint in enumerate(joints)}
+    if mask & BASE_BIT:
+        pose[BASE_JOINT] = int.from_bytes(payload[-2:], "little")
+    return pose
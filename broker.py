@@ -0,0 +1,426 @@
+"""Serial port broker: one open port shared by several local processes.
+
+    python broker.py serve --port /dev/ttyUSB0 [--listen 127.0.0.1:8766]
+    python broker.py run script2.py        # any script, unchanged
+    python controller.py                   # with socket://127.0.0.1:8766 as its port
+
+The broker keeps the only ``serial.Serial`` and serves the raw byte stream
+to every client over TCP, so a client is simply a serial port:
+
+* Bytes a client writes are cut into commands at ``\\n`` (or ``\\0`` for
+  binary frames) and sent to the board in deficit round robin, so a client
+  streaming slider moves can't starve a script sending one command a second
+  and commands from different clients never interleave mid-line. Bytes with
+  no delimiter (``script.py`` sends bare ``L``/``R``) go out once the client
+  pauses for ``partial_timeout``.
+* Everything the board prints goes to every client. Each chunk read from the
+  port is one ``bytes`` object handed to every socket as is; asyncio only
+  copies what a socket can't take right away, and a client that stops
+  reading has chunks dropped once ``client_buffer`` is queued for it.
+* The board isn't reset when a client connects, so the banner it printed
+  at startup is replayed to each new client for ``wait_ready``.
+
+:class:`BrokerSerial` is a ``serial.Serial`` lookalike connected to the
+broker; ``python broker.py run`` swaps it in for ``serial.Serial`` so the
+port names hard-coded in the scripts are ignored. The broker is transport
+agnostic but the board is shared: a client switching it to the binary
+transport (``9B``) switches it for everyone, so leave that off.
+"""
+
+import argparse
+import asyncio
+import os
+import runpy
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+import serial
+from serial.urlhandler.protocol_socket import Serial as SocketSerial
+
+from connect import open_port
+from discovery import discover_ports, KNOWN_BANNERS
+from encoder import BASE_MAX_ANGLE
+from flow_control import CreditFlow, base_move_time
+from serial_reader import SerialReader
+from telemetry import TelemetryParser, FrameType
+
+DEFAULT_ADDRESS = "127.0.0.1:8766"
+# Where BrokerSerial connects when not told otherwise
+ADDRESS_ENV = "ARM_BROKER"
+DELIMITERS = (b"\n", b"\0")
+
+
+class BrokerSerial(SocketSerial):
+    """``serial.Serial`` with the same arguments, talking to a broker.
+
+    ``port`` is accepted and ignored unless it is a ``socket://`` URL, so
+    ``BrokerSerial("COM11", 9600, timeout=1)`` works as a drop-in; the broker
+    comes from ``address`` or the ``ARM_BROKER`` environment variable. The
+    baud rate and modem lines belong to the broker's port and are ignored.
+    """
+
+    def __init__(self, port=None, baudrate=9600, *args, address=None, **kwargs):
+        if not (isinstance(port, str) and port.startswith("socket://")):
+            port = f"socket://{address or os.environ.get(ADDRESS_ENV, DEFAULT_ADDRESS)}"
+        super().__init__(port, baudrate, *args, **kwargs)
+
+
+def split_commands(data):
+    """``(commands, rest)``: ``data`` cut after every delimiter."""
+    commands = []
+    start = 0
+    while True:
+        end = min((i for i in (data.find(d, start) for d in DELIMITERS) if i >= 0), default=-1)
+        if end < 0:
+            return commands, data[start:]
+        commands.append(data[start:end + 1])
+        start = end + 1
+
+
+class Client:
+    def __init__(self, writer, name):
+        self.writer = writer
+        self.name = name
+        self.task = asyncio.current_task()
+        self.commands = deque()
+        self.queued = 0
+        self.deficit = 0
+        self.paused = False
+        self.resume = False
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.commands_sent = 0
+        self.dropped = 0
+
+
+class SerialBroker:
+    """Owns the port; serves any number of byte-stream clients on an asyncio loop.
+
+    The port is read and written on two threads of its own. The reader hands
+    chunks to the loop with ``call_soon_threadsafe``; the writer takes
+    commands from the clients' queues under ``_lock``, ``quantum`` bytes per
+    client per round, and no more at a time than :class:`CreditFlow` says
+    the firmware's RX buffer has room for, since the clients can't pace
+    themselves against each other's traffic. A client with ``max_queued`` bytes waiting isn't read
+    from until the writer catches up, which pushes back on its socket.
+
+    The reader splits what the board prints into lines for the flow control:
+    ``Angles:`` returns credit and ``BasePos:`` ends a base move. An
+    ``S<angle>`` command holds every client's traffic for as long as
+    Motor_Check2 is blocked stepping the base there, so nothing is written
+    into an RX buffer the sketch isn't reading. Binary frames aren't looked
+    into.
+    """
+
+    def __init__(self, ser, banner=None, quantum=64, max_queued=4096, partial_timeout=0.005,
+                 client_buffer=64 * 1024):
+        self.ser = ser
+        self.banner = banner
+        self.quantum = quantum
+        self.max_queued = max_queued
+        self.partial_timeout = partial_timeout
+        self.client_buffer = client_buffer
+        self.flow = CreditFlow(baudrate=ser.baudrate)
+        self.parser = TelemetryParser()
+        # Only its line splitting is used; the broker reads the port itself
+        self._lines = SerialReader(ser, self._feedback)
+        # Where the base is, or will be once the last S command sent has finished
+        self.base = 0
+        self.loop = None
+        self.server = None
+        self.address = None
+        self.clients = []
+        self.error = None
+        self.stopped = None
+
+        self._lock = threading.Condition()
+        self._active = deque()
+        self._running = False
+        self._threads = []
+
+        self.reads = 0
+        self.bytes_read = 0
+        self.writes = 0
+        self.bytes_written = 0
+
+    async def start(self, address=DEFAULT_ADDRESS):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        host, port = address.rsplit(":", 1)
+        self.server = await asyncio.start_server(self.serve, host, int(port))
+        self._running = True
+        self.ser.timeout = 0.1
+        for target, name in ((self._read, "broker-reader"), (self._write, "broker-writer")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        self.address = f"{host}:{port}"
+        print(f"Broker for {self.ser.port} listening on socket://{self.address}")
+
+    async def close(self):
+        self._running = False
+        with self._lock:
+            self._lock.notify()
+        for thread in self._threads:
+            thread.join(1)
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for client in list(self.clients):
+            client.writer.close()
+        await asyncio.gather(*(client.task for client in list(self.clients)), return_exceptions=True)
+        self.ser.close()
+
+    async def serve(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        client = Client(writer, f"{peer[0]}:{peer[1]}" if peer else "client")
+        writer.transport.set_write_buffer_limits(self.client_buffer)
+        self.clients.append(client)
+        print(f"Client {client.name} connected")
+        if self.banner:
+            writer.write(self.banner + b"\n")
+        partial = b""
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(reader.read(4096), self.partial_timeout if partial else None)
+                except asyncio.TimeoutError:
+                    # The client paused mid-command; bare bytes are a command of their own
+                    self.enqueue(client, [partial])
+                    partial = b""
+                    continue
+                if not data:
+                    break
+                client.bytes_in += len(data)
+                commands, partial = split_commands(partial + data)
+                if commands:
+                    self.enqueue(client, commands)
+                await client.drained.wait()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.clients.remove(client)
+            with self._lock:
+                client.commands.clear()
+            writer.close()
+            print(f"Client {client.name} disconnected: {client.commands_sent} commands, "
+                  f"{client.bytes_out} bytes of telemetry, {client.dropped} chunks dropped")
+
+    def enqueue(self, client, commands):
+        with self._lock:
+            if not client.commands:
+                self._active.append(client)
+            client.commands.extend(commands)
+            client.queued += sum(len(command) for command in commands)
+            if client.queued > self.max_queued and not client.paused:
+                client.paused = True
+                client.drained.clear()
+            self._lock.notify()
+
+    def publish(self, chunk):
+        # The same bytes object goes to every client
+        for client in self.clients:
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > self.client_buffer:
+                client.dropped += 1
+                continue
+            transport.write(chunk)
+            client.bytes_out += len(chunk)
+
+    def _read(self):
+        while self._running:
+            try:
+                chunk = self.ser.read(max(1, self.ser.in_waiting))
+            except (serial.SerialException, OSError) as e:
+                self._fail(e)
+                return
+            if chunk:
+                self.reads += 1
+                self.bytes_read += len(chunk)
+                self._lines.feed(chunk)
+                self.loop.call_soon_threadsafe(self.publish, chunk)
+
+    def _feedback(self, line):
+        frame = self.parser.parse(line)
+        if frame.type == FrameType.ANGLES:
+            self.flow.returned()
+        elif frame.type in (FrameType.BASE_POS, FrameType.STEPPER_POS):
+            self.base = frame.angle
+            self.flow.returned(busy_ended=True)
+
+    def _write(self):
+        flow = self.flow
+        while True:
+            with self._lock:
+                while self._running and not self._active:
+                    self._lock.wait()
+                if not self._running:
+                    return
+            room = flow.room()
+            if not room:
+                time.sleep(flow.delay(1))
+                continue
+            with self._lock:
+                data, busy_for, drained = self._take_round(room)
+            # Only a command longer than the room left waits here
+            wait = flow.delay(len(data))
+            if wait:
+                time.sleep(wait)
+            try:
+                self.ser.write(data)
+            except (serial.SerialException, OSError) as e:
+                self._fail(e)
+                return
+            flow.consume(len(data), busy_for)
+            self.writes += 1
+            self.bytes_written += len(data)
+            for client in drained:
+                self.loop.call_soon_threadsafe(client.drained.set)
+
+    def _take_round(self, room):
+        """Deficit round robin: every client with commands gets ``quantum`` more bytes.
+
+        Stops once ``room`` bytes are taken; the client cut short keeps its
+        place and its deficit for the next call. Returns the bytes, how long
+        they block the sketch and the clients that dropped below ``max_queued``.
+        """
+        data = bytearray()
+        busy_for = 0.0
+        drained = []
+        for _ in range(len(self._active)):
+            client = self._active[0]
+            if client.resume:
+                client.resume = False
+            else:
+                client.deficit += self.quantum
+            commands = client.commands
+            # A command longer than the quantum goes out once enough rounds add up
+            while commands and len(commands[0]) <= client.deficit:
+                if data and len(data) + len(commands[0]) > room:
+                    client.resume = True
+                    break
+                command = commands.popleft()
+                client.deficit -= len(command)
+                client.queued -= len(command)
+                client.commands_sent += 1
+                busy_for += self._busy_for(command)
+                data += command
+            if client.paused and client.queued <= self.max_queued:
+                client.paused = False
+                drained.append(client)
+            if client.resume:
+                break
+            self._active.popleft()
+            if commands:
+                self._active.append(client)
+            else:
+                client.deficit = 0
+        return bytes(data), busy_for, drained
+
+    def _busy_for(self, command):
+        """Seconds an ``S<angle>`` command keeps Motor_Check2 stepping the base, else 0."""
+        if command[:1] != b"S":
+            return 0.0
+        end = 1
+        while end < len(command) and 0x30 <= command[end] <= 0x39:
+            end += 1
+        if end == 1:
+            return 0.0
+        target = min(int(command[1:end]), BASE_MAX_ANGLE)
+        busy_for = base_move_time(self.base, target)
+        self.base = target
+        return busy_for
+
+    def _fail(self, error):
+        if self._running:
+            self.error = error
+            print(f"Serial error: {error}")
+            self._running = False
+            self.loop.call_soon_threadsafe(self.stopped.set)
+
+    def stats(self):
+        return {
+            "clients": len(self.clients),
+            "reads": self.reads,
+            "bytes_read": self.bytes_read,
+            "writes": self.writes,
+            "bytes_written": self.bytes_written,
+            "dropped": sum(client.dropped for client in self.clients),
+            "flow": self.flow.stats(),
+        }
+
+
+def open_board(port, baudrate):
+    """Open ``port`` (or the first port with a known sketch) and return ``(ser, banner)``."""
+    if not port:
+        candidates = [candidate for candidate in discover_ports() if candidate.firmware]
+        if not candidates:
+            raise OSError("no known firmware found on any serial port")
+        port, baudrate = candidates[0].device, candidates[0].baudrate
+    return open_port(port, baudrate, banners=KNOWN_BANNERS)
+
+
+async def serve(args):
+    loop = asyncio.get_running_loop()
+    ser, banner = await loop.run_in_executor(None, open_board, args.port, args.baudrate)
+    if banner is None:
+        print("No ready banner from firmware, clients won't get one either")
+    broker = SerialBroker(ser, banner, quantum=args.quantum)
+    await broker.start(args.listen)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, broker.stopped.set)
+        except (NotImplementedError, AttributeError):
+            # Windows has no loop signal handlers; Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        await broker.stopped.wait()
+    finally:
+        await broker.close()
+        print(broker.stats())
+
+
+def run_script(args):
+    """Run a script with ``serial.Serial`` replaced by :class:`BrokerSerial`."""
+    os.environ[ADDRESS_ENV] = args.broker
+    # serial_for_url also builds plain ports from this name, so open_port is covered too
+    serial.Serial = BrokerSerial
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    runpy.run_path(args.script, run_name="__main__")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="open the port and share it")
+    serve_parser.add_argument("--port", help="serial port or pyserial URL; scans for a known sketch when left out")
+    serve_parser.add_argument("--baudrate", type=int, default=115200)
+    serve_parser.add_argument("--listen", default=DEFAULT_ADDRESS, metavar="HOST:PORT")
+    serve_parser.add_argument("--quantum", type=int, default=64, help="bytes per client per round")
+    run_parser = commands.add_parser("run", help="run a script against a broker")
+    run_parser.add_argument("--broker", default=os.environ.get(ADDRESS_ENV, DEFAULT_ADDRESS), metavar="HOST:PORT")
+    run_parser.add_argument("script")
+    run_parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_script(args)
+        return
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Opening the serial port and waiting for the firmware to come up."""
+
+import threading
+import time
+
+import serial
+
+# Motor_Check2/Motor_Check3 print their joint angles at the end of setup()
+ARM_BANNERS = (b"Angles:",)
+# Status request; lines starting with 9 are ignored by sketches that predate it
+ARM_PROBE = b"9?\n"
+
+
+def wait_ready(ser, banners=ARM_BANNERS, probe=None, timeout=3.0, probe_interval=0.5, probe_delay=0.0,
+               on_progress=None):
+    """Block until the firmware prints a line starting with one of ``banners``.
+
+    Opening the port resets most Arduinos, so the banner arrives as soon as
+    ``setup()`` finishes. Boards that don't reset stay silent, so ``probe`` (if
+    given) is written every ``probe_interval`` seconds, starting after
+    ``probe_delay``, to ask for a reply.
+    Returns the banner line, or None once ``timeout`` seconds have passed.
+    """
+    start = time.perf_counter()
+    deadline = start + timeout
+    next_probe = start + probe_delay
+    buf = bytearray()
+    read_timeout = ser.timeout
+    ser.timeout = 0.05
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return None
+            if probe and now >= next_probe:
+                ser.write(probe)
+                next_probe = now + probe_interval
+            if on_progress:
+                on_progress(now - start)
+
+            buf += ser.read(max(1, ser.in_waiting))
+            end = buf.find(b"\n")
+            while end >= 0:
+                line = bytes(buf[:end]).rstrip(b"\r")
+                del buf[:end + 1]
+                if line.startswith(banners):
+                    return line
+                end = buf.find(b"\n")
+    finally:
+        ser.timeout = read_timeout
+
+
+def open_port(port, baudrate, **ready_options):
+    """Open ``port`` and wait for the firmware; returns ``(ser, banner)``.
+
+    ``port`` may also be a pyserial URL such as ``socket://host:port``.
+    ``banner`` is None if :func:`wait_ready` timed out. The port is closed
+    again if waiting fails.
+    """
+    ser = serial.serial_for_url(port, baudrate, timeout=1)
+    try:
+        banner = wait_ready(ser, **ready_options)
+    except Exception:
+        ser.close()
+        raise
+    return ser, banner
+
+
+def connect_async(port, baudrate, on_done, **ready_options):
+    """Run :func:`open_port` on a background thread.
+
+    ``on_done(ser, banner, error)`` is called from that thread when finished:
+    with the open port and the banner (None after a timeout), or with the
+    exception that made the connection fail.
+    """
+    def run():
+        try:
+            ser, banner = open_port(port, baudrate, **ready_options)
+        except Exception as e:
+            on_done(None, None, e)
+            return
+        on_done(ser, banner, None)
+
+    thread = threading.Thread(target=run, name="serial-connect", daemon=True)
+    thread.start()
+    return thread
@@ -1,14 +1,16 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import time
-import threading
 import ttkbootstrap as tb
-from serial.tools import list_ports
+from discovery import ARM_FIRMWARE
+from serial_writer import PRESET
+from arm_panel import ArmPanel
+from scheduler import BASE_JOINT
+
+class MotorController(ArmPanel):
+    prefer = ARM_FIRMWARE
 
-class MotorController:
     def __init__(self, root):
-        self.root = root
+        super().__init__(root, [180, 180, 180, 180, 90], base=True)
         self.root.title("Arm Control Panel")
         self.root.geometry("600x1000")
         self.style = tb.Style("darkly")
@@ -19,22 +21,18 @@ class MotorController:
         self.style.configure("Servo.TLabelframe.Label", foreground="#50C878", font=("Arial", 12, "bold"))
         self.style.configure("ServoName.TLabel", foreground="#50C878", font=("Arial", 11, "bold"))
         
-        self.ser = None
-        self.selected_port = tk.StringVar()
-        self.connected = False
-        self.running = False
-        self.update_thread = None
-        
-        self.max_angles = [180, 180, 180, 180, 90]
-        
         self.create_connection_section()
         self.create_quick_control_section()
         self.create_servo_section()
         self.create_stepper_section()
         self.create_reset_section()
         
-        self.set_controls_state('disabled')
+        for i, angle_var in enumerate(self.angle_vars):
+            self.telemetry.bind(i, angle_var)
+        self.telemetry.bind(BASE_JOINT, self.stepper_var)
+        
         self.root.configure(bg='#1e1e1e')
+        self.start()
 
     def create_quick_control_section(self):
         control_frame = tb.LabelFrame(self.root, text="Quick Control All Servos", 
@@ -93,9 +91,8 @@ class MotorController:
             for angle in angles:
                 btn = tb.Button(btn_frame, text=f"{angle}°", 
                               bootstyle="success-outline",
-                              command=lambda x=i, a=angle: self.set_servo_angle(x, a))
+                              command=lambda x=i, a=angle: self.set_pose({x: a}))
                 btn.pack(side='left', padx=2)
-                btn.bind('<Button-1>', lambda event, x=i, a=angle: self.update_slider(x, a))
 
     def create_stepper_section(self):
         stepper_frame = tb.LabelFrame(self.root, text="Stepper Motor", 
@@ -119,9 +116,8 @@ class MotorController:
         for angle in [0, 90, 180, 270, 360]:
             btn = tb.Button(btn_frame, text=f"{angle}°",
                           bootstyle="info outline",
-                          command=lambda a=angle: self.set_stepper_angle(a))
+                          command=lambda a=angle: self.set_pose({BASE_JOINT: a}))
             btn.pack(side='left', padx=5)
-            btn.bind('<Button-1>', lambda event, a=angle: self.update_stepper_slider(a))
 
     def create_connection_section(self):
         conn_frame = tb.LabelFrame(self.root, text="Serial Connection", 
@@ -163,44 +159,11 @@ class MotorController:
         
         tb.Button(reset_frame, text="🔄 Reset Stepper (0°)",
                  bootstyle="primary",
-                 command=lambda: self.set_stepper_angle(0)).pack(side='left', padx=5)
-
-    def refresh_ports(self):
-        ports = [port.device for port in list_ports.comports()]
-        self.port_combo['values'] = ports
-        if ports:
-            self.port_combo.set(ports[0])
-
-    def toggle_connection(self):
-        if not self.connected:
-            try:
-                port = self.selected_port.get()
-                self.ser = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)
-                
-                self.connected = True
-                self.running = True
-                self.update_thread = threading.Thread(target=self.monitor_serial)
-                self.update_thread.daemon = True
-                self.update_thread.start()
-                
-                self.connect_btn.configure(text="🔌 Disconnect", bootstyle="danger")
-                self.status_label.configure(text="Connected", bootstyle="success")
-                self.set_controls_state('normal')
-                
-            except Exception as e:
-                messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
-        else:
-            self.disconnect()
-
-    def disconnect(self):
-        self.running = False
-        if self.ser:
-            self.ser.close()
-        self.connected = False
-        self.connect_btn.configure(text="🔌 Connect", bootstyle="success")
-        self.status_label.configure(text="Disconnected", bootstyle="danger")
-        self.set_controls_state('disabled')
+                 command=lambda: self.set_pose({BASE_JOINT: 0})).pack(side='left', padx=5)
+        
+        tb.Button(reset_frame, text="⛔ Stop (Esc)",
+                 bootstyle="danger",
+                 command=self.emergency_stop).pack(side='left', padx=5)
 
     def set_controls_state(self, state):
         for slider in self.sliders:
@@ -229,59 +192,53 @@ class MotorController:
         if self.connected:
             angle = min(angle, self.max_angles[servo_num])
             self.angle_vars[servo_num].set(f"{angle}°")
-            command = f"{servo_num}{angle}\n".encode()
-            self.ser.write(command)
+            if self.smooth_moves:
+                # Re-planned on every drag event, carrying on at the current speed
+                self.trajectory.move_to({servo_num: angle})
+            else:
+                self.scheduler.submit(servo_num, angle)
 
     def set_stepper_angle(self, angle):
         if self.connected:
             self.stepper_var.set(f"{angle}°")
-            command = f"S{angle}\n".encode()
-            self.ser.write(command)
+            self.scheduler.submit(BASE_JOINT, angle)
 
-    def update_slider(self, servo_num, angle):
-        angle = min(angle, self.max_angles[servo_num])
-        self.sliders[servo_num].set(angle)
-        self.update_servo(servo_num, angle)
-
-    def update_stepper_slider(self, angle):
-        self.stepper_slider.set(angle)
-        self.update_stepper(angle)
-
-    def reset_all_servos(self):
+    def set_pose(self, angles, flush=True):
+        # angles is a list for every servo, or {joint: angle} for some of them and/or the stepper
         if self.connected:
-            for i in range(5):
-                reset_angle = min(90, self.max_angles[i])
-                self.set_servo_angle(i, reset_angle)
-                self.update_slider(i, reset_angle)
-
-    def set_all_servos(self, angle):
+            pose = dict(angles) if isinstance(angles, dict) else dict(enumerate(angles))
+            # Clamp every joint in one pass and move the sliders without going through update_servo
+            for joint, angle in pose.items():
+                if joint == BASE_JOINT:
+                    self.stepper_slider.set(angle)
+                    self.stepper_var.set(f"{angle}°")
+                    continue
+                pose[joint] = angle = min(angle, self.max_angles[joint])
+                self.sliders[joint].set(angle)
+                self.angle_vars[joint].set(f"{angle}°")
+            if self.smooth_moves:
+                # The base is a single blocking stepper move, so only the servos are planned
+                servos = {joint: angle for joint, angle in pose.items() if joint != BASE_JOINT}
+                if servos:
+                    self.trajectory.move_to(servos, flush)
+                pose = {BASE_JOINT: pose[BASE_JOINT]} if BASE_JOINT in pose else {}
+            self.scheduler.submit_pose(pose)
+            if flush:
+                # Buttons go out now, ahead of any slider traffic still queued
+                self.scheduler.flush(PRESET)
+
+    def update_all_servos(self, val):
         if self.connected:
-            for i in range(5):
-                constrained_angle = min(angle, self.max_angles[i])
-                self.set_servo_angle(i, constrained_angle)
-                self.update_slider(i, constrained_angle)
+            angle = int(float(val))
+            print(f"All Servos: {angle}°")
+            # Master slider drags are coalesced by the scheduler like the joint sliders
+            self.set_pose([angle] * 5, flush=False)
 
-    def monitor_serial(self):
-        while self.running:
-            try:
-                if self.ser and self.ser.in_waiting:
-                    data = self.ser.readline().decode().strip()
-                    if data.startswith("Angles:"):
-                        angles = data[7:].split(',')
-                        for i, angle in enumerate(angles[:5]):
-                            if angle:
-                                self.angle_vars[i].set(f"{angle}°")
-                    elif data.startswith("StepperPos:"):
-                        angle = int(data.split(':')[1])
-                        self.stepper_var.set(f"{angle}°")
-            except Exception as e:
-                print(f"Serial error: {e}")
-                self.disconnect()
-                break
-            time.sleep(0.01)
+    def reset_all_servos(self):
+        self.set_pose([90] * 5)
 
-    def __del__(self):
-        self.disconnect()
+    def set_all_servos(self, angle):
+        self.set_pose([angle] * 5)
 
 def main():
     root = tk.Tk()
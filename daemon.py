@@ -0,0 +1,375 @@
+"""Headless arm daemon: owns the serial port and serves a JSON-lines API.
+
+    python daemon.py --port /dev/ttyUSB0 --listen tcp:127.0.0.1:8765 --listen unix:/tmp/arm.sock
+
+Any number of clients (GUI panels, scripts, loggers) connect at once over TCP
+or a Unix-domain socket and send one JSON object per line. Every reply echoes
+the request's ``id`` and has ``"ok": true`` or ``"ok": false`` with an
+``error``:
+
+    {"id": 1, "cmd": "set", "joints": {"0": 30, "S": 90}}
+        targets, coalesced and sent on the next tick like a slider drag;
+        with "preset": true they go out at once, ahead of slider traffic
+    {"id": 2, "cmd": "stop"}          emergency stop, every servo holds where it is
+    {"id": 3, "cmd": "state"}         link, firmware, reported angles and targets
+    {"id": 4, "cmd": "subscribe"}     telemetry events until "unsubscribe"
+    {"id": 5, "cmd": "stats"}         scheduler, writer, flow and telemetry counters
+
+Telemetry events carry no id: ``{"event": "angles", "angles": [...]}``,
+``{"event": "base", "base": 90}`` and ``{"event": "link", "connected": false}``.
+A subscriber that stops reading has events dropped rather than holding up
+the others.
+
+Nothing here imports Tk, ttkbootstrap or PIL, so it starts in a fraction of
+a second; the port is opened in the background after the sockets listen.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+
+from arm_link import ArmLink
+from connect import open_port, ARM_PROBE
+from discovery import discover_ports, identify, MOTOR_CHECK2, MOTOR_CHECK3
+from encoder import BASE_MAX_ANGLE
+from reconnect import ReconnectSupervisor
+from scheduler import CommandScheduler, BASE_JOINT
+from serial_writer import PRESET
+
+DEFAULT_LISTEN = "tcp:127.0.0.1:8765"
+# Servo limits and whether there is a base, as in script3.py and script1.py
+FIRMWARE_JOINTS = {
+    MOTOR_CHECK2: ([45, 180, 180, 180, 180], True),
+    MOTOR_CHECK3: ([45, 180, 180, 180], False),
+}
+
+
+class LoopTimer:
+    """The ``root.after`` interface CommandScheduler needs, on an asyncio loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def after(self, ms, func):
+        return self.loop.call_later(ms / 1000, func)
+
+    def after_cancel(self, handle):
+        handle.cancel()
+
+
+class Client:
+    def __init__(self, writer):
+        self.writer = writer
+        self.task = asyncio.current_task()
+        self.subscribed = False
+        self.dropped = 0
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode() + b"\n")
+
+
+class ArmDaemon:
+    """The controllers' :class:`arm_link.ArmLink` without Tk, driven by an asyncio loop.
+
+    Serial threads hand work to the loop with ``call_soon_threadsafe`` the way
+    the controllers use ``TelemetryPump.call``; everything else, including the
+    scheduler tick, runs on the loop.
+    """
+
+    def __init__(self, port=None, baudrate=115200, firmware=None, rate_hz=50,
+                 binary_transport=False, acked_commands=False, write_linger=0.0,
+                 subscriber_buffer=64 * 1024):
+        self.port = port
+        self.baudrate = baudrate
+        self.firmware = firmware
+        self.rate_hz = rate_hz
+        self.binary_transport = binary_transport
+        self.acked_commands = acked_commands
+        self.write_linger = write_linger
+        # Bytes a slow subscriber may have waiting before its events are dropped
+        self.subscriber_buffer = subscriber_buffer
+
+        self.loop = None
+        self.scheduler = None
+        self.servers = []
+        self.unix_paths = []
+        self.clients = set()
+        self.connected = False
+        self.link = ArmLink(*FIRMWARE_JOINTS[firmware or MOTOR_CHECK2],
+                            lambda func, *args: self.loop.call_soon_threadsafe(func, *args),
+                            self.on_angles, self.on_base, self.resend_joints, self.on_serial_error)
+        self.supervisor = ReconnectSupervisor(
+            lambda result: self.loop.call_soon_threadsafe(self.on_reconnected, *result),
+            on_abandoned=lambda result: result[0].close())
+
+        self.requests = 0
+        self.events = 0
+
+    async def start(self, listen=(DEFAULT_LISTEN,)):
+        self.loop = asyncio.get_running_loop()
+        self.scheduler = CommandScheduler(LoopTimer(self.loop), self.link.send_batch, self.rate_hz)
+        for address in listen:
+            kind, _, where = address.partition(":")
+            if kind == "unix":
+                if os.path.exists(where):
+                    os.unlink(where)
+                server = await asyncio.start_unix_server(self.serve, where)
+                self.unix_paths.append(where)
+            elif kind == "tcp":
+                host, _, port = where.rpartition(":")
+                server = await asyncio.start_server(self.serve, host or "127.0.0.1", int(port))
+            else:
+                raise ValueError(f"Listen address must be unix:PATH or tcp:HOST:PORT, got {address}")
+            self.servers.append(server)
+            print(f"Listening on {address}")
+        self.loop.create_task(self.connect())
+
+    async def connect(self):
+        try:
+            ser, banner = await self.loop.run_in_executor(None, self.open_arm)
+        except Exception as e:
+            print(f"Failed to connect: {e}")
+            # Retried in the background whether the port failed to open or no arm was found yet
+            self.supervisor.start(self.open_arm)
+            return
+        self.on_connected(ser, banner)
+
+    def open_arm(self):
+        # Off the loop: scans for the arm first when no port was given
+        if not self.port:
+            arms = [candidate for candidate in discover_ports() if candidate.firmware in FIRMWARE_JOINTS]
+            if not arms:
+                raise OSError("no arm firmware found on any serial port")
+            self.port = arms[0].device
+        return open_port(self.port, self.baudrate, probe=ARM_PROBE)
+
+    def on_connected(self, ser, banner):
+        if banner is None:
+            print("No ready banner from firmware, continuing anyway")
+        elif not self.firmware and identify(banner) in FIRMWARE_JOINTS:
+            self.link.set_joints(*FIRMWARE_JOINTS[identify(banner)])
+
+        self.link.open(ser, banner, self.binary_transport, self.acked_commands, self.write_linger)
+        self.connected = True
+        self.scheduler.start()
+        print(f"Connected to {self.port}")
+        self.publish({"event": "link", "connected": True})
+
+    def on_serial_error(self, e):
+        print(f"Serial error: {e}")
+        self.loop.call_soon_threadsafe(self.on_link_lost)
+
+    def on_link_lost(self):
+        if not self.connected:
+            return
+        self.disconnect()
+        self.supervisor.start(self.open_arm)
+
+    def on_reconnected(self, ser, banner):
+        stats = self.supervisor.stats()
+        print(f"Reconnected after {stats['downtime_s_last']:.1f}s")
+        self.on_connected(ser, banner)
+        # The board reset when the link came back, so restore the whole pose in one write
+        self.scheduler.resend()
+
+    def disconnect(self):
+        if self.connected:
+            stats = self.scheduler.stats()
+            print(f"Commands: {stats['sent']} sent, {stats['coalesced']} coalesced")
+        self.scheduler.stop()
+        self.link.print_stats()
+        self.link.close()
+        if self.connected:
+            self.connected = False
+            self.publish({"event": "link", "connected": False})
+
+    async def close(self):
+        self.supervisor.cancel()
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        for path in self.unix_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        # Closing a client's transport ends its readline with EOF, so serve returns normally
+        clients = list(self.clients)
+        for client in clients:
+            client.writer.close()
+        await asyncio.gather(*(client.task for client in clients), return_exceptions=True)
+        self.disconnect()
+
+    # Serial side, see ArmLink
+
+    def on_angles(self, frame):
+        # On the reader thread; the frame is reused, so copy the angles out before handing over
+        angles = list(frame.angles[:frame.joint_count])
+        self.loop.call_soon_threadsafe(self.publish, {"event": "angles", "angles": angles})
+
+    def on_base(self, angle):
+        self.loop.call_soon_threadsafe(self.publish, {"event": "base", "base": angle})
+
+    def resend_joints(self, joints):
+        if self.connected:
+            self.scheduler.resend(joints)
+
+    # Client side
+
+    async def serve(self, reader, writer):
+        client = Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Longer than the stream limit; the rest of it can't be told from the next request
+                    client.send({"id": None, "ok": False, "error": "request line too long"})
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                client.send(self.dispatch(client, line))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(client)
+            writer.close()
+
+    def dispatch(self, client, line):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+            request_id = request.get("id")
+            self.requests += 1
+            handler = getattr(self, f"cmd_{request.get('cmd')}", None)
+            if handler is None:
+                raise ValueError(f"unknown cmd {request.get('cmd')!r}")
+            reply = handler(client, request) or {}
+        except (ValueError, TypeError, OverflowError) as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        return dict(reply, id=request_id, ok=True)
+
+    def cmd_set(self, client, request):
+        if not self.connected:
+            raise ValueError("not connected")
+        pose = {}
+        for key, angle in dict(request.get("joints", {})).items():
+            joint = self.joint(key)
+            limit = BASE_MAX_ANGLE if joint == BASE_JOINT else self.link.max_angles[joint]
+            pose[joint] = max(0, min(int(angle), limit))
+        self.scheduler.submit_pose(pose)
+        if request.get("preset"):
+            self.scheduler.flush(PRESET)
+        return {"joints": {str(joint): angle for joint, angle in pose.items()}}
+
+    def cmd_stop(self, client, request):
+        if not self.connected:
+            raise ValueError("not connected")
+        self.emergency_stop()
+
+    def cmd_state(self, client, request):
+        return {
+            "connected": self.connected,
+            "port": self.port,
+            "max_angles": self.link.max_angles,
+            "base": self.link.has_base,
+            "angles": list(self.link.parser.angles[:self.link.parser.joint_count]),
+            "base_angle": self.link.parser.base if self.link.has_base else None,
+            "targets": {str(joint): angle for joint, angle in self.scheduler.targets.items()},
+            "caps": self.link.parser.caps.decode("latin-1"),
+            "binary": self.link.binary_commands,
+            "acked": self.link.acks is not None,
+            "clients": len(self.clients),
+        }
+
+    def cmd_subscribe(self, client, request):
+        client.subscribed = True
+
+    def cmd_unsubscribe(self, client, request):
+        client.subscribed = False
+
+    def cmd_stats(self, client, request):
+        return {
+            "requests": self.requests,
+            "events": self.events,
+            "subscriber_drops": sum(client.dropped for client in self.clients),
+            "scheduler": self.scheduler.stats(),
+            "writer": self.link.writer.stats() if self.link.writer else None,
+            "flow": self.link.flow.stats() if self.link.flow else None,
+            "acks": self.link.acks.stats() if self.link.acks else None,
+            "telemetry": self.link.parser.stats(),
+        }
+
+    def joint(self, key):
+        if key in (BASE_JOINT, "base") and self.link.has_base:
+            return BASE_JOINT
+        if str(key).isdigit() and int(key) < len(self.link.max_angles):
+            return int(key)
+        raise ValueError(f"unknown joint {key!r}")
+
+    def emergency_stop(self):
+        # Stop every servo where it is: ahead of everything queued, without waiting for credit
+        parser = self.link.parser
+        held = {i: min(parser.angles[i], self.link.max_angles[i])
+                for i in range(min(parser.joint_count, len(self.link.max_angles)))}
+        # Under the scheduler lock, so no tick slips a slider batch in after the stop
+        with self.scheduler.lock:
+            self.link.stop(held)
+            self.scheduler.hold(held)
+        print("Emergency stop")
+
+    def publish(self, event):
+        # Encoded once and shared by every subscriber
+        self.events += 1
+        data = json.dumps(event).encode() + b"\n"
+        for client in self.clients:
+            if not client.subscribed or client.writer.is_closing():
+                continue
+            if client.writer.transport.get_write_buffer_size() > self.subscriber_buffer:
+                client.dropped += 1
+                continue
+            client.writer.write(data)
+
+
+async def run(args):
+    daemon = ArmDaemon(args.port, args.baudrate, args.firmware, args.rate, args.binary, args.acked, args.linger)
+    await daemon.start(args.listen or [DEFAULT_LISTEN])
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        except (NotImplementedError, AttributeError):
+            # Windows has no loop signal handlers; Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await daemon.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", help="serial port or pyserial URL; scans for the arm when left out")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--firmware", choices=sorted(FIRMWARE_JOINTS),
+                        help="joint layout; detected from the banner when left out")
+    parser.add_argument("--listen", action="append", metavar="ADDRESS",
+                        help=f"unix:PATH or tcp:HOST:PORT, may be repeated (default {DEFAULT_LISTEN})")
+    parser.add_argument("--rate", type=float, default=50, help="scheduler ticks per second")
+    parser.add_argument("--binary", action="store_true", help="use the binary transport when offered")
+    parser.add_argument("--acked", action="store_true", help="use acknowledged commands when offered")
+    parser.add_argument("--linger", type=float, default=0.0, help="write aggregation window in seconds")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
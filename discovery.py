@@ -0,0 +1,114 @@
+"""Finds which serial ports have one of the repo's sketches behind them."""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+from serial.tools import list_ports
+
+from connect import wait_ready, ARM_PROBE
+from telemetry import TelemetryParser, FrameType
+
+MOTOR_CHECK1 = "Motor_Check1"
+MOTOR_CHECK2 = "Motor_Check2"
+MOTOR_CHECK3 = "Motor_Check3"
+STEPPER_CHECK = "StepperCheck"
+ARM_FIRMWARE = (MOTOR_CHECK2, MOTOR_CHECK3)
+
+ARM_BAUD = 115200
+# The arm sketches run at 115200, StepperCheck and Motor_Check1 at 9600
+PROBE_BAUDS = (ARM_BAUD, 9600)
+
+KNOWN_BANNERS = (
+    b"Angles:", b"BasePos:",
+    b"StepperCheck ready",
+    b"Waiting for input", b"Servo initialized",
+)
+
+PortCandidate = namedtuple("PortCandidate", "device description baudrate firmware banner elapsed error")
+
+
+def identify(line):
+    """Name the sketch that printed ``line``, or return None."""
+    if line.startswith(b"StepperCheck ready"):
+        return STEPPER_CHECK
+    if line.startswith((b"Waiting for input", b"Servo initialized")):
+        return MOTOR_CHECK1
+    if line.startswith(b"BasePos:"):
+        return MOTOR_CHECK2
+    frame = TelemetryParser().parse(line)
+    if frame.type == FrameType.ANGLES:
+        return MOTOR_CHECK3 if frame.joint_count == 4 else MOTOR_CHECK2
+    return None
+
+
+def probe_port(device, description="", bauds=PROBE_BAUDS, timeout=2.5):
+    """Open ``device`` at each baud rate in turn until a known sketch answers."""
+    start = time.perf_counter()
+    for baudrate in bauds:
+        try:
+            ser = serial.Serial(device, baudrate, timeout=0.05)
+        except (serial.SerialException, OSError) as e:
+            return PortCandidate(device, description, None, None, None, time.perf_counter() - start, str(e))
+        try:
+            # Resetting boards answer with their banner on their own; only
+            # probe the silent ones, and only at the arm's baud rate
+            banner = wait_ready(ser, KNOWN_BANNERS, timeout=timeout,
+                                probe=ARM_PROBE if baudrate == ARM_BAUD else None,
+                                probe_delay=timeout / 2)
+        except (serial.SerialException, OSError) as e:
+            return PortCandidate(device, description, baudrate, None, None, time.perf_counter() - start, str(e))
+        finally:
+            ser.close()
+        if banner:
+            return PortCandidate(device, description, baudrate, identify(banner), banner,
+                                 time.perf_counter() - start, None)
+    return PortCandidate(device, description, None, None, None, time.perf_counter() - start, None)
+
+
+def rank(candidate, prefer=ARM_FIRMWARE):
+    """Sort key: preferred firmware first, then any known sketch, then the rest."""
+    if candidate.firmware in prefer:
+        score = 3 - prefer.index(candidate.firmware) / len(prefer)
+    elif candidate.firmware:
+        score = 1
+    elif candidate.error:
+        score = -1
+    else:
+        score = 0
+    return (-score, candidate.elapsed)
+
+
+def discover_ports(exclude=(), prefer=ARM_FIRMWARE, bauds=PROBE_BAUDS, timeout=2.5):
+    """Probe every serial port at once and return them best match first.
+
+    Each port gets its own worker, so the whole scan takes about as long as
+    the slowest single port rather than the sum of all of them.
+    """
+    ports = [port for port in list_ports.comports() if port.device not in exclude]
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=len(ports)) as pool:
+        candidates = list(pool.map(
+            lambda port: probe_port(port.device, port.description, bauds, timeout), ports))
+    return sorted(candidates, key=lambda candidate: rank(candidate, prefer))
+
+
+def discover_async(on_done, **options):
+    """Run :func:`discover_ports` on a background thread.
+
+    ``on_done(candidates)`` is called from that thread when the scan finishes.
+    """
+    def run():
+        try:
+            candidates = discover_ports(**options)
+        except Exception as e:
+            print(f"Port discovery failed: {e}")
+            candidates = []
+        on_done(candidates)
+
+    thread = threading.Thread(target=run, name="port-discovery", daemon=True)
+    thread.start()
+    return thread
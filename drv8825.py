@@ -1,6 +1,6 @@
 import serial
-import time
 import tkinter as tk
+from connect import wait_ready
 
 # Change this to match your Arduino COM port
 SERIAL_PORT = "COM11"  # Windows: "COM5", Linux/Mac: "/dev/ttyUSB0"
@@ -8,7 +8,7 @@ BAUD_RATE = 9600
 
 try:
     arduino = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2)  # Wait for Arduino to initialize
+    wait_ready(arduino, banners=(b"StepperCheck ready",), timeout=2)  # Wait for Arduino to initialize
     print("Connected to Arduino")
 except Exception as e:
     print("Failed to connect:", e)
@@ -0,0 +1,8 @@
+"""Firmware emulators for running the controllers without an Arduino.
+
+    python -m emulator motor_check3            # prints a pty path to connect to
+    python -m emulator motor_check2 --tcp 7000 # connect to socket://127.0.0.1:7000
+"""
+
+from .runner import Emulator, PtyTransport, TcpTransport
+from .sketches import MotorCheck2, MotorCheck3, StepperCheck, SKETCHES
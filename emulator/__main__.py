@@ -0,0 +1,38 @@
+import argparse
+import functools
+import json
+
+from . import Emulator, PtyTransport, TcpTransport, SKETCHES
+from .sketches import ARDUINO_RX_BUFFER, BOOT_TIME
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m emulator", description="Emulate one of the repo's sketches.")
+    parser.add_argument("sketch", choices=sorted(SKETCHES))
+    parser.add_argument("--tcp", type=int, metavar="PORT", help="serve socket://127.0.0.1:PORT instead of a pty")
+    parser.add_argument("--baudrate", type=int, help="throttle rate, defaults to the sketch's Serial.begin()")
+    parser.add_argument("--no-throttle", action="store_true", help="deliver bytes instantly")
+    parser.add_argument("--rx-buffer", type=int, default=ARDUINO_RX_BUFFER, help="RX ring size in bytes")
+    parser.add_argument("--boot-time", type=float, default=BOOT_TIME, help="seconds before setup() finishes")
+    parser.add_argument("--legacy", action="store_true", help="ignore the 9? and 9P host requests")
+    args = parser.parse_args()
+
+    factory = functools.partial(SKETCHES[args.sketch], baudrate=args.baudrate, rx_buffer_size=args.rx_buffer,
+                                boot_time=args.boot_time, throttle=not args.no_throttle,
+                                extensions=not args.legacy)
+    try:
+        transport = TcpTransport(port=args.tcp) if args.tcp is not None else PtyTransport()
+    except OSError as e:
+        parser.error(str(e))
+    emulator = Emulator(factory, transport)
+    print(f"{args.sketch} listening on {emulator.port}", flush=True)
+    try:
+        emulator.run()
+    except KeyboardInterrupt:
+        print(json.dumps(emulator.sketch.stats()))
+    finally:
+        transport.close()
+
+
+if __name__ == "__main__":
+    main()
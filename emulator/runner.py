@@ -0,0 +1,147 @@
+"""Runs a sketch model in real time behind a pty or a TCP socket."""
+
+import os
+import select
+import socket
+import threading
+import time
+
+
+class PtyTransport:
+    """A pseudo-terminal; open ``port`` with pyserial like any other device."""
+
+    def __init__(self):
+        try:
+            # POSIX only; imported here so the TCP transport still works on Windows
+            import tty
+        except ImportError:
+            raise OSError("pseudo-terminals aren't available on this platform; "
+                          "serve the sketch over TCP with --tcp PORT instead") from None
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)
+        self.on_open = None
+
+    def fds(self):
+        return [self.master]
+
+    def read(self, fd):
+        try:
+            return os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return b""
+
+    def write(self, data):
+        try:
+            os.write(self.master, data)
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class TcpTransport:
+    """A TCP server for pyserial's ``socket://`` URLs.
+
+    Each new client counts as opening the port, which resets the sketch the
+    way DTR resets a real board.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = socket.create_server((host, port))
+        self.server.setblocking(False)
+        host, port = self.server.getsockname()[:2]
+        self.port = f"socket://{host}:{port}"
+        self.client = None
+        self.on_open = None
+
+    def fds(self):
+        return [self.server] + ([self.client] if self.client else [])
+
+    def read(self, fd):
+        if fd is self.server:
+            client, _ = self.server.accept()
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.client:
+                self.client.close()
+            self.client = client
+            if self.on_open:
+                self.on_open()
+            return b""
+        try:
+            data = self.client.recv(4096)
+        except OSError:
+            data = b""
+        if not data:
+            self.client.close()
+            self.client = None
+        return data
+
+    def write(self, data):
+        if self.client:
+            try:
+                self.client.sendall(data)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.client:
+            self.client.close()
+        self.server.close()
+
+
+class Emulator:
+    """Feeds a transport's bytes through a sketch model in real time.
+
+    ``sketch_factory`` builds a fresh sketch, e.g. ``MotorCheck3`` or a
+    ``functools.partial`` with options; it is called again whenever the
+    transport reports the port being opened. ``resolution`` is the loop period
+    in seconds, and so the emulator's timing granularity.
+    """
+
+    def __init__(self, sketch_factory, transport, resolution=0.0005):
+        self.sketch_factory = sketch_factory
+        self.transport = transport
+        self.transport.on_open = self.reset
+        self.resolution = resolution
+        self.sketch = None
+        self._started_at = 0.0
+        self._running = False
+        self._thread = None
+        self.reset()
+
+    @property
+    def port(self):
+        return self.transport.port
+
+    def reset(self):
+        self.sketch = self.sketch_factory()
+        self._started_at = time.monotonic()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name="emulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(1)
+        self.transport.close()
+
+    def run(self):
+        self._running = True
+        while self._running:
+            readable, _, _ = select.select(self.transport.fds(), [], [], self.resolution)
+            for fd in readable:
+                data = self.transport.read(fd)
+                if data:
+                    self.sketch.receive(data)
+            self.sketch.advance(time.monotonic() - self._started_at)
+            out = self.sketch.take_output()
+            if out:
+                self.transport.write(out)
@@ -0,0 +1,415 @@
+"""Python models of the Arduino sketches in this repo.
+
+Each model is driven by :meth:`Sketch.advance` with the current time in
+seconds. Bytes from the host go in through :meth:`Sketch.receive` and reach
+the sketch at the baud rate through a model of the 64-byte HardwareSerial RX
+ring; bytes that arrive while the ring is full are dropped, as on the board.
+Output is clocked out at the baud rate and collected with
+:meth:`Sketch.take_output`.
+
+After the ``9B`` upgrade the servo sketches speak the COBS packets of
+:mod:`binary_protocol` instead of lines.
+"""
+
+import binary_protocol
+from scheduler import BASE_JOINT
+
+ARDUINO_RX_BUFFER = 64
+# Stream::setTimeout() default, how long readStringUntil() waits for the next byte
+STREAM_TIMEOUT = 1.0
+# Bootloader plus the delay(1000) in setup()
+BOOT_TIME = 1.5
+
+
+def to_int(text):
+    """Arduino ``String::toInt()``: leading integer of ``text`` or 0."""
+    text = text.lstrip()
+    end = 1 if text[:1] in ("-", "+") else 0
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    try:
+        return int(text[:end])
+    except ValueError:
+        return 0
+
+
+def constrain(value, low, high):
+    return max(low, min(high, value))
+
+
+def arduino_map(x, in_min, in_max, out_min, out_max):
+    """Arduino ``map()``, including its integer truncation toward zero."""
+    num = (x - in_min) * (out_max - out_min)
+    den = in_max - in_min
+    quotient = abs(num) // abs(den)
+    return (quotient if (num >= 0) == (den > 0) else -quotient) + out_min
+
+
+class Sketch:
+    """Serial plumbing shared by every sketch model."""
+
+    baudrate = 115200
+
+    def __init__(self, baudrate=None, rx_buffer_size=ARDUINO_RX_BUFFER, boot_time=BOOT_TIME, throttle=True,
+                 extensions=True):
+        self.baudrate = baudrate or self.baudrate
+        # False models a sketch from before the "9..." host requests existed
+        self.extensions = extensions
+        # Zero-delimited binary frames instead of lines, see binary_protocol
+        self.binary = False
+        # The ring buffer always keeps one slot empty
+        self.rx_capacity = rx_buffer_size - 1
+        self.throttle = throttle
+
+        self.now = 0.0
+        self.busy_until = boot_time
+        self.booted = False
+        self._after_busy = None
+
+        self._wire = bytearray()
+        self._rx = bytearray()
+        self._line = bytearray()
+        self._last_rx = 0.0
+        self._tx = bytearray()
+        self._out = bytearray()
+        self._rx_credit = 0.0
+        self._tx_credit = 0.0
+
+        self.rx_bytes = 0
+        self.rx_dropped = 0
+        self.tx_bytes = 0
+        self.commands = 0
+        self.bad_packets = 0
+
+    def receive(self, data):
+        """Bytes written by the host; they reach the RX ring at the baud rate."""
+        self._wire += data
+
+    def take_output(self):
+        """Bytes the sketch has finished transmitting since the last call."""
+        out = bytes(self._out)
+        self._out.clear()
+        return out
+
+    def advance(self, now):
+        elapsed = max(0.0, now - self.now)
+        self.now = now
+        self._clock_in(elapsed)
+
+        if now >= self.busy_until:
+            if not self.booted:
+                self.booted = True
+                self.setup()
+            if self._after_busy:
+                after, self._after_busy = self._after_busy, None
+                after()
+            while now >= self.busy_until:
+                line = self._read_line()
+                if line is None:
+                    break
+                self.commands += 1
+                if self.binary:
+                    self.handle_packet(line)
+                else:
+                    self.handle(line)
+            if now >= self.busy_until:
+                self.loop()
+
+        self._clock_out(elapsed)
+
+    def block(self, duration, then=None):
+        """Model a blocking call: nothing is read until it returns, then ``then()`` runs."""
+        self.busy_until = self.now + duration
+        self._after_busy = then
+
+    def print(self, text):
+        self._tx += str(text).encode()
+
+    def println(self, text=""):
+        self._tx += str(text).encode() + b"\r\n"
+
+    def write(self, data):
+        self._tx += data
+
+    def stats(self):
+        return {
+            "rx_bytes": self.rx_bytes,
+            "rx_dropped": self.rx_dropped,
+            "tx_bytes": self.tx_bytes,
+            "commands": self.commands,
+            "bad_packets": self.bad_packets,
+        }
+
+    # Overridden by the sketches
+    def setup(self):
+        pass
+
+    def handle(self, line):
+        pass
+
+    def handle_packet(self, frame):
+        pass
+
+    def loop(self):
+        pass
+
+    def _clock_in(self, elapsed):
+        if self.throttle:
+            self._rx_credit = min(self._rx_credit + elapsed * self.baudrate / 10, len(self._wire) + 1)
+            count = min(int(self._rx_credit), len(self._wire))
+            self._rx_credit -= count
+        else:
+            count = len(self._wire)
+        if not count:
+            return
+        data = self._wire[:count]
+        del self._wire[:count]
+        room = max(0, self.rx_capacity - len(self._rx))
+        self._rx += data[:room]
+        self.rx_bytes += min(room, count)
+        self.rx_dropped += max(0, count - room)
+        self._last_rx = self.now
+
+    def _clock_out(self, elapsed):
+        if self.throttle:
+            self._tx_credit = min(self._tx_credit + elapsed * self.baudrate / 10, len(self._tx) + 1)
+            count = min(int(self._tx_credit), len(self._tx))
+            self._tx_credit -= count
+        else:
+            count = len(self._tx)
+        if count:
+            self._out += self._tx[:count]
+            del self._tx[:count]
+            self.tx_bytes += count
+
+    def _read_line(self):
+        # readStringUntil('\n') drains the ring into a String while it waits,
+        # so only bytes that arrive while the sketch is busy can overflow it
+        self._line += self._rx
+        self._rx.clear()
+        if self.binary:
+            # Bytes are taken straight from the ring, there is no read timeout
+            end = self._line.find(0)
+            if end < 0:
+                return None
+            frame = bytes(self._line[:end])
+            del self._line[:end + 1]
+            return frame
+        end = self._line.find(b"\n")
+        if end < 0:
+            if self._line and self.now - self._last_rx >= STREAM_TIMEOUT:
+                end = len(self._line)
+            else:
+                return None
+        line = self._line[:end].decode("latin-1")
+        del self._line[:end + 1]
+        return line
+
+
+class ServoSketch(Sketch):
+    """The PCA9685 servo loop shared by Motor_Check2 and Motor_Check3.
+
+    Besides ``<joint><angle>`` lines it accepts ``9?`` (status, answered with
+    the feedback frames and ``Caps:``), ``9P<a0>,<a1>,...`` (targets for
+    several joints in one line; empty fields leave that joint alone), ``9H``
+    (stop every servo where it is) and ``9B`` (switch to the binary
+    transport). A command ending in ``#<seq>`` is
+    acknowledged with ``Ack:<seq>`` as soon as it is read.
+    """
+
+    max_angles = ()
+    # Extension letters reported in reply to "9?"
+    caps = "PBAH"
+    start_angles = ()
+    move_interval = 0.015
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.current = list(self.start_angles)
+        self.target = list(self.start_angles)
+        self.last_move = 0.0
+
+    def setup(self):
+        self.last_move = self.now
+        self.send_angles()
+
+    def handle(self, line):
+        if self.extensions and "#" in line:
+            line, _, seq = line.partition("#")
+            self.print("Ack:")
+            self.println(to_int(seq))
+        self.command(line)
+
+    def command(self, line):
+        if self.extensions and line.startswith("9?"):
+            self.send_status()
+            self.print("Caps:")
+            self.println(self.caps)
+            return
+        if self.extensions and line.startswith("9P"):
+            self.set_pose(line[2:])
+            return
+        if self.extensions and line.startswith("9H"):
+            self.hold()
+            return
+        if self.extensions and line.startswith("9B"):
+            self.println("Mode:B")
+            self.binary = True
+            return
+        servo_num = to_int(line[:1])
+        angle = to_int(line[1:])
+        if 0 <= servo_num < len(self.current):
+            self.target[servo_num] = constrain(angle, 0, self.max_angles[servo_num])
+
+    def handle_packet(self, frame):
+        try:
+            packet_type, payload = binary_protocol.decode_packet(frame)
+            if packet_type == binary_protocol.POSE_ACK and payload:
+                self.write(binary_protocol.encode_packet(binary_protocol.ACK, payload[:1]))
+                self.apply_pose(binary_protocol.decode_pose(payload[1:]))
+            elif packet_type == binary_protocol.POSE:
+                self.apply_pose(binary_protocol.decode_pose(payload))
+            elif packet_type == binary_protocol.STATUS:
+                self.send_status()
+            elif packet_type == binary_protocol.HOLD:
+                self.hold()
+        except ValueError:
+            # Damaged packet, the firmware drops it
+            self.bad_packets += 1
+
+    def set_pose(self, fields):
+        self.apply_pose({i: to_int(field) for i, field in enumerate(fields.split(",")) if field})
+
+    def apply_pose(self, pose):
+        for i in range(len(self.target)):
+            if i in pose:
+                self.target[i] = constrain(pose[i], 0, self.max_angles[i])
+
+    def hold(self):
+        self.target = list(self.current)
+        self.send_angles()
+
+    def loop(self):
+        if self.now - self.last_move < self.move_interval:
+            return
+        self.last_move = self.now
+        moved = False
+        for i, (current, target) in enumerate(zip(self.current, self.target)):
+            if current != target:
+                self.current[i] += 1 if current < target else -1
+                moved = True
+        if moved:
+            self.send_angles()
+
+    def send_status(self):
+        self.send_angles()
+
+    def send_angles(self):
+        if self.binary:
+            self.write(binary_protocol.encode_packet(binary_protocol.ANGLES, bytes(self.current)))
+            return
+        self.print("Angles:")
+        for angle in self.current:
+            self.print(angle)
+            self.print(",")
+        self.println()
+
+
+class MotorCheck3(ServoSketch):
+    """Motor_Check3: four servos, 1° every 15 ms, ``Angles:`` feedback."""
+
+    max_angles = (45, 180, 180, 180)
+    start_angles = (45, 90, 90, 90)
+
+
+class MotorCheck2(ServoSketch):
+    """Motor_Check2: five servos plus the blocking stepper base."""
+
+    max_angles = (45, 180, 180, 180, 180)
+    start_angles = (45, 90, 90, 90, 90)
+    steps_per_revolution = 200
+    step_delay = 0.001
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.base_angle = 0
+
+    def setup(self):
+        super().setup()
+        self.send_base_pos()
+
+    def command(self, line):
+        if line.startswith("S"):  # Base rotation command
+            angle = constrain(to_int(line[1:]), 0, 360)
+            if angle != self.base_angle:
+                self.move_base_to_angle(angle)
+            return
+        super().command(line)
+
+    def apply_pose(self, pose):
+        super().apply_pose(pose)
+        if BASE_JOINT in pose:
+            angle = constrain(pose[BASE_JOINT], 0, 360)
+            if angle != self.base_angle:
+                self.move_base_to_angle(angle)
+
+    def move_base_to_angle(self, angle):
+        steps = abs(angle - self.base_angle) * self.steps_per_revolution // 360
+
+        def done():
+            self.base_angle = angle
+            self.send_base_pos()
+
+        # Two delayMicroseconds(stepDelay) per step, with the loop stalled
+        self.block(steps * 2 * self.step_delay, done)
+
+    def send_status(self):
+        self.send_angles()
+        self.send_base_pos()
+
+    def send_base_pos(self):
+        if self.binary:
+            self.write(binary_protocol.encode_packet(binary_protocol.BASE_POS, self.base_angle.to_bytes(2, "little")))
+            return
+        self.print("BasePos:")
+        self.println(self.base_angle)
+
+
+class StepperCheck(Sketch):
+    """StepperCheck: free-running stepper driven by ``SPD:`` and ``DIR:``."""
+
+    baudrate = 9600
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.step_delay_us = 500
+        self.direction = 1
+        self.moving = False
+        self.steps = 0.0
+        self._last_loop = None
+
+    def setup(self):
+        self.println("StepperCheck ready")
+
+    def handle(self, line):
+        command = line.strip()
+        if command.startswith("SPD:"):
+            speed = to_int(command[4:])
+            self.step_delay_us = arduino_map(speed, 0, 100, 2000, 100)
+            self.moving = speed > 0
+        elif command == "DIR:1":
+            self.direction = 1
+        elif command == "DIR:-1":
+            self.direction = -1
+
+    def loop(self):
+        if self._last_loop is not None and self.moving:
+            self.steps += self.direction * (self.now - self._last_loop) / (2 * self.step_delay_us * 1e-6)
+        self._last_loop = self.now
+
+
+SKETCHES = {
+    "motor_check2": MotorCheck2,
+    "motor_check3": MotorCheck3,
+    "stepper_check": StepperCheck,
+}
@@ -0,0 +1,82 @@
+"""Precomputed ASCII command lines for the arm sketches."""
+
+from scheduler import BASE_JOINT
+
+# Motor_Check2 constrains base angles to 0-360
+BASE_MAX_ANGLE = 360
+# "9P" field for every angle a command can carry, comma included; None leaves a joint alone
+_FIELDS = {angle: b"%d," % angle for angle in range(BASE_MAX_ANGLE + 1)}
+_FIELDS[None] = b","
+_COMMA = ord(",")
+
+
+class CommandEncoder:
+    """Builds command lines from tables made once, instead of formatting per write.
+
+    ``command(joint, angle)`` returns the immutable ``<joint><angle>\\n`` line
+    for every servo angle up to ``max_angles[joint]`` and, with ``base``, the
+    ``S<angle>\\n`` line for 0-360. ``batch`` assembles several joints into one
+    reusable ``bytearray`` and returns a single ``bytes`` for one write; the
+    copy is needed because the writer queues it while the buffer is reused.
+    Angles outside the tables raise ValueError, callers clamp them first.
+
+    Not thread-safe: the controllers encode on the Tk thread, or under the
+    scheduler's lock when it ticks on its own thread.
+    """
+
+    def __init__(self, max_angles, base=False):
+        self.joints = len(max_angles)
+        self.commands = {
+            joint: {angle: f"{joint}{angle}\n".encode() for angle in range(max_angle + 1)}
+            for joint, max_angle in enumerate(max_angles)
+        }
+        if base:
+            self.commands[BASE_JOINT] = {angle: f"{BASE_JOINT}{angle}\n".encode()
+                                         for angle in range(BASE_MAX_ANGLE + 1)}
+        self._buffer = bytearray()
+
+    def command(self, joint, angle):
+        try:
+            return self.commands[joint][angle]
+        except KeyError:
+            raise ValueError(f"no command for joint {joint!r} at {angle!r}") from None
+
+    def pose(self, angles):
+        """``9P<a0>,<a1>,...`` for a list of servo angles; None leaves a joint alone."""
+        buffer = self._buffer
+        buffer[:] = b"9P"
+        try:
+            for angle in angles:
+                buffer += _FIELDS[angle]
+        except KeyError:
+            raise ValueError(f"no pose field for {angle!r}") from None
+        self._end_pose(buffer)
+        return bytes(buffer)
+
+    def batch(self, batch, pose_frames=False):
+        """One write for ``{joint: angle}``: a ``9P`` frame when allowed and
+        more than one servo moves, otherwise one line per joint, base last."""
+        buffer = self._buffer
+        buffer.clear()
+        commands = self.commands
+        try:
+            if pose_frames and len(batch) - (BASE_JOINT in batch) > 1:
+                buffer += b"9P"
+                for joint in range(self.joints):
+                    buffer += _FIELDS[batch.get(joint)]
+                self._end_pose(buffer)
+            else:
+                for joint in range(self.joints):
+                    if joint in batch:
+                        buffer += commands[joint][batch[joint]]
+            if BASE_JOINT in batch:
+                buffer += commands[BASE_JOINT][batch[BASE_JOINT]]
+        except KeyError:
+            raise ValueError(f"no command for {batch!r}") from None
+        return bytes(buffer)
+
+    def _end_pose(self, buffer):
+        # Trailing empty fields are left off, the sketch stops at the end of the line
+        while buffer[-1] == _COMMA:
+            del buffer[-1]
+        buffer += b"\n"
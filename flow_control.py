@@ -0,0 +1,143 @@
+"""Host-side credit flow control for the Arduino's serial RX buffer."""
+
+import threading
+import time
+
+# Usable bytes in the 64-byte HardwareSerial RX ring, which keeps one slot empty
+DEVICE_BUFFER = 63
+# Motor_Check2's moveBaseToAngle: stepsPerRevolution and stepDelay (µs), two delays per step
+BASE_STEPS_PER_REVOLUTION = 200
+BASE_STEP_DELAY = 0.001
+
+
+def base_move_time(from_angle, to_angle):
+    """How long Motor_Check2 stays blocked moving the base between two angles."""
+    steps = abs(to_angle - from_angle) * BASE_STEPS_PER_REVOLUTION // 360
+    return steps * 2 * BASE_STEP_DELAY
+
+
+class CreditFlow:
+    """Tracks bytes outstanding in the firmware's RX buffer for SerialWriter.
+
+    While the sketch runs its loop it reads each line as soon as it arrives,
+    so outstanding bytes drain at the baud rate and every ``Angles:`` frame
+    returns the credit of all bytes that have crossed the wire by then. A
+    command that blocks the sketch (``busy_for`` seconds,
+    see :func:`base_move_time`) stops that: everything queued after it is held
+    in the writer, where slider updates keep coalescing, until ``BasePos:``
+    reports the move finished. Nothing that arrives during the move can be
+    dropped, and what goes out afterwards is the newest target rather than a
+    backlog of stale ones. The price is rate: nothing goes out during a move,
+    where without flow control up to a buffer's worth of (by then stale)
+    commands would still be read afterwards, so fewer commands are delivered
+    per second, none of them lost.
+
+    If the move finishes without feedback (the base was already there), the
+    predicted time ends the hold and at most ``buffer_size`` bytes go out until
+    feedback or ``grace`` seconds confirm the sketch is reading again.
+    """
+
+    def __init__(self, buffer_size=DEVICE_BUFFER, baudrate=115200, margin=0.002, grace=1.0):
+        self.buffer_size = buffer_size
+        self.baudrate = baudrate
+        self.margin = margin
+        self.grace = grace
+        # Called without the lock held whenever credit comes back, to wake the writer
+        self.on_credit = None
+
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._drained_at = 0.0
+        self._busy_until = 0.0
+        self._feedback_due = 0.0
+
+        self.holds = 0
+        self.hold_time = 0.0
+        self.credit_returns = 0
+        self.busy_periods = 0
+        self.peak_outstanding = 0
+        self._held_since = None
+
+    @property
+    def busy(self):
+        return time.perf_counter() < self._busy_until
+
+    @property
+    def outstanding(self):
+        return self._outstanding
+
+    def delay(self, size):
+        """Seconds to wait before writing ``size`` bytes; 0 if they may go now."""
+        with self._lock:
+            now = time.perf_counter()
+            self._expire(now)
+            if now < self._busy_until:
+                wait = self._busy_until - now
+            elif self._outstanding + size <= self.buffer_size or not self._outstanding:
+                if self._held_since is not None:
+                    self.hold_time += now - self._held_since
+                    self._held_since = None
+                return 0.0
+            elif now < self._feedback_due:
+                wait = self._feedback_due - now
+            else:
+                wait = max(self.margin, self._drained_at + self.margin - now)
+            if self._held_since is None:
+                self._held_since = now
+                self.holds += 1
+            return wait
+
+    def room(self):
+        """Bytes that may be written now without waiting; 0 while the sketch is blocked."""
+        with self._lock:
+            now = time.perf_counter()
+            self._expire(now)
+            if now < self._busy_until:
+                return 0
+            return max(0, self.buffer_size - self._outstanding)
+
+    def consume(self, size, busy_for=0.0):
+        """Record ``size`` bytes written; ``busy_for`` if they block the sketch."""
+        with self._lock:
+            now = time.perf_counter()
+            self._expire(now)
+            self._outstanding += size
+            self.peak_outstanding = max(self.peak_outstanding, self._outstanding)
+            self._drained_at = max(self._drained_at, now) + size * 10 / self.baudrate
+            if busy_for:
+                # The block starts once the command has crossed the wire
+                self._busy_until = max(self._busy_until, self._drained_at + busy_for)
+                self._feedback_due = self._busy_until + self.grace
+                self.busy_periods += 1
+
+    def returned(self, busy_ended=False):
+        """Feedback arrived: an ``Angles:`` frame, or ``BasePos:`` with ``busy_ended``."""
+        with self._lock:
+            now = time.perf_counter()
+            if busy_ended or now >= self._busy_until:
+                # The sketch prints nothing while blocked, so feedback after the
+                # predicted end of a move means it is reading again
+                self._busy_until = self._feedback_due = 0.0
+            else:
+                # May have been sent before the sketch read the blocking command
+                return
+            # Bytes still crossing the wire can't have been read yet
+            self._outstanding = min(self._outstanding, max(0, int((self._drained_at - now) * self.baudrate / 10)))
+            self.credit_returns += 1
+        if self.on_credit:
+            self.on_credit()
+
+    def stats(self):
+        return {
+            "outstanding": self._outstanding,
+            "peak_outstanding": self.peak_outstanding,
+            "holds": self.holds,
+            "hold_ms_total": 1000 * self.hold_time,
+            "busy_periods": self.busy_periods,
+            "credit_returns": self.credit_returns,
+        }
+
+    def _expire(self, now):
+        # Without feedback, assume the sketch read everything once it has arrived
+        if now >= self._feedback_due and now >= self._drained_at + self.margin:
+            self._outstanding = 0
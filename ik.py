@@ -0,0 +1,267 @@
+"""Inverse kinematics: servo and base angles that put the gripper at X/Y/Z."""
+
+import math
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from kinematics import ArmKinematics, GRIPPER, WRIST, WRIST_PITCH, ELBOW, SHOULDER, BASE
+
+# Motor_Check2's servo limits and base range
+ARM_MAX_ANGLES = (45, 180, 180, 180, 180)
+BASE_RANGE = 360
+# The planar joints solved numerically, shoulder first as the chain runs
+PLANAR = (SHOULDER, ELBOW, WRIST_PITCH)
+# Hand pitches tried in closed form when least squares gets stuck
+SWEEP_PITCHES = 180
+
+IKSolution = namedtuple("IKSolution", "pose error converged iterations cached")
+
+
+def _wrap(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+class IKSolver:
+    """Finds a pose (six degrees, :data:`kinematics.JOINTS` order) for a gripper position.
+
+    The base is analytic: it turns to face the target, or away from it with
+    the arm leaning back over the top, whichever is closer to the seed's
+    base angle, since every base move blocks the sketch; if that side can't
+    reach, the other is tried. Shoulder, elbow and wrist pitch then close
+    the remaining distance in the vertical plane by damped least squares,
+    starting from the seed (the current feedback pose), clamped to
+    ``max_angles`` after every step. With three joints for two coordinates
+    the minimum-norm steps keep the arm close to the seed; where they stall
+    against a limit, or straight up at home, closed-form solutions over a
+    sweep of hand pitches take over.
+
+    ``pitch`` pins the hand's angle too, in radians above the horizontal
+    pointing away from the base axis. Position and pitch fix all three
+    joints, so those are solved in closed form, elbow up or down on either
+    side, nearest the seed; only what's out of reach falls back to least
+    squares. Gripper and wrist roll are left as the seed has them.
+
+    ``solve_batch`` does all of it for N targets at once. ``solve`` answers
+    single targets through an LRU cache keyed by the target rounded to
+    ``quantum`` (in the link lengths' unit), so nudging towards the same
+    spot doesn't solve again. The key also holds the side of the base the
+    seed would pick and its planar joints in ``seed_quantum`` degree
+    buckets, so a seed from elsewhere solves afresh rather than being sent
+    to a pose far from it; a hit keeps the seed's gripper and wrist roll.
+    Only converged solutions are cached, so a spot that was out of reach
+    from one seed is tried again from the next.
+    """
+
+    def __init__(self, kinematics=None, max_angles=ARM_MAX_ANGLES, tolerance=0.5, damping=5.0,
+                 max_iterations=100, max_step=40.0, quantum=1.0, pitch_quantum=0.01, seed_quantum=30.0,
+                 cache_size=4096):
+        self.kinematics = kinematics or ArmKinematics()
+        self.max_angles = tuple(max_angles)
+        self.tolerance = tolerance
+        self.damping = damping
+        self.max_iterations = max_iterations
+        self.max_step = max_step
+        self.quantum = quantum
+        self.pitch_quantum = pitch_quantum
+        self.seed_quantum = seed_quantum
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        # Servo limits as joint radians; a negative direction swaps the ends
+        low = self.kinematics.radians([[0.0] * 6])[0]
+        high = self.kinematics.radians([list(self.max_angles) + [BASE_RANGE]])[0]
+        self._low = np.minimum(low, high)[list(PLANAR)]
+        self._high = np.maximum(low, high)[list(PLANAR)]
+
+        self.solves = 0
+        self.hits = 0
+
+    def solve(self, target, seed, pitch=None):
+        """One :class:`IKSolution` for ``target`` (x, y, z), warm-started from ``seed``."""
+        key = self._key(target, seed, pitch)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            pose = list(cached.pose)
+            pose[GRIPPER], pose[WRIST] = seed[GRIPPER], seed[WRIST]
+            return cached._replace(pose=pose, cached=True)
+        poses, errors, converged, iterations = self.solve_batch([target], [seed], pitch)
+        solution = IKSolution(poses[0].tolist(), float(errors[0]), bool(converged[0]), int(iterations[0]), False)
+        if solution.converged:
+            self._cache[key] = solution
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return solution
+
+    def solve_batch(self, targets, seeds, pitch=None):
+        """``(poses, errors, converged, iterations)`` for N targets and N (or one) seeds.
+
+        ``poses`` is N x 6 degrees, servos within ``max_angles`` and the base
+        in 0-360; ``errors`` is the remaining distance to each target, with
+        any pitch error counted as that arc at the end of the hand.
+        """
+        targets = np.asarray(targets, dtype=float).reshape(-1, 3)
+        n = len(targets)
+        q = self.kinematics.radians(np.broadcast_to(np.asarray(seeds, dtype=float), (n, 6)))
+        self.solves += n
+
+        x, y, z = targets.T
+        reach = np.hypot(x, y)
+        facing = np.arctan2(y, x)
+        # Facing the target, or turned half a turn with the arm leaning back
+        behind = np.abs(_wrap(facing + np.pi - q[:, BASE])) < np.abs(_wrap(facing - q[:, BASE]))
+        # On the base axis any base angle will do, so keep the seed's
+        on_axis = reach < 1e-9
+        behind &= ~on_axis
+        planar_target = np.stack([np.where(behind, -reach, reach), z - self.kinematics.base_height], axis=1)
+        if pitch is not None:
+            pitches = np.broadcast_to(np.asarray(pitch, dtype=float), (n,))
+            # Leaning back mirrors the hand's pitch too
+            planar_target = np.column_stack([planar_target, np.where(behind, np.pi - pitches, pitches)])
+
+        planar = q[:, list(PLANAR)]
+        seed_planar = planar.copy()
+        # Extra base travel if the other side is chosen
+        switch = np.abs(np.abs(_wrap(facing + np.pi - q[:, BASE])) - np.abs(_wrap(facing - q[:, BASE])))
+        if pitch is None:
+            errors, iterations = self._solve_planar(planar, planar_target)
+            failed = np.flatnonzero(errors > self.tolerance)
+            if len(failed):
+                # Stuck on a limit or straight up at home: try the hand at a spread of
+                # pitches in closed form, either side, and keep the nearest that fits
+                pitches = np.linspace(-np.pi, np.pi, SWEEP_PITCHES, endpoint=False)
+                m, k = len(failed), len(pitches)
+                target = np.column_stack([np.repeat(planar_target[failed], k, axis=0), np.tile(pitches, m)])
+                candidate, side, cost = self._closed_form(np.repeat(seed_planar[failed], k, axis=0), target,
+                                                          np.repeat(behind[failed], k), np.repeat(switch[failed], k))
+                nearest = np.argmin(cost.reshape(m, k), axis=1) + k * np.arange(m)
+                found = np.isfinite(cost[nearest])
+                planar[failed[found]] = candidate[nearest[found]]
+                behind[failed[found]] = side[nearest[found]]
+                errors[failed[found]] = 0.0
+        else:
+            # Position and hand pitch fix all three joints, so solve in closed form
+            planar, side, cost = self._closed_form(seed_planar, planar_target, behind, switch)
+            behind = side
+            errors = np.zeros(n)
+            iterations = np.zeros(n, dtype=int)
+            unsolved = ~np.isfinite(cost)
+            if unsolved.any():
+                # Out of reach or past a limit: get as close as least squares can
+                rest = seed_planar[unsolved]
+                errors[unsolved], iterations[unsolved] = self._solve_planar(rest, planar_target[unsolved])
+                planar[unsolved] = rest
+
+        q[:, list(PLANAR)] = planar
+        q[:, BASE] = np.where(on_axis, q[:, BASE], facing + np.where(behind, np.pi, 0.0))
+        poses = self.kinematics.degrees(q)
+        poses[:, BASE] %= BASE_RANGE
+        return poses, errors, errors <= self.tolerance, iterations
+
+    def stats(self):
+        return {
+            "solves": self.solves,
+            "cache_hits": self.hits,
+            "cache_size": len(self._cache),
+        }
+
+    def _key(self, target, seed, pitch):
+        """Cache key: the rounded target and pitch, the base side ``seed`` picks, its planar joints bucketed."""
+        x, y, _ = target
+        key = tuple(round(value / self.quantum) for value in target)
+        key += (None if pitch is None else round(pitch / self.pitch_quantum),)
+        # The side solve_batch starts from, by the same rule
+        kinematics = self.kinematics
+        base = kinematics.directions[BASE] * math.radians(seed[BASE] - kinematics.offsets[BASE])
+        facing = math.atan2(y, x)
+        behind = math.hypot(x, y) >= 1e-9 and abs(_wrap(facing + math.pi - base)) < abs(_wrap(facing - base))
+        key += (behind,) + tuple(int(seed[joint] // self.seed_quantum) for joint in PLANAR)
+        return key
+
+    def _closed_form(self, q, target, behind, switch):
+        """Shoulder/elbow/wrist pitch for (reach, height, pitch) targets without iterating.
+
+        Tries elbow up and down on both sides of the base and keeps the one
+        within the limits nearest ``q``, counting ``switch`` for turning the
+        base to the side other than ``behind``. Returns the joints, the side
+        and that distance, infinite where nothing fits.
+        """
+        upper_arm, forearm, hand = self.kinematics.links
+        best = np.full(len(target), np.inf)
+        best_q = q.copy()
+        best_behind = behind.copy()
+        for flip in (False, True):
+            reach = -target[:, 0] if flip else target[:, 0]
+            pitch = np.pi - target[:, 2] if flip else target[:, 2]
+            # Where the wrist pitch joint has to be
+            wrist_r = reach - hand * np.cos(pitch)
+            wrist_h = target[:, 1] - hand * np.sin(pitch)
+            cos_elbow = (wrist_r ** 2 + wrist_h ** 2 - upper_arm ** 2 - forearm ** 2) / (2 * upper_arm * forearm)
+            reachable = np.abs(cos_elbow) <= 1.0
+            for sign in (1.0, -1.0):
+                elbow = sign * np.arccos(np.clip(cos_elbow, -1.0, 1.0))
+                shoulder = np.arctan2(wrist_h, wrist_r) - np.arctan2(forearm * np.sin(elbow),
+                                                                     upper_arm + forearm * np.cos(elbow))
+                candidate = np.stack([shoulder, elbow, pitch - shoulder - elbow], axis=1)
+                # The same joint angle a turn away may be inside the limits
+                candidate = self._low + (candidate - self._low) % (2 * np.pi)
+                valid = reachable & (candidate <= self._high).all(axis=1)
+                cost = np.abs(candidate - q).sum(axis=1) + (switch if flip else 0.0)
+                cost = np.where(valid, cost, np.inf)
+                better = cost < best
+                best[better] = cost[better]
+                best_q[better] = candidate[better]
+                best_behind[better] = behind[better] ^ flip
+        return best_q, best_behind, best
+
+    def _solve_planar(self, q, target):
+        """Damped least squares on shoulder/elbow/wrist pitch, in place; returns errors and iterations."""
+        upper_arm, forearm, hand = self.kinematics.links
+        n, rows = target.shape
+        damping = self.damping ** 2 * np.eye(rows)
+        errors = np.zeros(n)
+        iterations = np.zeros(n, dtype=int)
+        active = np.arange(n)
+        for _ in range(self.max_iterations + 1):
+            qa = q[active]
+            a1 = qa[:, 0]
+            a2 = a1 + qa[:, 1]
+            a3 = a2 + qa[:, 2]
+            c1, c2, c3 = np.cos(a1), np.cos(a2), np.cos(a3)
+            s1, s2, s3 = np.sin(a1), np.sin(a2), np.sin(a3)
+            hand_r, hand_h = hand * c3, hand * s3
+            fore_r, fore_h = forearm * c2 + hand_r, forearm * s2 + hand_h
+            reach, height = upper_arm * c1 + fore_r, upper_arm * s1 + fore_h
+
+            error = np.empty((len(active), rows))
+            error[:, 0] = target[active, 0] - reach
+            error[:, 1] = target[active, 1] - height
+            if rows == 3:
+                # Pitch error is in radians; weight it like the hand's length in millimetres
+                error[:, 2] = hand * _wrap(target[active, 2] - a3)
+            distance = np.hypot(error[:, 0], error[:, 1])
+            errors[active] = distance if rows == 2 else np.hypot(distance, error[:, 2])
+            done = errors[active] <= self.tolerance
+            active, qa, error = active[~done], qa[~done], error[~done]
+            if not len(active) or _ == self.max_iterations:
+                break
+            height, reach = height[~done], reach[~done]
+            fore_r, fore_h, hand_r, hand_h = fore_r[~done], fore_h[~done], hand_r[~done], hand_h[~done]
+
+            # Jacobian of (reach, height[, hand * pitch]) over the three joints
+            jacobian = np.empty((len(active), rows, 3))
+            jacobian[:, 0] = np.stack([-height, -fore_h, -hand_h], axis=1)
+            jacobian[:, 1] = np.stack([reach, fore_r, hand_r], axis=1)
+            if rows == 3:
+                jacobian[:, 2] = hand
+            # Long steps leave the linear region; shorten them, keeping the direction
+            length = np.linalg.norm(error, axis=1, keepdims=True)
+            error *= np.minimum(1.0, self.max_step / np.maximum(length, 1e-12))
+            transposed = jacobian.transpose(0, 2, 1)
+            step = transposed @ np.linalg.solve(jacobian @ transposed + damping, error[:, :, None])
+            qa = np.clip(qa + step[:, :, 0], self._low, self._high)
+            q[active] = qa
+            iterations[active] += 1
+        return errors, iterations
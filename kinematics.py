@@ -0,0 +1,132 @@
+"""Forward kinematics for the 5-servo arm on the stepper base (Motor_Check2)."""
+
+import math
+
+import numpy as np
+
+# Columns of a pose: the five servos in firmware order, then the base,
+# so a pose is list(parser.angles[:5]) + [parser.base]
+JOINTS = ("gripper", "wrist", "wrist_pitch", "elbow", "shoulder", "base")
+GRIPPER, WRIST, WRIST_PITCH, ELBOW, SHOULDER, BASE = range(6)
+
+# Servo degrees at which each joint is at its zero: with the sketch's home
+# pose (all 90°) the arm stands straight up, shoulder at 90° elevation
+DEFAULT_OFFSETS = (0.0, 90.0, 90.0, 90.0, 0.0, 0.0)
+DEFAULT_DIRECTIONS = (1, 1, 1, 1, 1, 1)
+# Millimetres; measure your own arm
+DEFAULT_LINKS = {"base_height": 70.0, "upper_arm": 105.0, "forearm": 98.0, "hand": 150.0}
+
+
+class ArmKinematics:
+    """Gripper position and orientation from servo and base angles in degrees.
+
+    The base turns everything about the vertical axis; shoulder, elbow and
+    wrist pitch bend in the vertical plane the base points along, each
+    relative to the link before it; the wrist rolls the hand about its own
+    axis. The gripper opens and closes without moving the tool point.
+
+    A joint's angle in radians is ``direction * (servo - offset)``. Positions
+    are ``(x, y, z)`` in the link lengths' unit with the origin on the base
+    axis at the base plate; orientations are ``(yaw, pitch, roll)`` in
+    radians, yaw about z, pitch of the hand above horizontal and roll about
+    the hand, so the rotation is ``Rz(yaw) @ Ry(-pitch) @ Rx(roll)``.
+    """
+
+    def __init__(self, base_height=DEFAULT_LINKS["base_height"], upper_arm=DEFAULT_LINKS["upper_arm"],
+                 forearm=DEFAULT_LINKS["forearm"], hand=DEFAULT_LINKS["hand"],
+                 offsets=DEFAULT_OFFSETS, directions=DEFAULT_DIRECTIONS):
+        if len(offsets) != len(JOINTS) or len(directions) != len(JOINTS):
+            raise ValueError(f"offsets and directions need one value per joint {JOINTS}")
+        self.base_height = base_height
+        self.links = (upper_arm, forearm, hand)
+        self.offsets = tuple(float(offset) for offset in offsets)
+        self.directions = tuple(directions)
+        # degrees -> radians folded into one multiply-add per column
+        self._scale = np.radians(np.asarray(directions, dtype=float))
+        self._shift = -self._scale * np.asarray(offsets, dtype=float)
+
+    def radians(self, poses):
+        """Joint radians for an N x 6 array of servo/base degrees."""
+        return np.asarray(poses, dtype=float) * self._scale + self._shift
+
+    def degrees(self, joints):
+        """Servo/base degrees for an N x 6 array of joint radians; inverse of :meth:`radians`."""
+        return (np.asarray(joints, dtype=float) - self._shift) / self._scale
+
+    def joint_angles(self, pose):
+        """Radians for one pose of six servo/base degrees."""
+        return [d * math.radians(a - o) for a, o, d in zip(pose, self.offsets, self.directions)]
+
+    def forward(self, pose):
+        """``(position, orientation)`` tuples for one pose; plain floats, no NumPy."""
+        if len(pose) != len(JOINTS):
+            raise ValueError(f"a pose has one angle per joint {JOINTS}, got {len(pose)}")
+        _, roll, wrist_pitch, elbow, shoulder, yaw = self.joint_angles(pose)
+        upper_arm, forearm, hand = self.links
+        a1 = shoulder
+        a2 = a1 + elbow
+        a3 = a2 + wrist_pitch
+        reach = upper_arm * math.cos(a1) + forearm * math.cos(a2) + hand * math.cos(a3)
+        z = self.base_height + upper_arm * math.sin(a1) + forearm * math.sin(a2) + hand * math.sin(a3)
+        return (reach * math.cos(yaw), reach * math.sin(yaw), z), (yaw, a3, roll)
+
+    def forward_batch(self, poses, out=None, dtype=np.float32):
+        """Positions and orientations, both N x 3, for an N x 6 array of poses.
+
+        Computed in ``dtype``: float32 is off by well under a micrometre on
+        this arm, far below the servos' 1° steps, and NumPy's float32 sin/cos
+        run an order of magnitude faster; use float64 for Jacobians. Batches
+        that fit in cache (tens of thousands of poses) run fastest. ``out`` may be a
+        preallocated ``(positions, orientations)`` pair to fill instead of
+        allocating, for callers sweeping in chunks.
+        """
+        poses = np.asarray(poses)
+        if poses.ndim != 2 or poses.shape[1] != len(JOINTS):
+            raise ValueError(f"poses must be N x {len(JOINTS)}, got {poses.shape}")
+        n = len(poses)
+        if out is None:
+            positions, orientations = np.empty((n, 3), dtype), np.empty((n, 3), dtype)
+        else:
+            positions, orientations = out
+        # One contiguous row per joint, so every ufunc below runs on contiguous memory
+        q = np.empty((len(JOINTS), n), dtype)
+        np.multiply(poses.T, self._scale[:, None].astype(dtype), out=q)
+        q += self._shift[:, None].astype(dtype)
+        upper_arm, forearm, hand = self.links
+
+        # Absolute pitch of each link; a3 is the hand's
+        a1 = q[SHOULDER]
+        a2 = a1 + q[ELBOW]
+        a3 = a2 + q[WRIST_PITCH]
+        reach = np.cos(a1)
+        reach *= upper_arm
+        reach += forearm * np.cos(a2)
+        reach += hand * np.cos(a3)
+        z = np.sin(a1)
+        z *= upper_arm
+        z += forearm * np.sin(a2)
+        z += hand * np.sin(a3)
+        z += self.base_height
+        yaw = q[BASE]
+        positions[:, 0] = reach * np.cos(yaw)
+        positions[:, 1] = reach * np.sin(yaw)
+        positions[:, 2] = z
+
+        orientations[:, 0] = yaw
+        orientations[:, 1] = a3
+        orientations[:, 2] = q[WRIST]
+        return positions, orientations
+
+
+def rotation_matrices(orientations):
+    """N x 3 x 3 rotation matrices for N x 3 ``(yaw, pitch, roll)`` orientations."""
+    orientations = np.asarray(orientations, dtype=float).reshape(-1, 3)
+    cy, sy = np.cos(orientations[:, 0]), np.sin(orientations[:, 0])
+    cp, sp = np.cos(orientations[:, 1]), np.sin(orientations[:, 1])
+    cr, sr = np.cos(orientations[:, 2]), np.sin(orientations[:, 2])
+    # Rz(yaw) @ Ry(-pitch) @ Rx(roll), the hand's axis being x
+    return np.stack([
+        np.stack([cy * cp, -sy * cr - cy * sp * sr, sy * sr - cy * sp * cr], axis=-1),
+        np.stack([sy * cp, cy * cr - sy * sp * sr, -cy * sr - sy * sp * cr], axis=-1),
+        np.stack([sp, cp * sr, cp * cr], axis=-1),
+    ], axis=1)
@@ -0,0 +1,142 @@
+"""Fixed-rate callbacks on absolute deadlines, for streaming setpoints."""
+
+import bisect
+import threading
+import time
+
+# What to do after a tick runs past one or more deadlines
+CATCH_UP = "catch-up"
+SKIP = "skip"
+LATE_POLICIES = (CATCH_UP, SKIP)
+# Upper edges of the lateness histogram buckets, in microseconds; the last bucket is open
+JITTER_EDGES_US = (50, 100, 250, 500, 1000, 2000, 5000, 10000)
+
+
+def jitter_labels(edges=JITTER_EDGES_US):
+    lower = (0,) + edges
+    return [f"<{high}us" if not low else f"{low}-{high}us" for low, high in zip(lower, edges)] + [f">={edges[-1]}us"]
+
+
+class PeriodicScheduler:
+    """Calls ``tick()`` every ``period`` seconds on a thread of its own.
+
+    Deadlines are ``start + n * period`` on ``perf_counter``, never "now plus
+    a period", so lateness doesn't add up into drift. Each wait sleeps until
+    ``spin`` seconds before the deadline and busy-waits the rest; the OS
+    wakes a sleeping thread a few hundred microseconds late at best, more on
+    a loaded box or on Windows.
+
+    When a tick runs past the next deadline (an overrun), ``CATCH_UP`` runs
+    the ticks that are due back to back, unless more than ``max_catch_up``
+    are due, then it resynchronises; ``SKIP`` drops them and waits for the
+    next deadline on the grid.
+    Lateness (deadline to tick start) is kept as a histogram over
+    :data:`JITTER_EDGES_US`.
+    """
+
+    def __init__(self, period, tick, spin=0.0015, late_policy=SKIP, max_catch_up=3, name="periodic"):
+        if period <= 0:
+            raise ValueError(f"period must be positive, not {period!r}")
+        if late_policy not in LATE_POLICIES:
+            raise ValueError(f"late_policy must be one of {LATE_POLICIES}, not {late_policy!r}")
+        self.period = period
+        self.tick = tick
+        self.spin = spin
+        self.late_policy = late_policy
+        self.max_catch_up = max_catch_up
+        self.name = name
+        self._running = False
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.caught_up = 0
+        self.resyncs = 0
+        self.errors = 0
+        self.histogram = [0] * (len(JITTER_EDGES_US) + 1)
+        self.lateness_max = 0.0
+        self._lateness_total = 0.0
+        self._started_at = 0.0
+        self._last_tick = 0.0
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        # A fresh event per run: a thread that outlives stop()'s join stays stopped
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def wait_until(self, deadline, stop=None):
+        """Sleep, then spin, until ``perf_counter()`` reaches ``deadline``; False once stopped."""
+        stop = stop or self._stop
+        remaining = deadline - time.perf_counter() - self.spin
+        if remaining > 0 and stop.wait(remaining):
+            return False
+        while time.perf_counter() < deadline:
+            pass
+        return not stop.is_set()
+
+    def stats(self):
+        ticks = self.ticks
+        return {
+            "ticks": ticks,
+            "period_ms": 1000 * self.period,
+            # Achieved period over the whole run, skipped deadlines included; drift would show up here
+            "period_ms_avg": (1000 * (self._last_tick - self._started_at) / (ticks - 1 + self.skipped)
+                              if ticks > 1 else 0.0),
+            "late_us_avg": 1e6 * self._lateness_total / ticks if ticks else 0.0,
+            "late_us_max": 1e6 * self.lateness_max,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "caught_up": self.caught_up,
+            "resyncs": self.resyncs,
+            "errors": self.errors,
+            "histogram": dict(zip(jitter_labels(), self.histogram)),
+        }
+
+    def _run(self, stop):
+        period = self.period
+        self._started_at = deadline = time.perf_counter() + period
+        while self.wait_until(deadline, stop):
+            now = time.perf_counter()
+            late = now - deadline
+            self.ticks += 1
+            self._last_tick = now
+            self._lateness_total += late
+            self.lateness_max = max(self.lateness_max, late)
+            self.histogram[bisect.bisect_left(JITTER_EDGES_US, late * 1e6)] += 1
+            try:
+                self.tick()
+            except Exception as e:
+                self.errors += 1
+                print(f"{self.name} tick failed: {e!r}")
+
+            deadline += period
+            now = time.perf_counter()
+            if now >= deadline:
+                # This tick ran past the next deadline, or more than one
+                self.overruns += 1
+                behind = int((now - deadline) // period) + 1
+                if self.late_policy == CATCH_UP and behind <= self.max_catch_up:
+                    # The next tick runs at once against its own deadline
+                    self.caught_up += 1
+                    continue
+                if self.late_policy == CATCH_UP:
+                    self.resyncs += 1
+                deadline += behind * period
+                self.skipped += behind
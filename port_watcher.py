@@ -0,0 +1,65 @@
+"""Background watcher that notices serial ports being plugged in or removed."""
+
+import os
+import threading
+
+from serial.tools import list_ports
+
+# Device nodes that can be serial ports on Linux and macOS
+SERIAL_PREFIXES = ("ttyUSB", "ttyACM", "ttyAMA", "ttyS", "rfcomm", "cu.", "tty.")
+
+
+class PortWatcher:
+    """Keeps a cached port list and reports additions and removals.
+
+    ``list_ports.comports()`` walks sysfs, so where ``/dev`` exists the watcher
+    only lists that directory on each poll and rescans when the serial device
+    nodes in it change. Elsewhere it falls back to calling ``comports()`` every
+    ``interval`` seconds. ``on_change(added, removed)`` is called from the
+    watcher thread with sorted device names.
+    """
+
+    def __init__(self, on_change, interval=0.5):
+        self.on_change = on_change
+        self.interval = interval
+        self.ports = frozenset()
+        self.rescans = 0
+
+        self._use_dev = os.path.isdir("/dev")
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="port-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(self.interval + 1)
+        self._thread = None
+
+    def poll(self):
+        if self._use_dev:
+            signature = frozenset(name for name in os.listdir("/dev") if name.startswith(SERIAL_PREFIXES))
+            if signature == self._signature:
+                return
+            self._signature = signature
+
+        self.rescans += 1
+        ports = frozenset(port.device for port in list_ports.comports())
+        added = ports - self.ports
+        removed = self.ports - ports
+        self.ports = ports
+        if added or removed:
+            self.on_change(sorted(added), sorted(removed))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except OSError as e:
+                print(f"Port watcher error: {e}")
+            self._stop.wait(self.interval)
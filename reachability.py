@@ -0,0 +1,308 @@
+"""Precomputed workspace map: which voxels the gripper reaches, and a pose that gets there.
+
+    python reachability.py build [--voxel 10] [--workers 4]   # once, offline
+    python reachability.py query 200 0 150
+
+``build`` sweeps shoulder, elbow and wrist pitch with the base facing along
+x, in parallel, through :meth:`kinematics.ArmKinematics.forward_batch`, and keeps
+the pose landing nearest the centre of each cell of the arm's vertical
+cross-section. Turning the base only rotates that cross-section, so the
+base isn't swept: every voxel of the 3-D grid then takes its seed from the
+cell at its distance from the base axis and height, facing it or leaning
+back over the top, with the base turned towards it.
+
+The grid is saved as a ``.npy`` of ``(nx, ny, nz, 4)`` uint16, wrist pitch,
+elbow, shoulder and base in hundredths of a degree (:data:`UNREACHABLE`
+where the arm can't get), next to a ``.json`` with its origin and voxel
+size. It is written one x slab at a time by the workers and read through
+``np.load(mmap_mode="r")``, so neither side holds the grid in memory: a
+10 mm grid is about 3 MB, a 2 mm one several hundred, of which a query
+pages in only what it touches. The ``.json`` also records the link lengths,
+offsets and directions swept; a map is only good for that arm, so build it
+with ``--links`` (or :func:`build` with your ``kinematics``) to match.
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+
+import numpy as np
+
+from kinematics import ArmKinematics, JOINTS, WRIST_PITCH, ELBOW, SHOULDER, BASE
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workspace.npy")
+# Stored per voxel, in this order
+COLUMNS = (WRIST_PITCH, ELBOW, SHOULDER, BASE)
+UNREACHABLE = np.iinfo(np.uint16).max
+# Gripper and wrist roll don't move the tool point; seeds take these unless given a pose
+HOME = (0, 90, 90, 90, 90, 0)
+# Servo limits of the swept joints, Motor_Check2's
+SWEEP_MAX_ANGLES = {WRIST_PITCH: 180, ELBOW: 180, SHOULDER: 180}
+# Poses per forward_batch call
+CHUNK = 65536
+
+
+def metadata_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+def geometry(kinematics):
+    """The link lengths, offsets and directions of ``kinematics``, as a map's metadata holds them."""
+    return {
+        "links": dict(base_height=kinematics.base_height,
+                      **dict(zip(("upper_arm", "forearm", "hand"), kinematics.links))),
+        "offsets": list(kinematics.offsets),
+        "directions": list(kinematics.directions),
+    }
+
+
+def mismatched(metadata, kinematics):
+    """Names of the :func:`geometry` fields where ``metadata`` differs from ``kinematics``."""
+    names = []
+    for name, value in geometry(kinematics).items():
+        stored = metadata.get(name)
+        if isinstance(value, dict):
+            stored = [stored.get(key) for key in value] if isinstance(stored, dict) else None
+            value = list(value.values())
+        if (not isinstance(stored, list) or len(stored) != len(value)
+                or not all(isinstance(a, (int, float)) and math.isclose(a, b, abs_tol=1e-9)
+                           for a, b in zip(stored, value))):
+            names.append(name)
+    return names
+
+
+def _sweep(task):
+    """Best pose per cross-section cell for one range of shoulder angles."""
+    kinematics, shoulders, angles, origin, voxel, shape = task
+    wrist_pitch, elbow = np.meshgrid(angles[WRIST_PITCH], angles[ELBOW], indexing="ij")
+    wrist_pitch, elbow = wrist_pitch.ravel(), elbow.ravel()
+    poses = np.empty((len(wrist_pitch), len(JOINTS)), np.float32)
+    poses[:] = HOME
+    poses[:, WRIST_PITCH] = wrist_pitch
+    poses[:, ELBOW] = elbow
+    poses[:, BASE] = _base_degrees(kinematics, np.zeros(1))[0]
+    best = (np.empty(0, np.int64), np.empty(0, np.float32), np.empty((0, len(COLUMNS)), np.float32))
+    for shoulder in shoulders:
+        cells, distances, seeds = [best[0]], [best[1]], [best[2]]
+        poses[:, SHOULDER] = shoulder
+        for start in range(0, len(poses), CHUNK):
+            chunk = poses[start:start + CHUNK]
+            positions, _ = kinematics.forward_batch(chunk)
+            # Facing along x the reach, signed, is x and the arm stays in y = 0
+            reach, z = positions[:, 0], positions[:, 2]
+            i = np.floor((reach - origin[0]) / voxel).astype(np.int64)
+            k = np.floor((z - origin[2]) / voxel).astype(np.int64)
+            inside = (i >= 0) & (i < shape[0]) & (k >= 0) & (k < shape[2])
+            i, k, reach, z = i[inside], k[inside], reach[inside], z[inside]
+            distance = np.hypot(reach - (origin[0] + (i + 0.5) * voxel), z - (origin[2] + (k + 0.5) * voxel))
+            cells.append(i * shape[2] + k)
+            distances.append(distance)
+            seeds.append(chunk[inside][:, list(COLUMNS)])
+        # At most one entry per cell is carried over, however fine the sweep
+        best = _nearest(np.concatenate(cells), np.concatenate(distances), np.concatenate(seeds))
+    return best
+
+
+def _nearest(cells, distances, seeds):
+    """Keep the entry nearest its cell's centre, one per cell."""
+    order = np.lexsort((distances, cells))
+    first = np.ones(len(order), bool)
+    first[1:] = cells[order][1:] != cells[order][:-1]
+    keep = order[first]
+    return cells[keep], distances[keep], seeds[keep]
+
+
+def _base_degrees(kinematics, yaw):
+    """Base degrees turning the arm to ``yaw`` radians, through the kinematics' offset and direction."""
+    joints = np.zeros((len(yaw), len(JOINTS)))
+    joints[:, BASE] = yaw
+    return kinematics.degrees(joints)[:, BASE]
+
+
+def _fill(task):
+    """Write the seeds of one x slab of the 3-D grid into the memory-mapped file."""
+    kinematics, path, index, section, origin, voxel = task
+    grid = np.load(path, mmap_mode="r+")
+    _, ny, nz, _ = grid.shape
+    x = origin[0] + (index + 0.5) * voxel
+    y = origin[1] + (np.arange(ny) + 0.5) * voxel
+    k = np.arange(nz)
+    reach = np.hypot(x, y)
+    facing = np.arctan2(y, x)
+    slab = np.full((ny, nz, len(COLUMNS)), UNREACHABLE, np.uint16)
+    # Facing the voxel where the arm can, otherwise turned away and leaning back
+    for sign, turn in ((-1, math.pi), (1, 0.0)):
+        i = np.floor((sign * reach - origin[0]) / voxel).astype(np.int64)
+        valid = (i >= 0) & (i < len(section))
+        cell = section[np.clip(i, 0, len(section) - 1)[:, None], k[None, :]]
+        found = valid[:, None] & (cell[..., 0] != UNREACHABLE)
+        seed = cell.copy()
+        seed[..., -1] = np.rint(100 * (_base_degrees(kinematics, facing + turn) % 360))[:, None]
+        slab[found] = seed[found]
+    grid[index] = slab
+    grid.flush()
+    return int((slab[..., 0] != UNREACHABLE).sum())
+
+
+def build(path=DEFAULT_PATH, voxel=10.0, step=None, workers=None, kinematics=None):
+    """Sweep the joint space and write the map to ``path``; returns its metadata."""
+    kinematics = kinematics or ArmKinematics()
+    radius = sum(kinematics.links)
+    n = math.ceil(2 * radius / voxel)
+    origin = (-radius, -radius, kinematics.base_height - radius)
+    shape = (n, n, n)
+    if step is None:
+        # Fine enough that the tip moves less than half a voxel per step at full stretch
+        step = min(1.0, math.degrees(voxel / (2 * radius)))
+    angles = {joint: np.arange(0, limit + step / 2, step, dtype=np.float32)
+              for joint, limit in SWEEP_MAX_ANGLES.items()}
+    workers = workers or os.cpu_count()
+
+    with multiprocessing.Pool(workers) as pool:
+        shoulders = np.array_split(angles[SHOULDER], workers * 4)
+        tasks = [(kinematics, part, angles, origin, voxel, shape) for part in shoulders if len(part)]
+        results = pool.map(_sweep, tasks)
+        cells, distances, seeds = _nearest(*(np.concatenate(column) for column in zip(*results)))
+        # Reach (signed) by height, in hundredths of a degree
+        section = np.full((n, n, len(COLUMNS)), UNREACHABLE, np.uint16)
+        section.reshape(-1, len(COLUMNS))[cells] = np.rint(100 * seeds)
+
+        np.lib.format.open_memmap(path, mode="w+", dtype=np.uint16, shape=shape + (len(COLUMNS),)).flush()
+        reachable = sum(pool.map(_fill, [(kinematics, path, index, section, origin, voxel) for index in range(n)]))
+
+    metadata = {
+        "origin": origin,
+        "voxel": voxel,
+        "shape": shape,
+        "step": step,
+        **geometry(kinematics),
+        "reachable": reachable,
+    }
+    with open(metadata_path(path), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+class ReachabilityMap:
+    """Reachability and IK seeds from a map made by :func:`build`.
+
+    The file is opened on first use, memory-mapped, so only the pages
+    holding queried voxels are ever read. Points are ``(x, y, z)`` in the
+    kinematics' frame; a point is reachable when the voxel holding it is,
+    so near the edge of the workspace the answer is good to a voxel.
+
+    Given ``kinematics``, a map built for other link lengths, offsets or
+    directions is refused: ``available`` is False, saying why once, and
+    ``load`` raises ValueError. So is a map whose ``.json`` is malformed
+    or doesn't match its ``.npy``.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, kinematics=None):
+        self.path = path
+        self.kinematics = kinematics
+        self.metadata = None
+        self._grid = None
+        self._refused = False
+
+    @property
+    def available(self):
+        if self._grid is not None:
+            return True
+        if self._refused or not (os.path.exists(self.path) and os.path.exists(metadata_path(self.path))):
+            return False
+        try:
+            self.load()
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Workspace map not used: {e}")
+            self._refused = True
+            return False
+        return True
+
+    def load(self):
+        if self._grid is None:
+            with open(metadata_path(self.path)) as f:
+                metadata = json.load(f)
+            if not isinstance(metadata, dict):
+                raise ValueError(f"{metadata_path(self.path)} doesn't hold a map's metadata")
+            names = mismatched(metadata, self.kinematics) if self.kinematics is not None else []
+            if names:
+                raise ValueError(f"{self.path} was built for other {', '.join(names)} than this arm's; "
+                                 f"rebuild it with \"python reachability.py build --links ...\"")
+            try:
+                origin = tuple(float(value) for value in metadata["origin"])
+                voxel = float(metadata["voxel"])
+                shape = list(metadata["shape"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{metadata_path(self.path)} is malformed ({type(e).__name__}: {e})") from None
+            grid = np.load(self.path, mmap_mode="r")
+            if len(origin) != 3 or shape != list(grid.shape[:3]):
+                raise ValueError(f"{metadata_path(self.path)} doesn't match {self.path}")
+            self.metadata = metadata
+            self._grid = grid
+            self._origin = origin
+            self._voxel = voxel
+            self._shape = grid.shape[:3]
+        return self._grid
+
+    def reachable(self, point):
+        return self.seed(point) is not None
+
+    def seed(self, point, pose=HOME):
+        """Six degrees putting the gripper in ``point``'s voxel, or None; gripper and wrist as in ``pose``."""
+        grid = self.load()
+        # Plain floats: one voxel doesn't pay for NumPy's per-call overhead
+        index = [math.floor((value - origin) / self._voxel) for value, origin in zip(point, self._origin)]
+        if not all(0 <= i < n for i, n in zip(index, self._shape)):
+            return None
+        stored = grid[index[0], index[1], index[2]].tolist()
+        if stored[0] == UNREACHABLE:
+            return None
+        seed = list(pose)
+        for joint, value in zip(COLUMNS, stored):
+            seed[joint] = value / 100.0
+        return seed
+
+    def seeds(self, points, pose=HOME):
+        """``(seeds, found)`` for N points: N x 6 degrees (NaN where unreachable) and a mask."""
+        grid = self.load()
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        index = np.floor((points - self._origin) / self._voxel).astype(np.int64)
+        inside = ((index >= 0) & (index < self._shape)).all(axis=1)
+        stored = np.full((len(points), len(COLUMNS)), UNREACHABLE, np.uint16)
+        i, j, k = index[inside].T
+        stored[inside] = grid[i, j, k]
+        found = stored[:, 0] != UNREACHABLE
+        seeds = np.full((len(points), len(JOINTS)), np.nan)
+        seeds[found] = pose
+        seeds[np.ix_(found, COLUMNS)] = stored[found] / 100.0
+        return seeds, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--map", default=DEFAULT_PATH, help="the .npy file; its .json sits beside it")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="sweep the joint space and write the map")
+    build_parser.add_argument("--voxel", type=float, default=10.0, help="voxel edge, in the link lengths' unit")
+    build_parser.add_argument("--step", type=float, help="joint step in degrees; from the voxel size when left out")
+    build_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    build_parser.add_argument("--links", type=float, nargs=4, metavar=("BASE_HEIGHT", "UPPER_ARM", "FOREARM", "HAND"),
+                              help="link lengths of your arm; kinematics.py's defaults when left out")
+    query_parser = commands.add_parser("query", help="look up one point")
+    query_parser.add_argument("point", type=float, nargs=3, metavar=("X", "Y", "Z"))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        kinematics = ArmKinematics(*args.links) if args.links else None
+        metadata = build(args.map, args.voxel, args.step, args.workers, kinematics)
+        total = math.prod(metadata["shape"])
+        print(f"{metadata['reachable']} of {total} voxels reachable, written to {args.map}")
+        return
+    seed = ReachabilityMap(args.map).seed(args.point)
+    print(f"Reachable, seed {[round(angle, 2) for angle in seed]}" if seed else "Unreachable")
+
+
+if __name__ == "__main__":
+    main()
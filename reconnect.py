@@ -0,0 +1,108 @@
+"""Reconnects to the arm after the link drops, with exponential backoff."""
+
+import random
+import threading
+import time
+
+
+class ReconnectSupervisor:
+    """Retries a connect function until it succeeds or is cancelled.
+
+    The wait before attempt ``n`` is ``base_delay * 2**n`` capped at
+    ``max_delay``, shortened by a random fraction up to ``jitter`` so several
+    clients behind the same hub don't retry in lockstep. ``wake`` skips the
+    current wait, e.g. when the port shows up again.
+
+    ``on_attempt(attempt, delay)`` and ``on_reconnected(result)`` are called from
+    the supervisor thread.
+
+    Each ``start`` gets its own thread and cancel event, and ``cancel`` only
+    sets the event, so it never blocks the caller. A thread cancelled in the
+    middle of ``connect()`` finishes that call and exits; whatever it got is
+    handed to ``on_abandoned(result)`` (to close the port) instead of
+    ``on_reconnected``, so it can't race the next run.
+    """
+
+    def __init__(self, on_reconnected, on_attempt=None, base_delay=0.25, max_delay=8.0, jitter=0.5,
+                 on_abandoned=None):
+        self.on_reconnected = on_reconnected
+        self.on_attempt = on_attempt
+        self.on_abandoned = on_abandoned
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+        self._cancel = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._down_since = None
+
+        self.reconnects = 0
+        self.attempts = 0
+        self.downtime_total = 0.0
+        self.last_downtime = 0.0
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, connect):
+        """Begin retrying ``connect()``; its return value goes to ``on_reconnected``."""
+        self.cancel()
+        # Fresh events, so the run just cancelled stays cancelled
+        self._cancel = threading.Event()
+        self._wake = threading.Event()
+        self._down_since = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(connect, self._cancel, self._wake),
+                                        name="serial-reconnect", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+        self._wake.set()
+        self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay * (1 - self.jitter * random.random())
+
+    def stats(self):
+        return {
+            "reconnects": self.reconnects,
+            "attempts": self.attempts,
+            "downtime_s_total": self.downtime_total,
+            "downtime_s_last": self.last_downtime,
+        }
+
+    def _run(self, connect, cancel, wake):
+        attempt = 0
+        while not cancel.is_set():
+            delay = self.backoff(attempt)
+            attempt += 1
+            if self.on_attempt:
+                self.on_attempt(attempt, delay)
+            wake.wait(delay)
+            wake.clear()
+            if cancel.is_set():
+                return
+
+            self.attempts += 1
+            try:
+                result = connect()
+            except Exception as e:
+                print(f"Reconnect attempt {attempt} failed: {e}")
+                continue
+            if cancel.is_set():
+                # Cancelled while connecting; a newer run may already own the port
+                if self.on_abandoned:
+                    self.on_abandoned(result)
+                return
+
+            self.last_downtime = time.perf_counter() - self._down_since
+            self.downtime_total += self.last_downtime
+            self.reconnects += 1
+            self.on_reconnected(result)
+            return
@@ -0,0 +1,140 @@
+"""Rate-limited command scheduler between the Tk sliders and the serial port."""
+
+import threading
+
+from periodic import PeriodicScheduler
+from serial_writer import STREAM
+
+# Key used for the base/stepper joint; matches the firmware's "S<angle>" command
+BASE_JOINT = "S"
+
+
+class CommandScheduler:
+    """Keeps the latest target per joint and flushes them on a fixed Tk tick.
+
+    Targets that are overwritten before a tick, or that repeat the last angle
+    sent for that joint, are counted as coalesced and never reach the port.
+    Everything that changed since the last tick goes to ``send`` as one
+    ``{joint: angle}`` batch, so a multi-joint move is a single write.
+    ``send(batch, priority)`` also gets the writer lane: ticks stream, and a
+    button flushes straight away with a higher one.
+
+    Ticks come from ``root.after``, or with ``precise`` set before ``start``
+    from a :class:`PeriodicScheduler` thread on absolute deadlines, since
+    ``after`` drifts and jitters by milliseconds. ``lock`` is then held for
+    every change and flush, so ``send`` runs under it on either thread.
+    ``sources`` are called at the start of every tick to submit setpoints.
+    """
+
+    def __init__(self, root, send, rate_hz=50, precise=False):
+        self.root = root
+        self.send = send
+        self.rate_hz = rate_hz
+        self.interval_ms = max(1, round(1000 / rate_hz))
+        self.precise = precise
+        self.ticker = None
+        self.lock = threading.RLock()
+        self.sources = []
+        self.pending = {}
+        self.last_sent = {}
+        # Latest target per joint for the whole session, kept across reconnects
+        self.targets = {}
+        self.submitted = 0
+        self.sent = 0
+        self.coalesced = 0
+        self._job = None
+
+    def submit(self, joint, angle):
+        """Queue a target for the next tick, replacing any pending one."""
+        with self.lock:
+            if joint in self.pending:
+                self.coalesced += 1
+            self.pending[joint] = angle
+            self.targets[joint] = angle
+            self.submitted += 1
+
+    def submit_pose(self, pose):
+        """Queue several ``{joint: angle}`` targets to go out in the same batch."""
+        with self.lock:
+            for joint, angle in pose.items():
+                self.submit(joint, angle)
+
+    def flush(self, priority=STREAM):
+        """Send every pending target that differs from the last one sent."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            batch = {}
+            for joint, angle in pending.items():
+                if self.last_sent.get(joint) == angle:
+                    self.coalesced += 1
+                    continue
+                batch[joint] = angle
+            if batch:
+                self.send(batch, priority)
+                self.last_sent.update(batch)
+                self.sent += len(batch)
+
+    def resend(self, joints=None):
+        """Send the session targets for ``joints`` (default all) again in one batch.
+
+        Used after the board reset, or when a command was never acknowledged.
+        """
+        with self.lock:
+            joints = self.targets.keys() if joints is None else [joint for joint in joints if joint in self.targets]
+            for joint in joints:
+                self.pending[joint] = self.targets[joint]
+                self.last_sent.pop(joint, None)
+            self.flush()
+
+    def hold(self, pose):
+        """Forget pending targets; the firmware was told to stop at ``pose``.
+
+        What was sent for other joints may have been discarded before reaching
+        the port, so their next target always goes out.
+        """
+        with self.lock:
+            self.pending.clear()
+            self.last_sent.clear()
+            self.targets.update(pose)
+            self.last_sent.update(pose)
+
+    def tick(self):
+        """Collect setpoints from ``sources`` and flush them."""
+        with self.lock:
+            for source in self.sources:
+                source()
+            self.flush()
+
+    def start(self):
+        if self.precise:
+            if self.ticker is None:
+                self.ticker = PeriodicScheduler(1 / self.rate_hz, self.tick, name="command-ticks")
+            self.ticker.start()
+        elif self._job is None:
+            self._job = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self.ticker:
+            self.ticker.stop()
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        with self.lock:
+            self.pending.clear()
+            self.last_sent.clear()
+
+    def stats(self):
+        stats = {
+            "submitted": self.submitted,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+        }
+        if self.ticker:
+            stats["ticks"] = self.ticker.stats()
+        return stats
+
+    def _tick(self):
+        try:
+            self.tick()
+        finally:
+            self._job = self.root.after(self.interval_ms, self._tick)
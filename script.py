@@ -1,6 +1,7 @@
 import serial
 import time
 import keyboard  # Install this using: pip install keyboard
+from connect import wait_ready
 
 # Replace with your Arduino COM port (e.g., "COM3" on Windows or "/dev/ttyUSB0" on Linux)
 arduino_port = "COM11"
@@ -8,7 +9,7 @@ baud_rate = 9600
 
 try:
     ser = serial.Serial(arduino_port, baud_rate, timeout=1)
-    time.sleep(2)  # Wait for connection
+    wait_ready(ser, banners=(b"Servo initialized",), timeout=2)  # Wait for the sketch's setup() to finish
     print("Connected to Arduino!")
 
     while True:
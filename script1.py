@@ -1,14 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import time
-import threading
 import ttkbootstrap as tb
-from serial.tools import list_ports
+from discovery import MOTOR_CHECK3
+from serial_writer import PRESET
+from arm_panel import ArmPanel
+
+class ArmController(ArmPanel):
+    prefer = (MOTOR_CHECK3,)
 
-class ArmController:
     def __init__(self, root):
-        self.root = root
+        # Define servo names and maximum angles; Motor_Check3 has no stepper base
+        self.servo_names = ["Gripper", "Elbow", "Shoulder", "Base"]
+        super().__init__(root, [45, 180, 180, 180], base=False)
         self.root.title("4-DOF Robotic Arm Control Panel")
         self.root.geometry("600x800")
         self.style = tb.Style("darkly")
@@ -19,23 +22,16 @@ class ArmController:
         self.style.configure("Servo.TLabelframe.Label", foreground="#50C878", font=("Arial", 12, "bold"))
         self.style.configure("ServoName.TLabel", foreground="#50C878", font=("Arial", 11, "bold"))
         
-        self.ser = None
-        self.selected_port = tk.StringVar()
-        self.connected = False
-        self.running = False
-        self.update_thread = None
-        
-        # Define servo names and maximum angles
-        self.servo_names = ["Gripper", "Elbow", "Shoulder", "Base"]
-        self.max_angles = [45, 180, 180, 180]
-        
         self.create_connection_section()
         self.create_quick_control_section()
         self.create_servo_section()
         self.create_reset_section()
         
-        self.set_controls_state('disabled')
+        for i, angle_var in enumerate(self.angle_vars):
+            self.telemetry.bind(i, angle_var)
+        
         self.root.configure(bg='#1e1e1e')
+        self.start()
 
     def create_connection_section(self):
         conn_frame = tb.LabelFrame(self.root, text="Serial Connection", 
@@ -127,9 +123,8 @@ class ArmController:
                 if angle <= max_angle:
                     btn = tb.Button(btn_frame, text=f"{angle}°",
                                   bootstyle="success-outline",
-                                  command=lambda x=i, a=angle: self.set_servo_angle(x, a))
+                                  command=lambda x=i, a=angle: self.set_pose({x: a}))
                     btn.pack(side='left', padx=2)
-                    btn.bind('<Button-1>', lambda event, x=i, a=angle: self.update_slider(x, a))
 
     def create_reset_section(self):
         reset_frame = tb.Frame(self.root)
@@ -138,43 +133,10 @@ class ArmController:
         tb.Button(reset_frame, text="🔄 Reset All Servos",
                  bootstyle="primary",
                  command=self.reset_all_servos).pack(side='left', padx=5)
-
-    def refresh_ports(self):
-        ports = [port.device for port in list_ports.comports()]
-        self.port_combo['values'] = ports
-        if ports:
-            self.port_combo.set(ports[0])
-
-    def toggle_connection(self):
-        if not self.connected:
-            try:
-                port = self.selected_port.get()
-                self.ser = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)
-                
-                self.connected = True
-                self.running = True
-                self.update_thread = threading.Thread(target=self.monitor_serial)
-                self.update_thread.daemon = True
-                self.update_thread.start()
-                
-                self.connect_btn.configure(text="🔌 Disconnect", bootstyle="danger")
-                self.status_label.configure(text="Connected", bootstyle="success")
-                self.set_controls_state('normal')
-                
-            except Exception as e:
-                messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
-        else:
-            self.disconnect()
-
-    def disconnect(self):
-        self.running = False
-        if self.ser:
-            self.ser.close()
-        self.connected = False
-        self.connect_btn.configure(text="🔌 Connect", bootstyle="success")
-        self.status_label.configure(text="Disconnected", bootstyle="danger")
-        self.set_controls_state('disabled')
+        
+        tb.Button(reset_frame, text="⛔ Stop (Esc)",
+                 bootstyle="danger",
+                 command=self.emergency_stop).pack(side='left', padx=5)
 
     def set_controls_state(self, state):
         for slider in self.sliders:
@@ -202,55 +164,42 @@ class ArmController:
             # Constrain angle based on servo-specific maximum
             angle = min(angle, self.max_angles[servo_num])
             self.angle_vars[servo_num].set(f"{angle}°")
-            command = f"{servo_num}{angle}\n".encode()
-            self.ser.write(command)
-
-    def update_slider(self, servo_num, angle):
-        self.sliders[servo_num].set(angle)
-        self.update_servo(servo_num, angle)
+            if self.smooth_moves:
+                # Re-planned on every drag event, carrying on at the current speed
+                self.trajectory.move_to({servo_num: angle})
+            else:
+                self.scheduler.submit(servo_num, angle)
+
+    def set_pose(self, angles, flush=True):
+        # angles is a list for every servo, or {joint: angle} for some of them
+        if self.connected:
+            pose = dict(angles) if isinstance(angles, dict) else dict(enumerate(angles))
+            # Clamp every joint in one pass and move the sliders without going through update_servo
+            pose = {i: min(angle, self.max_angles[i]) for i, angle in pose.items()}
+            for i, angle in pose.items():
+                self.sliders[i].set(angle)
+                self.angle_vars[i].set(f"{angle}°")
+            if self.smooth_moves:
+                self.trajectory.move_to(pose, flush)
+                return
+            self.scheduler.submit_pose(pose)
+            if flush:
+                # Buttons go out now, ahead of any slider traffic still queued
+                self.scheduler.flush(PRESET)
 
     def update_all_servos(self, val):
         if self.connected:
             angle = int(float(val))
             print(f"All Servos: {angle}°")
-            for i in range(4):
-                constrained_angle = min(angle, self.max_angles[i])
-                self.set_servo_angle(i, constrained_angle)
-                self.update_slider(i, constrained_angle)
+            # Master slider drags are coalesced by the scheduler like the joint sliders
+            self.set_pose([angle] * 4, flush=False)
 
     def set_all_servos(self, angle):
-        if self.connected:
-            for i in range(4):
-                constrained_angle = min(angle, self.max_angles[i])
-                self.set_servo_angle(i, constrained_angle)
-                self.update_slider(i, constrained_angle)
+        self.set_pose([angle] * 4)
 
     def reset_all_servos(self):
-        if self.connected:
-            # Set Gripper to 45, others to 90
-            for i in range(4):
-                reset_angle = 45 if i == 0 else 90
-                self.set_servo_angle(i, reset_angle)
-                self.update_slider(i, reset_angle)
-
-    def monitor_serial(self):
-        while self.running:
-            try:
-                if self.ser and self.ser.in_waiting:
-                    data = self.ser.readline().decode().strip()
-                    if data.startswith("Angles:"):
-                        angles = data[7:].split(',')
-                        for i, angle in enumerate(angles[:4]):
-                            if angle:
-                                self.angle_vars[i].set(f"{angle}°")
-            except Exception as e:
-                print(f"Serial error: {e}")
-                self.disconnect()
-                break
-            time.sleep(0.01)
-
-    def __del__(self):
-        self.disconnect()
+        # Set Gripper to 45, others to 90
+        self.set_pose([45] + [90] * 3)
 
 def main():
     root = tk.Tk()
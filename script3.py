@@ -1,14 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import serial
-import time
-import threading
 import ttkbootstrap as tb
-from serial.tools import list_ports
+from discovery import MOTOR_CHECK2
+from serial_writer import PRESET
+from arm_panel import ArmPanel
+from scheduler import BASE_JOINT
+from kinematics import ArmKinematics
+from ik import IKSolver, PLANAR
+from reachability import ReachabilityMap
+
+class ArmController(ArmPanel):
+    prefer = (MOTOR_CHECK2,)
 
-class ArmController:
     def __init__(self, root):
-        self.root = root
+        # Define servo names and maximum angles
+        self.servo_names = ["Gripper", "Wrist", "Wrist Pitch", "Elbow", "Shoulder"]
+        super().__init__(root, [45, 180, 180, 180, 180], base=True)
         self.root.title("Robotic Arm Control Panel")
         self.root.geometry("600x1000")
         self.style = tb.Style("darkly")
@@ -19,24 +26,25 @@ class ArmController:
         self.style.configure("Servo.TLabelframe.Label", foreground="#50C878", font=("Arial", 12, "bold"))
         self.style.configure("ServoName.TLabel", foreground="#50C878", font=("Arial", 11, "bold"))
         
-        self.ser = None
-        self.selected_port = tk.StringVar()
-        self.connected = False
-        self.running = False
-        self.update_thread = None
-        
-        # Define servo names and maximum angles
-        self.servo_names = ["Gripper", "Wrist", "Wrist Pitch", "Elbow", "Shoulder"]
-        self.max_angles = [45, 180, 180, 180, 180]
+        # Gripper X/Y/Z to joint angles; set the link lengths to match your arm
+        self.kinematics = ArmKinematics()
+        self.ik = IKSolver(self.kinematics, self.max_angles)
+        # Built offline with "python reachability.py build"; opened on first use
+        self.reachability = ReachabilityMap(kinematics=self.kinematics)
         
         self.create_connection_section()
         self.create_quick_control_section()
         self.create_servo_section()
         self.create_base_section()
+        self.create_position_section()
         self.create_reset_section()
         
-        self.set_controls_state('disabled')
+        for i, angle_var in enumerate(self.angle_vars):
+            self.telemetry.bind(i, angle_var)
+        self.telemetry.bind(BASE_JOINT, self.base_var)
+        
         self.root.configure(bg='#1e1e1e')
+        self.start()
 
     def create_connection_section(self):
         conn_frame = tb.LabelFrame(self.root, text="Serial Connection", 
@@ -128,9 +136,8 @@ class ArmController:
                 if angle <= max_angle:
                     btn = tb.Button(btn_frame, text=f"{angle}°",
                                   bootstyle="success-outline",
-                                  command=lambda x=i, a=angle: self.set_servo_angle(x, a))
+                                  command=lambda x=i, a=angle: self.set_pose({x: a}))
                     btn.pack(side='left', padx=2)
-                    btn.bind('<Button-1>', lambda event, x=i, a=angle: self.update_slider(x, a))
 
     def create_base_section(self):
         base_frame = tb.LabelFrame(self.root, text="Base Rotation", 
@@ -154,9 +161,26 @@ class ArmController:
         for angle in [0, 90, 180, 270, 360]:
             btn = tb.Button(btn_frame, text=f"{angle}°",
                           bootstyle="info outline",
-                          command=lambda a=angle: self.set_base_angle(a))
+                          command=lambda a=angle: self.set_pose({BASE_JOINT: a}))
             btn.pack(side='left', padx=5)
-            btn.bind('<Button-1>', lambda event, a=angle: self.update_base_slider(a))
+
+    def create_position_section(self):
+        position_frame = tb.LabelFrame(self.root, text="Gripper Position (mm)",
+                                     style="Custom.TLabelframe")
+        position_frame.pack(padx=10, pady=5, fill='x')
+        
+        entry_frame = tb.Frame(position_frame)
+        entry_frame.pack(pady=5)
+        self.position_vars = []
+        for axis, value in zip("XYZ", self.kinematics.forward([90, 90, 90, 90, 90, 0])[0]):
+            tb.Label(entry_frame, text=axis, style="Custom.TLabel").pack(side='left', padx=2)
+            var = tk.StringVar(value=f"{value:.0f}")
+            tb.Entry(entry_frame, textvariable=var, width=6).pack(side='left', padx=5)
+            self.position_vars.append(var)
+        
+        tb.Button(entry_frame, text="Go",
+                 bootstyle="success",
+                 command=self.go_to_position).pack(side='left', padx=5)
 
     def create_reset_section(self):
         reset_frame = tb.Frame(self.root)
@@ -168,44 +192,17 @@ class ArmController:
         
         tb.Button(reset_frame, text="🔄 Reset Base (0°)",
                  bootstyle="primary",
-                 command=lambda: self.set_base_angle(0)).pack(side='left', padx=5)
-
-    def refresh_ports(self):
-        ports = [port.device for port in list_ports.comports()]
-        self.port_combo['values'] = ports
-        if ports:
-            self.port_combo.set(ports[0])
-
-    def toggle_connection(self):
-        if not self.connected:
-            try:
-                port = self.selected_port.get()
-                self.ser = serial.Serial(port, 115200, timeout=1)
-                time.sleep(2)
-                
-                self.connected = True
-                self.running = True
-                self.update_thread = threading.Thread(target=self.monitor_serial)
-                self.update_thread.daemon = True
-                self.update_thread.start()
-                
-                self.connect_btn.configure(text="🔌 Disconnect", bootstyle="danger")
-                self.status_label.configure(text="Connected", bootstyle="success")
-                self.set_controls_state('normal')
-                
-            except Exception as e:
-                messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
-        else:
-            self.disconnect()
+                 command=lambda: self.set_pose({BASE_JOINT: 0})).pack(side='left', padx=5)
+        
+        tb.Button(reset_frame, text="⛔ Stop (Esc)",
+                 bootstyle="danger",
+                 command=self.emergency_stop).pack(side='left', padx=5)
 
-    def disconnect(self):
-        self.running = False
-        if self.ser:
-            self.ser.close()
-        self.connected = False
-        self.connect_btn.configure(text="🔌 Connect", bootstyle="success")
-        self.status_label.configure(text="Disconnected", bootstyle="danger")
-        self.set_controls_state('disabled')
+    def print_stats(self):
+        super().print_stats()
+        stats = self.ik.stats()
+        if stats['solves'] or stats['cache_hits']:
+            print(f"IK: {stats['solves']} solved, {stats['cache_hits']} from cache")
 
     def set_controls_state(self, state):
         for slider in self.sliders:
@@ -240,68 +237,86 @@ class ArmController:
             # Constrain angle based on servo-specific maximum
             angle = min(angle, self.max_angles[servo_num])
             self.angle_vars[servo_num].set(f"{angle}°")
-            command = f"{servo_num}{angle}\n".encode()
-            self.ser.write(command)
+            if self.smooth_moves:
+                # Re-planned on every drag event, carrying on at the current speed
+                self.trajectory.move_to({servo_num: angle})
+            else:
+                self.scheduler.submit(servo_num, angle)
 
     def set_base_angle(self, angle):
         if self.connected:
             self.base_var.set(f"{angle}°")
-            command = f"S{angle}\n".encode()
-            self.ser.write(command)
+            self.scheduler.submit(BASE_JOINT, angle)
+
+    def set_pose(self, angles, flush=True):
+        # angles is a list for every servo, or {joint: angle} for some of them and/or the base
+        if self.connected:
+            pose = dict(angles) if isinstance(angles, dict) else dict(enumerate(angles))
+            # Clamp every joint in one pass and move the sliders without going through update_servo
+            for joint, angle in pose.items():
+                if joint == BASE_JOINT:
+                    self.base_slider.set(angle)
+                    self.base_var.set(f"{angle}°")
+                    continue
+                pose[joint] = angle = min(angle, self.max_angles[joint])
+                self.sliders[joint].set(angle)
+                self.angle_vars[joint].set(f"{angle}°")
+            if self.smooth_moves:
+                # The base is a single blocking stepper move, so only the servos are planned
+                servos = {joint: angle for joint, angle in pose.items() if joint != BASE_JOINT}
+                if servos:
+                    self.trajectory.move_to(servos, flush)
+                pose = {BASE_JOINT: pose[BASE_JOINT]} if BASE_JOINT in pose else {}
+            self.scheduler.submit_pose(pose)
+            if flush:
+                # Buttons go out now, ahead of any slider traffic still queued
+                self.scheduler.flush(PRESET)
 
-    def update_slider(self, servo_num, angle):
-        self.sliders[servo_num].set(angle)
-        self.update_servo(servo_num, angle)
+    def go_to_position(self):
+        try:
+            x, y, z = (float(var.get()) for var in self.position_vars)
+        except ValueError:
+            messagebox.showerror("Error", "X, Y and Z must be numbers")
+            return
+        self.move_gripper_to(x, y, z)
 
-    def update_base_slider(self, angle):
-        self.base_slider.set(angle)
-        self.update_base(angle)
+    def move_gripper_to(self, x, y, z, pitch=None):
+        # Solved from the pose last commanded, so the least movement gets there
+        if not self.connected:
+            return False
+        if self.reachability.available and not self.reachability.reachable((x, y, z)):
+            print(f"Can't reach ({x:.0f}, {y:.0f}, {z:.0f}): outside the workspace map")
+            return False
+        seed = self.commanded_angles() + [self.scheduler.targets.get(BASE_JOINT, self.link.parser.base)]
+        solution = self.ik.solve((x, y, z), seed, pitch)
+        if not solution.converged and self.reachability.available:
+            # Stuck from where the arm is; start again from the map's pose for that spot
+            poses, errors, converged, iterations = self.ik.solve_batch(
+                [(x, y, z)], [self.reachability.seed((x, y, z), seed)], pitch)
+            solution = solution._replace(pose=poses[0].tolist(), error=float(errors[0]),
+                                         converged=bool(converged[0]))
+        if not solution.converged:
+            print(f"Can't reach ({x:.0f}, {y:.0f}, {z:.0f}): closest is {solution.error:.0f} mm off")
+            return False
+        # Only what IK solved; the gripper and wrist roll keep whatever they were last sent
+        pose = {joint: round(solution.pose[joint]) for joint in PLANAR}
+        pose[BASE_JOINT] = round(solution.pose[5]) % 360
+        self.set_pose(pose)
+        return True
 
     def update_all_servos(self, val):
         if self.connected:
             angle = int(float(val))
             print(f"All Servos: {angle}°")
-            for i in range(5):
-                constrained_angle = min(angle, self.max_angles[i])
-                self.set_servo_angle(i, constrained_angle)
-                self.update_slider(i, constrained_angle)
+            # Master slider drags are coalesced by the scheduler like the joint sliders
+            self.set_pose([angle] * 5, flush=False)
 
     def set_all_servos(self, angle):
-        if self.connected:
-            for i in range(5):
-                constrained_angle = min(angle, self.max_angles[i])
-                self.set_servo_angle(i, constrained_angle)
-                self.update_slider(i, constrained_angle)
+        self.set_pose([angle] * 5)
 
     def reset_all_servos(self):
-        if self.connected:
-            # Set Gripper to 45, others to 90
-            for i in range(5):
-                reset_angle = 45 if i == 0 else 90
-                self.set_servo_angle(i, reset_angle)
-                self.update_slider(i, reset_angle)
-
-    def monitor_serial(self):
-        while self.running:
-            try:
-                if self.ser and self.ser.in_waiting:
-                    data = self.ser.readline().decode().strip()
-                    if data.startswith("Angles:"):
-                        angles = data[7:].split(',')
-                        for i, angle in enumerate(angles[:5]):
-                            if angle:
-                                self.angle_vars[i].set(f"{angle}°")
-                    elif data.startswith("BasePos:"):
-                        angle = int(data.split(':')[1])
-                        self.base_var.set(f"{angle}°")
-            except Exception as e:
-                print(f"Serial error: {e}")
-                self.disconnect()
-                break
-            time.sleep(0.01)
-
-    def __del__(self):
-        self.disconnect()
+        # Set Gripper to 45, others to 90
+        self.set_pose([45] + [90] * 4)
 
 def main():
     root = tk.Tk()
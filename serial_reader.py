@@ -0,0 +1,106 @@
+"""Background thread that reads telemetry lines from the serial port."""
+
+import threading
+
+CR = 0x0D
+LF = 0x0A
+
+
+class SerialReader:
+    """Blocks on the port and hands every complete line to ``on_line``.
+
+    Reads wait on the port with ``read_timeout`` instead of polling
+    ``in_waiting`` in a sleep loop, so a line is delivered as soon as its
+    newline arrives and an idle port costs no CPU. Whatever is already buffered
+    is read in one chunk and split in place inside a reusable ``bytearray``.
+
+    ``on_line`` receives a ``memoryview`` of the line without its line ending.
+    The view is only valid during the call; copy it to keep the data.
+
+    Setting ``binary`` switches to zero-delimited frames (see
+    :mod:`binary_protocol`) with no CR stripping. ``on_line`` may set it while
+    handling a line; the rest of the buffer is split the new way.
+    """
+
+    def __init__(self, ser, on_line, on_error=None, chunk_size=4096, read_timeout=0.1, max_line=1024):
+        self.ser = ser
+        self.on_line = on_line
+        self.on_error = on_error
+        self.chunk_size = chunk_size
+        self.read_timeout = read_timeout
+        self.max_line = max_line
+        self.error = None
+        self.binary = False
+
+        self._buffer = bytearray()
+        self._running = False
+        self._thread = None
+
+        self.bytes_read = 0
+        self.reads = 0
+        self.lines = 0
+        self.overflows = 0
+
+    def start(self):
+        self.ser.timeout = self.read_timeout
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="serial-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def feed(self, data):
+        """Append raw bytes and dispatch every complete line."""
+        buf = self._buffer
+        buf += data
+        start = 0
+        with memoryview(buf) as view:
+            while True:
+                if self.binary:
+                    end = line_end = buf.find(0, start)
+                else:
+                    end = buf.find(LF, start)
+                    line_end = end - 1 if end > start and buf[end - 1] == CR else end
+                if end < 0:
+                    break
+                self.lines += 1
+                self.on_line(view[start:line_end])
+                start = end + 1
+        if start:
+            del buf[:start]
+        if len(buf) > self.max_line:
+            # No delimiter in sight, most likely noise or a baud mismatch
+            buf.clear()
+            self.overflows += 1
+
+    def stats(self):
+        return {
+            "bytes": self.bytes_read,
+            "reads": self.reads,
+            "lines": self.lines,
+            "overflows": self.overflows,
+        }
+
+    def _run(self):
+        ser = self.ser
+        while self._running:
+            try:
+                # Blocks until a byte arrives or the timeout expires, then
+                # takes whatever else is already waiting in the same call
+                data = ser.read(max(1, min(ser.in_waiting, self.chunk_size)))
+                if data:
+                    self.reads += 1
+                    self.bytes_read += len(data)
+                    self.feed(data)
+            except Exception as e:
+                if not self._running:
+                    return
+                self.error = e
+                self._running = False
+                if self.on_error:
+                    self.on_error(e)
+                return
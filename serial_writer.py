@@ -0,0 +1,257 @@
+"""Background thread that owns all writes to the serial port."""
+
+import threading
+import time
+from collections import deque
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+# Priority lanes, highest first: emergency stop/hold, preset buttons, slider streaming
+STOP = 0
+PRESET = 1
+STREAM = 2
+LANES = {STOP: "stop", PRESET: "preset", STREAM: "stream"}
+# Press-to-wire time each lane is expected to stay under; writes over it are counted as late
+LATENCY_BUDGET = {STOP: 0.015, PRESET: 0.050, STREAM: 0.100}
+# Range for the optional aggregation window, in seconds
+MIN_LINGER = 0.0005
+MAX_LINGER = 0.005
+
+
+class SerialWriter:
+    """Writes queued commands to ``ser`` from a dedicated thread.
+
+    Commands are queued as ``(joint, data)`` pairs in a bounded queue so a slow
+    link never blocks the Tk mainloop. With the ``drop_oldest`` policy a new
+    command replaces any queued command for the same joint, and when the queue
+    is full the oldest command is discarded. With ``block`` the caller waits up
+    to ``put_timeout`` seconds for room and the command is dropped after that.
+
+    With a ``flow`` (a :class:`flow_control.CreditFlow`) the head of the queue
+    waits for credit in the firmware's RX buffer, and keeps being coalesced
+    while it waits.
+
+    Every command has a ``priority`` lane and the highest non-empty lane is
+    always written first. A command discards queued lower-priority commands
+    for any of its joints (a batch's key is the frozenset of its joints), so
+    an older slider position can't follow a preset or a stop out and undo it.
+    A ``STOP`` command is also never dropped for a full queue and skips the
+    credit wait. It still
+    waits for the write in progress and for the bytes already in the OS
+    buffer, which flow control keeps to one RX buffer's worth, so its
+    press-to-wire time is bounded by about two 63-byte transfers at the baud
+    rate. That time is measured per lane from ``put`` until the write returns.
+
+    With ``linger`` (0.5-5 ms, off by default) a ``STREAM`` command at the head
+    waits until it has been queued that long, Nagle-style, and everything
+    queued by then goes out concatenated in a single write. A ``PRESET`` or
+    ``STOP`` command ends the wait at once. A write never holds more than the
+    credit ``flow`` has room for, and never anything after a command that
+    blocks the firmware.
+    """
+
+    def __init__(self, ser, maxsize=32, policy=DROP_OLDEST, put_timeout=0.05, on_error=None, flow=None,
+                 linger=0.0):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown back-pressure policy: {policy}")
+        if linger and not MIN_LINGER <= linger <= MAX_LINGER:
+            raise ValueError(f"Aggregation window must be {MIN_LINGER * 1000}-{MAX_LINGER * 1000} ms, got {linger * 1000} ms")
+        self.ser = ser
+        self.maxsize = maxsize
+        self.policy = policy
+        self.put_timeout = put_timeout
+        self.on_error = on_error
+        self.error = None
+        self.linger = linger
+        self.flow = flow
+        if flow:
+            flow.on_credit = self._wake
+
+        self._lanes = {priority: deque() for priority in LANES}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        self.writes = 0
+        self.commands_written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self.write_time_total = 0.0
+        self.write_time_max = 0.0
+        self.queue_delay_max = 0.0
+        self.preempted = 0
+        self.latencies = {priority: deque(maxlen=1000) for priority in LANES}
+        self.late = dict.fromkeys(LANES, 0)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="serial-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            for lane in self._lanes.values():
+                lane.clear()
+            self._cond.notify_all()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def put(self, joint, data, busy_for=0.0, priority=STREAM):
+        """Queue ``data`` for ``joint``; returns False if it had to be dropped.
+
+        ``busy_for`` is how long the firmware will be blocked acting on it.
+        ``priority`` is one of ``STOP``, ``PRESET`` or ``STREAM``.
+        """
+        with self._cond:
+            if not self._running:
+                return False
+            self._preempt(joint, priority)
+            lane = self._lanes[priority]
+            # A stop is never coalesced or dropped
+            if priority != STOP and not self._make_room(joint, lane):
+                self.dropped += 1
+                return False
+            lane.append((joint, data, time.perf_counter(), busy_for))
+            self._cond.notify_all()
+            return True
+
+    def _preempt(self, joint, priority):
+        # Called with the lock held
+        joints = _joints(joint)
+        for lower in range(priority + 1, len(LANES)):
+            lane = self._lanes[lower]
+            kept = [item for item in lane if not joints & _joints(item[0])]
+            self.preempted += len(lane) - len(kept)
+            lane.clear()
+            lane.extend(kept)
+
+    def _make_room(self, joint, lane):
+        # Called with the lock held; False if the command has to be dropped
+        if self.policy == DROP_OLDEST:
+            for i, (queued_joint, _, _, _) in enumerate(lane):
+                if queued_joint == joint:
+                    del lane[i]
+                    self.dropped += 1
+                    return True
+            if self.depth >= self.maxsize:
+                lowest = next((self._lanes[p] for p in (STREAM, PRESET) if self._lanes[p]), None)
+                if lowest is None:
+                    return False
+                lowest.popleft()
+                self.dropped += 1
+            return True
+        return self._cond.wait_for(lambda: self.depth < self.maxsize or not self._running,
+                                   self.put_timeout) and self._running
+
+    def _head(self):
+        return next(((priority, lane) for priority, lane in sorted(self._lanes.items()) if lane), (None, None))
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def depth(self):
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def latency_stats(self):
+        """Press-to-wire milliseconds per lane: count, p50, p95, max and writes over budget."""
+        stats = {}
+        for priority, name in LANES.items():
+            samples = sorted(self.latencies[priority])
+            pick = lambda pct: 1000 * samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+            stats[name] = {
+                "count": len(samples),
+                "p50_ms": pick(50),
+                "p95_ms": pick(95),
+                "max_ms": 1000 * samples[-1] if samples else 0.0,
+                "budget_ms": 1000 * LATENCY_BUDGET[priority],
+                "late": self.late[priority],
+            }
+        return stats
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "writes": self.writes,
+            "commands": self.commands_written,
+            "bytes": self.bytes_written,
+            "bytes_per_write": self.bytes_written / self.writes if self.writes else 0.0,
+            # Writes, and so syscalls and USB transfers, that aggregation avoided
+            "syscalls_saved": self.commands_written - self.writes,
+            "dropped": self.dropped,
+            "write_ms_avg": 1000 * self.write_time_total / self.writes if self.writes else 0.0,
+            "write_ms_max": 1000 * self.write_time_max,
+            "queue_delay_ms_max": 1000 * self.queue_delay_max,
+            "preempted": self.preempted,
+            "latency": self.latency_stats(),
+        }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    self._cond.wait_for(lambda: self.depth or not self._running)
+                    if not self._running:
+                        return
+                    priority, lane = self._head()
+                    delay = self.flow.delay(len(lane[0][1])) if self.flow and priority != STOP else 0.0
+                    if not delay and self.linger and priority == STREAM:
+                        # Give the rest of a burst a moment to join this write; a button ends the wait
+                        delay = lane[0][2] + self.linger - time.perf_counter()
+                    if delay <= 0:
+                        break
+                    # Held for credit; newer commands for the same joint, or a higher lane, still replace it
+                    self._cond.wait(delay)
+                items = self._take(priority, lane)
+                self._cond.notify_all()
+
+            data = items[0][1][1] if len(items) == 1 else b"".join(item[1] for _, item in items)
+            start = time.perf_counter()
+            try:
+                self.ser.write(data)
+            except Exception as e:
+                self.error = e
+                self._running = False
+                if self.on_error:
+                    self.on_error(e)
+                return
+            elapsed = time.perf_counter() - start
+            if self.flow:
+                # Only the last command in a write can block the firmware
+                self.flow.consume(len(data), items[-1][1][3])
+
+            self.writes += 1
+            self.commands_written += len(items)
+            self.bytes_written += len(data)
+            self.write_time_total += elapsed
+            self.write_time_max = max(self.write_time_max, elapsed)
+            for priority, (_, _, queued_at, _) in items:
+                self.queue_delay_max = max(self.queue_delay_max, start - queued_at)
+                latency = start + elapsed - queued_at
+                self.latencies[priority].append(latency)
+                if latency > LATENCY_BUDGET[priority]:
+                    self.late[priority] += 1
+
+    def _take(self, priority, lane):
+        # Called with the lock held: the head command, plus whatever else may share its write
+        items = [(priority, lane.popleft())]
+        if not self.linger:
+            return items
+        size = len(items[0][1][1])
+        room = self.flow.room() if self.flow else None
+        while not items[-1][1][3]:
+            priority, lane = self._head()
+            if lane is None or (room is not None and size + len(lane[0][1]) > room):
+                break
+            items.append((priority, lane.popleft()))
+            size += len(items[-1][1][1])
+        return items
+
+
+def _joints(key):
+    # Batches are queued under a frozenset of their joints, everything else under one key
+    return key if isinstance(key, frozenset) else {key}
@@ -0,0 +1,236 @@
+"""Parser for the firmware's telemetry lines that works on raw bytes."""
+
+from enum import IntEnum
+
+import binary_protocol
+
+MAX_JOINTS = 5
+# Largest value an angle, position or ack field may hold
+MAX_FIELD = 360
+
+
+class FrameType(IntEnum):
+    MALFORMED = -1
+    UNKNOWN = 0
+    ANGLES = 1
+    BASE_POS = 2
+    STEPPER_POS = 3
+    CAPS = 4
+    MODE = 5
+    ACK = 6
+
+
+class Frame:
+    """A parsed line; the subclasses add the payload."""
+
+    __slots__ = ("type",)
+
+    def __init__(self, frame_type):
+        self.type = frame_type
+
+
+class AnglesFrame(Frame):
+    """``Angles:``: the first ``joint_count`` entries of ``angles``."""
+
+    __slots__ = ("angles", "joint_count")
+
+    def __init__(self):
+        super().__init__(FrameType.ANGLES)
+        self.angles = [0] * MAX_JOINTS
+        self.joint_count = 0
+
+
+class PositionFrame(Frame):
+    """``BasePos:`` or ``StepperPos:``, told apart by ``type``."""
+
+    __slots__ = ("angle",)
+
+    def __init__(self):
+        super().__init__(FrameType.BASE_POS)
+        self.angle = 0
+
+
+class CapsFrame(Frame):
+    """``Caps:``: the firmware's extension letters."""
+
+    __slots__ = ("caps",)
+
+    def __init__(self):
+        super().__init__(FrameType.CAPS)
+        self.caps = b""
+
+
+class ModeFrame(Frame):
+    """``Mode:``: the transport the firmware just switched to."""
+
+    __slots__ = ("mode",)
+
+    def __init__(self):
+        super().__init__(FrameType.MODE)
+        self.mode = b""
+
+
+class AckFrame(Frame):
+    """``Ack:``: the sequence number of the command the firmware just read."""
+
+    __slots__ = ("sequence",)
+
+    def __init__(self):
+        super().__init__(FrameType.ACK)
+        self.sequence = 0
+
+
+# Every field the firmware can send, up to three digits with or without leading
+# zeros, so one dict lookup both converts and range checks it
+_FIELDS = {b"%0*d" % (width, value): value
+           for width in (1, 2, 3) for value in range(MAX_FIELD + 1)}
+_field = _FIELDS.__getitem__
+_number = _FIELDS.get
+
+
+class TelemetryParser:
+    """Parses the firmware's feedback and protocol lines into typed records.
+
+    ``parse`` accepts ``bytes``, ``bytearray`` or ``memoryview`` without the
+    line ending. The line is copied to ``bytes`` once, split with
+    ``bytes.split`` and each field converted and range checked by a single
+    lookup in a table of every valid field, so the per-line work stays in C
+    rather than looping over bytes in Python. It returns one of a fixed set of records owned by the parser (an
+    :class:`AnglesFrame`, :class:`PositionFrame`, :class:`CapsFrame`,
+    :class:`ModeFrame`, :class:`AckFrame`, or a bare :class:`Frame` for
+    ``MALFORMED`` and ``UNKNOWN``), refilled on every call, so a record is
+    only valid until the next line. The latest values stay readable as
+    ``angles``, ``joint_count``, ``base``, ``caps``, ``mode`` and ``ack``;
+    a malformed line leaves them as they were. ``parse_packet`` does the
+    same for binary-mode frames.
+
+    The joint count is taken from the frame itself, so 4-joint Motor_Check3 and
+    5-joint Motor_Check2 feedback both parse, with or without the trailing
+    comma the sketches print.
+    """
+
+    def __init__(self):
+        self.angles_frame = AnglesFrame()
+        self.position_frame = PositionFrame()
+        self.caps_frame = CapsFrame()
+        self.mode_frame = ModeFrame()
+        self.ack_frame = AckFrame()
+        self._malformed_frame = Frame(FrameType.MALFORMED)
+        self._unknown_frame = Frame(FrameType.UNKNOWN)
+
+        self.frames = 0
+        self.malformed = 0
+        self.unknown = 0
+
+    @property
+    def angles(self):
+        return self.angles_frame.angles
+
+    @property
+    def joint_count(self):
+        return self.angles_frame.joint_count
+
+    @property
+    def base(self):
+        return self.position_frame.angle
+
+    @property
+    def caps(self):
+        return self.caps_frame.caps
+
+    @property
+    def mode(self):
+        return self.mode_frame.mode
+
+    @property
+    def ack(self):
+        return self.ack_frame.sequence
+
+    def parse(self, line):
+        data = bytes(line)
+        # Angles arrive many times a second, the rest rarely, so they're tried first
+        if data.startswith(b"Angles:"):
+            # Inline rather than a method call; this is the hot path
+            fields = data[7:].split(b",")
+            # The sketches end the list with a comma, which leaves an empty last field
+            if not fields[-1]:
+                fields.pop()
+            count = len(fields)
+            if count != 4 and count != MAX_JOINTS:
+                return self._malformed()
+            try:
+                values = list(map(_field, fields))
+            except KeyError:
+                return self._malformed()
+            record = self.angles_frame
+            record.angles[:count] = values
+            record.joint_count = count
+            self.frames += 1
+            return record
+        if data.startswith(b"BasePos:"):
+            return self._position(_number(data[8:], -1), FrameType.BASE_POS)
+        if data.startswith(b"StepperPos:"):
+            return self._position(_number(data[11:], -1), FrameType.STEPPER_POS)
+        if data.startswith(b"Ack:"):
+            return self._ack(_number(data[4:], -1))
+        if data.startswith(b"Caps:"):
+            self.caps_frame.caps = data[5:]
+            self.frames += 1
+            return self.caps_frame
+        if data.startswith(b"Mode:"):
+            self.mode_frame.mode = data[5:]
+            self.frames += 1
+            return self.mode_frame
+
+        self.unknown += 1
+        return self._unknown_frame
+
+    def parse_packet(self, frame):
+        """Like ``parse`` for a zero-delimited frame of the binary transport."""
+        try:
+            packet_type, payload = binary_protocol.decode_packet(frame)
+        except ValueError:
+            return self._malformed()
+        if packet_type == binary_protocol.ANGLES:
+            count = len(payload)
+            if count != 4 and count != MAX_JOINTS:
+                return self._malformed()
+            record = self.angles_frame
+            record.angles[:count] = payload
+            record.joint_count = count
+            self.frames += 1
+            return record
+        if packet_type == binary_protocol.BASE_POS:
+            if len(payload) != 2:
+                return self._malformed()
+            return self._position(payload[0] | payload[1] << 8, FrameType.BASE_POS)
+        if packet_type == binary_protocol.ACK:
+            if len(payload) != 1:
+                return self._malformed()
+            return self._ack(payload[0])
+
+        self.unknown += 1
+        return self._unknown_frame
+
+    def stats(self):
+        return {"frames": self.frames, "malformed": self.malformed, "unknown": self.unknown}
+
+    def _position(self, value, frame_type):
+        if value < 0:
+            return self._malformed()
+        record = self.position_frame
+        record.type = frame_type
+        record.angle = value
+        self.frames += 1
+        return record
+
+    def _ack(self, value):
+        if value < 0:
+            return self._malformed()
+        self.ack_frame.sequence = value
+        self.frames += 1
+        return self.ack_frame
+
+    def _malformed(self):
+        self.malformed += 1
+        return self._malformed_frame
@@ -0,0 +1,77 @@
+"""Hands telemetry from the serial threads to Tk widgets on the main thread."""
+
+import queue
+import threading
+
+
+class TelemetryPump:
+    """Buffers the latest value per key and applies it to Tk variables on a timer.
+
+    Worker threads call ``post`` and ``call``; neither touches Tk. The main
+    thread drains the buffer every ``frame_ms`` via ``root.after``, applies only
+    the newest value per key and skips variables whose text would not change.
+    """
+
+    def __init__(self, root, frame_ms=33):
+        self.root = root
+        self.frame_ms = frame_ms
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._calls = queue.SimpleQueue()
+        self._vars = {}
+        self._running = False
+        self._job = None
+
+        self.posted = 0
+        self.applied = 0
+        self.skipped = 0
+
+    def bind(self, key, var, fmt="{}°"):
+        self._vars[key] = (var, fmt)
+
+    def post(self, key, value):
+        """Record the latest ``value`` for ``key``; safe from any thread."""
+        with self._lock:
+            self._latest[key] = value
+            self.posted += 1
+
+    def call(self, func, *args):
+        """Run ``func(*args)`` on the Tk thread at the next drain."""
+        self._calls.put((func, args))
+
+    def start(self):
+        self._running = True
+        if self._job is None:
+            self._job = self.root.after(self.frame_ms, self._drain)
+
+    def stop(self):
+        self._running = False
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def stats(self):
+        return {"posted": self.posted, "applied": self.applied, "skipped": self.skipped}
+
+    def _drain(self):
+        try:
+            with self._lock:
+                latest, self._latest = self._latest, {}
+            for key, value in latest.items():
+                if key not in self._vars:
+                    continue
+                var, fmt = self._vars[key]
+                text = fmt.format(value)
+                if var.get() == text:
+                    self.skipped += 1
+                else:
+                    var.set(text)
+                    self.applied += 1
+            while True:
+                try:
+                    func, args = self._calls.get_nowait()
+                except queue.Empty:
+                    break
+                func(*args)
+        finally:
+            self._job = self.root.after(self.frame_ms, self._drain) if self._running else None
@@ -0,0 +1,283 @@
+"""Host-side trajectories: every servo in a move leaves and arrives together."""
+
+import math
+import time
+
+import numpy as np
+
+from serial_writer import PRESET
+
+# Motor_Check2/Motor_Check3 step each servo 1° every moveInterval (15 ms) toward its target
+FIRMWARE_VELOCITY = 1 / 0.015
+TRAPEZOID = "trapezoid"
+S_CURVE = "s-curve"
+PROFILES = (TRAPEZOID, S_CURVE)
+
+
+class TrapezoidProfile:
+    """Progress along a move, 0 to 1, with bounded velocity and acceleration.
+
+    Worked out for the joint with the furthest to go (``distance`` degrees);
+    every other joint follows the same progress scaled to its own distance,
+    so they all arrive together without exceeding the limits. ``speed`` is
+    how fast that joint is already moving along the move, so re-planning
+    mid-move carries on instead of starting from rest.
+    """
+
+    def __init__(self, distance, speed, max_velocity, max_acceleration):
+        a = max_acceleration
+        speed = min(max(speed, 0.0), max_velocity)
+        self.distance = distance
+        self.speed = speed
+        if not distance:
+            self.peak = self.accel_time = self.cruise_time = 0.0
+            self.decel = a
+            self.duration = 0.0
+            return
+        if speed * speed / (2 * a) >= distance:
+            # Too fast to stop at the goal within the limit; brake a little harder
+            self.peak = speed
+            self.accel_time = self.cruise_time = 0.0
+            self.decel = speed * speed / (2 * distance)
+        else:
+            self.peak = min(max_velocity, math.sqrt(a * distance + speed * speed / 2))
+            self.accel_time = (self.peak - speed) / a
+            self.decel = a
+            ramps = (self.peak * self.peak - speed * speed) / (2 * a) + self.peak * self.peak / (2 * a)
+            self.cruise_time = (distance - ramps) / self.peak
+        self.accel = a
+        self.duration = self.accel_time + self.cruise_time + self.peak / self.decel
+
+    def progress(self, t):
+        """Fraction of the move done at ``t`` seconds (scalar or array)."""
+        if not self.duration:
+            return np.ones_like(t, dtype=float)
+        t = np.clip(t, 0.0, self.duration)
+        t1 = self.accel_time
+        t2 = t1 + self.cruise_time
+        accelerating = self.speed * t + self.accel * t * t / 2
+        at_t1 = self.speed * t1 + self.accel * t1 * t1 / 2
+        cruising = at_t1 + self.peak * (t - t1)
+        left = self.duration - t
+        braking = self.distance - self.decel * left * left / 2
+        x = np.where(t < t1, accelerating, np.where(t < t2, cruising, braking))
+        return x / self.distance
+
+    def rate(self, t):
+        """Progress per second at ``t``."""
+        if not self.duration:
+            return np.zeros_like(t, dtype=float)
+        t = np.clip(t, 0.0, self.duration)
+        t1 = self.accel_time
+        t2 = t1 + self.cruise_time
+        v = np.where(t < t1, self.speed + self.accel * t,
+                     np.where(t < t2, self.peak, self.decel * (self.duration - t)))
+        return v / self.distance
+
+
+def _roots(a, b, c):
+    """Real roots of ``a u² + b u + c`` in [0, 1]."""
+    if not a:
+        return [-c / b] if b and 0.0 <= -c / b <= 1.0 else []
+    discriminant = b * b - 4 * a * c
+    if discriminant < 0:
+        return []
+    root = math.sqrt(discriminant)
+    return [u for u in ((-b - root) / (2 * a), (-b + root) / (2 * a)) if 0.0 <= u <= 1.0]
+
+
+def _quintic_peaks(s0):
+    """Largest progress rate and acceleration (per unit time) of the quintic started at rate ``s0``."""
+    rate = lambda u: s0 + u * u * (3 * (10 - 6 * s0) + u * (4 * (-15 + 8 * s0) + u * 5 * (6 - 3 * s0)))
+    accel = lambda u: u * ((60 - 36 * s0) + u * ((96 * s0 - 180) + u * (120 - 60 * s0)))
+    # The rate peaks where the acceleration is zero, the acceleration where its derivative is
+    rates = [0.0, 1.0] + _roots(120 - 60 * s0, 96 * s0 - 180, 60 - 36 * s0)
+    accels = [0.0, 1.0] + _roots(3 * (120 - 60 * s0), 2 * (96 * s0 - 180), 60 - 36 * s0)
+    return max(rate(u) for u in rates), max(abs(accel(u)) for u in accels)
+
+
+class SCurveProfile:
+    """Minimum-jerk progress: acceleration ramps in and out instead of stepping.
+
+    A quintic with zero acceleration at both ends, started at ``speed`` like
+    :class:`TrapezoidProfile`. The duration is the shortest that keeps a
+    move from rest within the limits (peak velocity 1.875 x average,
+    acceleration 5.77 x distance/T²), stretched if the peaks of the curve
+    for the actual starting speed would still exceed them.
+    """
+
+    def __init__(self, distance, speed, max_velocity, max_acceleration):
+        self.distance = distance
+        if not distance:
+            self.duration = 0.0
+            self.start_rate = 0.0
+            return
+        speed = min(max(speed, 0.0), max_velocity)
+        duration = max(1.875 * distance / max_velocity, math.sqrt(5.7735 * distance / max_acceleration))
+        # Initial speed as progress per unit time; above 1.875 the quintic would overshoot
+        self.start_rate = min(speed * duration / distance, 1.875)
+        # The start rate changes where and how high the curve peaks
+        peak_rate, peak_accel = _quintic_peaks(self.start_rate)
+        self.duration = max(duration, peak_rate * distance / max_velocity,
+                            math.sqrt(peak_accel * distance / max_acceleration))
+
+    def progress(self, t):
+        if not self.duration:
+            return np.ones_like(t, dtype=float)
+        u = np.clip(t / self.duration, 0.0, 1.0)
+        s0 = self.start_rate
+        return u * (s0 + u * u * ((10 - 6 * s0) + u * ((-15 + 8 * s0) + u * (6 - 3 * s0))))
+
+    def rate(self, t):
+        if not self.duration:
+            return np.zeros_like(t, dtype=float)
+        u = np.clip(t / self.duration, 0.0, 1.0)
+        s0 = self.start_rate
+        du = s0 + u * u * (3 * (10 - 6 * s0) + u * (4 * (-15 + 8 * s0) + u * 5 * (6 - 3 * s0)))
+        return du / self.duration
+
+
+class Trajectory:
+    """A planned move of every servo from ``start`` to ``goal`` along one profile."""
+
+    def __init__(self, start, goal, profile):
+        self.start = start
+        self.goal = goal
+        self.delta = goal - start
+        self.profile = profile
+        self.duration = profile.duration
+
+    def position(self, t):
+        """Angles (floats) at ``t`` seconds; an array of times gives one row each."""
+        return self.start + np.multiply.outer(self.profile.progress(t), self.delta)
+
+    def velocity(self, t):
+        """Degrees per second for every servo at ``t``."""
+        return np.multiply.outer(self.profile.rate(t), self.delta)
+
+    def setpoint(self, t):
+        """Whole-degree angles at ``t``, never ahead of the plan.
+
+        Rounding to the nearest degree would let a servo with a few degrees
+        to go take its last step well before the others; here every servo
+        reaches its goal exactly at the end.
+        """
+        remaining = np.multiply.outer(1.0 - self.profile.progress(t), self.delta)
+        return (self.goal - np.sign(remaining) * np.ceil(np.abs(remaining) - 1e-9)).astype(int)
+
+    def setpoints(self, rate_hz):
+        """:meth:`setpoint` at ``rate_hz`` from the start to the goal, one row per tick."""
+        ticks = np.arange(1, int(np.ceil(self.duration * rate_hz)) + 1) / rate_hz
+        return self.setpoint(ticks)
+
+
+class TrajectoryPlanner:
+    """Plans time-synchronised moves for the servos of an ArmController.
+
+    ``max_angles`` bounds the goals the way the controllers clamp slider
+    values. ``max_velocity`` defaults to 90 % of the firmware's own 1° per
+    15 ms, so the sketch keeps up with the whole-degree setpoints and every
+    joint is where the plan says it is.
+    """
+
+    def __init__(self, max_angles, max_velocity=0.9 * FIRMWARE_VELOCITY, max_acceleration=300.0,
+                 profile=TRAPEZOID):
+        if profile not in PROFILES:
+            raise ValueError(f"profile must be one of {PROFILES}, not {profile!r}")
+        self.max_angles = np.asarray(max_angles, dtype=float)
+        self.max_velocity = max_velocity
+        self.max_acceleration = max_acceleration
+        self.profile = TrapezoidProfile if profile == TRAPEZOID else SCurveProfile
+
+    def plan(self, start, goal, velocity=None):
+        """A :class:`Trajectory` from ``start`` to ``goal`` (one angle per servo).
+
+        ``velocity`` is every servo's current degrees per second when
+        re-planning mid-move; the part along the new move is kept.
+        """
+        start = np.asarray(start, dtype=float)
+        goal = np.clip(np.asarray(goal, dtype=float), 0.0, self.max_angles)
+        delta = goal - start
+        distance = float(np.abs(delta).max(initial=0.0))
+        speed = 0.0
+        if velocity is not None and distance:
+            # Velocity projected onto the new direction, in the furthest joint's degrees
+            speed = float(np.dot(velocity, delta)) / float(np.dot(delta, delta)) * distance
+        return Trajectory(start, goal, self.profile(distance, speed, self.max_velocity, self.max_acceleration))
+
+
+class TrajectoryStreamer:
+    """Feeds a trajectory's setpoints to a CommandScheduler on each of its ticks.
+
+    Registers itself as one of the scheduler's ``sources``, so setpoints go
+    out at the scheduler's rate, from whichever thread ticks it, under its
+    lock. ``current()`` returns the servos' angles for a move that starts at
+    rest. ``move_to`` re-plans from wherever the running move is, at its
+    current velocity, so a slider can call it on every drag event; the new
+    plan's first setpoint goes out on the next tick, or at once with
+    ``flush`` as for a preset button. Each tick
+    samples the plan at the time actually elapsed, not the tick count, so a
+    late tick doesn't stretch the move.
+    """
+
+    def __init__(self, planner, scheduler, current):
+        self.planner = planner
+        self.scheduler = scheduler
+        self.current = current
+        self.trajectory = None
+        self._started_at = 0.0
+        scheduler.sources.append(self.tick)
+
+        self.plans = 0
+        self.plan_time = 0.0
+        self.setpoints = 0
+
+    @property
+    def moving(self):
+        return self.trajectory is not None
+
+    def move_to(self, goal, flush=False):
+        """Start or re-plan a move to ``{servo: angle}``; other servos keep their goal."""
+        with self.scheduler.lock:
+            planned = time.perf_counter()
+            if self.trajectory:
+                t = planned - self._started_at
+                start = self.trajectory.position(t)
+                velocity = self.trajectory.velocity(t)
+                target = self.trajectory.goal.copy()
+            else:
+                start = np.asarray(self.current(), dtype=float)
+                velocity = None
+                target = start.copy()
+            for joint, angle in goal.items():
+                target[joint] = angle
+            self.trajectory = self.planner.plan(start, target, velocity)
+            self._started_at = time.perf_counter()
+            self.plans += 1
+            self.plan_time += self._started_at - planned
+            if flush:
+                # The first setpoint goes out now, ahead of slider traffic, rather than on the next tick
+                self.tick()
+                self.scheduler.flush(PRESET)
+
+    def cancel(self):
+        with self.scheduler.lock:
+            self.trajectory = None
+
+    def stats(self):
+        return {
+            "plans": self.plans,
+            "plan_us_avg": 1e6 * self.plan_time / self.plans if self.plans else 0.0,
+            "setpoints": self.setpoints,
+        }
+
+    def tick(self):
+        trajectory = self.trajectory
+        if trajectory is None:
+            return
+        t = time.perf_counter() - self._started_at
+        # The scheduler drops joints whose whole-degree setpoint didn't change
+        self.scheduler.submit_pose(dict(enumerate(trajectory.setpoint(t).tolist())))
+        self.setpoints += 1
+        if t >= trajectory.duration:
+            self.trajectory = None